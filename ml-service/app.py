@@ -1,20 +1,44 @@
 """
 FastAPI server for job recommendations using SentenceTransformers
 """
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Literal, Optional, Dict, AsyncIterator, Callable
+import asyncio
 import numpy as np
 import pickle
 import os
+import gzip
 import hashlib
+import json
 import time
+import threading
+from collections import OrderedDict
 from functools import lru_cache
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import pandas as pd
-import re
+from metrics import (
+    StageTimer, REQUEST_LATENCY, CACHE_REQUESTS, ENCODE_BATCH_SIZE,
+    REQUESTS_IN_FLIGHT, INDEX_ITEMS, INDEX_BYTES, BULK_JOBS, SHARD_REQUESTS, JOB_CHANGES, render_metrics
+)
+from profiling import start_request_profile, record_request_input, log_slow_request, profile_thread
+from bulk_jobs import BulkJobManager, BulkJobStore, BULK_JOBS_DIR, BULK_JOB_INPUT_DIR
+from user_profiles import UserProfileStore, USER_PROFILES_DB, fields_hash
+from vector_index import VectorIndex, top_k, normalize_rows
+from job_graph import load_knn_graph, KNN_GRAPH_PATH
+from lexical_index import LexicalIndex, build_bm25_index, load_bm25_index, BM25_INDEX_PATH
+from job_shards import ShardedJobSearch, JOB_SHARD_URLS, SHARD_MAX_K
+from job_ranges import (
+    RangeIndex, job_ranges, parse_job_ranges, experience_level, parse_experience, EXPERIENCE_LEVELS, RANGE_COLUMNS
+)
+from job_delta import LiveJobIndex, jobs_dataframe, JOB_COMPACT_INTERVAL, JOB_DELTA_MAX_ROWS
+from geo import Gazetteer, GeoIndex, geocode_locations, load_geo_index, GEO_INDEX_PATH, GEO_CITY_RADIUS_KM
+from skills import extract_skills
+from role_profiles import load_role_profiles, normalize_role, role_skill_gap, ROLE_PROFILES_PATH
+from precomputed import PrecomputedStore, PRECOMPUTED_DB, PRECOMPUTE_TOP_K, PRECOMPUTE_CHUNK_SIZE
 
 # AWS S3 support (optional)
 try:
@@ -25,6 +49,13 @@ except ImportError:
     S3_AVAILABLE = False
     print("Warning: boto3 not available. S3 download will be skipped.")
 
+# Encodeur JSON rapide (optional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Google Cloud Storage support (optional)
 try:
     from google.cloud import storage
@@ -45,6 +76,94 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class ObservabilityMiddleware:
+    """
+    Middleware ASGI : latence par endpoint, nombre de requêtes en cours,
+    journal des requêtes lentes et profil ajouté à la réponse si demandé
+    (?profile=true|flame ou en-tête X-Profile).
+    Écrit en ASGI pur pour ne pas bufferiser les réponses en streaming
+    ni empêcher la lecture incrémentale du corps de la requête.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        request = Request(scope)
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        status = 500
+        profile = start_request_profile(
+            request.query_params.get("profile") or request.headers.get("x-profile")
+        )
+        response_start = None
+        body_parts = []
+        
+        async def send_wrapper(message):
+            nonlocal status, response_start
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile.enabled:
+                    response_start = message
+                    return
+            elif message["type"] == "http.response.body" and profile.enabled:
+                body_parts.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                profile.stop_sampling()
+                headers, body = attach_profile(
+                    response_start["headers"], b"".join(body_parts),
+                    profile.summary(time.perf_counter() - start)
+                )
+                await send({**response_start, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+                return
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.stop_sampling()
+            REQUESTS_IN_FLIGHT.dec()
+            elapsed = time.perf_counter() - start
+            # Utiliser le template de route pour garder une cardinalité bornée
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            REQUEST_LATENCY.observe(elapsed, endpoint, scope["method"], str(status))
+            log_slow_request(scope["method"], scope["path"], status, elapsed, profile)
+
+def attach_profile(headers: list, body: bytes, summary: Dict) -> tuple:
+    """
+    Ajouter le profil de la requête dans une réponse JSON (en-têtes et corps mis à jour).
+    Un corps du cache envoyé en gzip est décompressé puis recompressé, et son ETag recalculé.
+    """
+    header_values = {k.lower(): v for k, v in headers}
+    if not header_values.get(b"content-type", b"").startswith(b"application/json"):
+        return headers, body
+    gzipped = header_values.get(b"content-encoding") == b"gzip"
+    try:
+        payload = json.loads(gzip.decompress(body) if gzipped else body)
+    except (ValueError, OSError):
+        return headers, body
+    if not isinstance(payload, dict):
+        return headers, body
+    payload["profile"] = summary
+    body = json.dumps(payload).encode()
+    
+    headers = [(k, v) for k, v in headers if k.lower() not in (b"content-length", b"etag")]
+    if b"etag" in header_values:
+        headers.append((b"etag", body_etag(body).encode()))
+    if gzipped:
+        body = gzip.compress(body, compresslevel=5)
+    headers.append((b"content-length", str(len(body)).encode()))
+    return headers, body
+
+app.add_middleware(ObservabilityMiddleware)
+
 # Global variables for model and data
 model = None
 job_embeddings = None
@@ -53,9 +172,164 @@ jobs_index = None
 course_embeddings = None
 courses_df = None
 
+# Métadonnées des jobs normalisées au chargement : une colonne canonique par champ
+# (tableaux numpy alignés sur job_embeddings) pour éviter jobs_df.iloc par résultat
+JOB_FIELD_SOURCES = {
+    "job_role": ["Job_Role", "title"],
+    "company": ["Company", "company"],
+    "location": ["Location", "location"],
+    "skills_description": ["Skills/Description", "description"],
+}
+job_columns: Dict[str, np.ndarray] = {}
+# Même principe pour les cours, avec les clés de filtre (niveau, fournisseur) en minuscules
+COURSE_TEXT_FIELDS = ("title", "description", "skills")
+COURSE_FILTER_FIELDS = ("level", "provider")
+course_columns: Dict[str, np.ndarray] = {}
+# Index vectoriel des cours (course_embeddings est sa matrice normalisée)
+course_index: Optional[VectorIndex] = None
+# Compétences de chaque cours extraites au chargement (et en minuscules pour la correspondance)
+course_skills: List[List[str]] = []
+course_skill_sets: List[set] = []
+# Index vectoriel des jobs (job_embeddings est la matrice de son segment de base), avec le
+# segment delta des jobs publiés, modifiés ou supprimés depuis le chargement (job_delta.py)
+job_index: Optional[LiveJobIndex] = None
+# Écritures dans l'index (PUT/DELETE /api/jobs) et compaction du delta en arrière-plan
+# (reconstruite hors de job_update_lock, une seule à la fois)
+job_update_lock = threading.Lock()
+job_compact_lock = threading.Lock()
+job_compact_event = threading.Event()
+job_compactor: Optional[threading.Thread] = None
+# Changements appliqués depuis le chargement (job_index_version = version chargée + compteur)
+job_changes = 0
+job_base_version = ""
+# Lignes de l'index chargé au démarrage, servies par les shards (les suivantes sont cherchées localement)
+job_loaded_rows = 0
+# IDs des quasi-doublons fusionnés à la synchronisation (dedup.py) -> ID du job canonique
+job_aliases: Dict[str, str] = {}
+# Graphe kNN précalculé des jobs similaires (job_graph.py) et job_id -> ligne
+similar_jobs_graph: Optional[Dict[str, np.ndarray]] = None
+similar_job_rows: Dict[str, int] = {}
+# Index inversé BM25 des job_text (lexical_index.py), pour retrieval=hybrid/rescore
+lexical_index: Optional[LexicalIndex] = None
+RETRIEVAL_MODES = ("dense", "hybrid", "rescore")
+# hybrid: candidats de chaque liste (dense, BM25) fusionnés par reciprocal rank fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", 200))
+RRF_K = int(os.getenv("RRF_K", 60))
+# rescore: meilleurs candidats BM25 rescorés par similarité cosinus
+RESCORE_MAX_CANDIDATES = int(os.getenv("RESCORE_MAX_CANDIDATES", 2000))
+# Gazetteer local (geo.py) et index spatial des coordonnées des jobs, pour les filtres
+# radius_km / latitude / longitude de /api/recommend-filtered
+gazetteer: Optional[Gazetteer] = None
+geo_index: Optional[GeoIndex] = None
+# Localisations, types de contrat et expériences des jobs en minuscules
+# (filtres par sous-chaîne, sans parcours ligne par ligne)
+job_location_text: Optional[pd.Series] = None
+job_contract_text: Optional[pd.Series] = None
+job_experience_text: Optional[pd.Series] = None
+# Intervalles numériques des jobs (job_ranges.py) pour salary_min/salary_max et experience_level
+salary_ranges: Optional[RangeIndex] = None
+experience_ranges: Optional[RangeIndex] = None
+# Part maximale de jobs retenus par les filtres pour ne calculer la similarité que sur eux
+FILTER_SUBSET_RATIO = float(os.getenv("FILTER_SUBSET_RATIO", 0.5))
+# Shards de l'index des jobs (shard_server.py) interrogés par /api/recommend si JOB_SHARD_URLS
+job_shards: Optional[ShardedJobSearch] = None
+# Compétences extraites de chaque job, calculées à la première utilisation
+job_skills_cache: List[Optional[List[str]]] = []
+# Jobs de recommandation en masse (démarré au startup une fois le modèle chargé)
+bulk_job_manager: Optional[BulkJobManager] = None
+# Embeddings des profils utilisateurs (ouvert à la première utilisation)
+user_profile_store: Optional[UserProfileStore] = None
+# Index des candidats (profils stockés), construit à la première recherche puis mis à jour
+candidate_index: Optional[VectorIndex] = None
+# Profils de compétences des rôles (role_profiles.py) et cache LRU rôle demandé -> profil
+role_profiles: Optional[Dict] = None
+ROLE_CACHE_SIZE = int(os.getenv("ROLE_CACHE_SIZE", 1024))
+role_cache: "OrderedDict[str, int]" = OrderedDict()
+role_cache_lock = threading.Lock()
+# Recommandations précalculées par utilisateur (precompute_recommendations.py)
+precomputed_store: Optional[PrecomputedStore] = None
+# Empreintes des index chargés (une entrée précalculée sur un autre index est ignorée)
+job_index_version = ""
+course_index_version = ""
+
+# Champs disponibles dans une recommandation de job (paramètre fields=)
+JOB_RESULT_FIELDS = (
+    "job_id", "job_role", "company", "location", "skills_description", "score",
+    "explanation", "matching_skills", "missing_skills", "skill_match_percentage"
+)
+# mode=ids : uniquement les identifiants et les scores
+JOB_ID_FIELDS = ("job_id", "score")
+
 # Cache simple pour les recommandations (cache en mémoire)
 recommendation_cache: Dict[str, tuple] = {}
 CACHE_TTL = int(os.getenv("CACHE_TTL_SECONDS", 3600))  # 1 heure par défaut
+# Réponses du cache compressées en gzip à partir de cette taille (0: jamais)
+RESPONSE_GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", 4096))
+# Calculs en cours par clé de cache: les requêtes identiques simultanées partagent le même calcul
+# (job_index_version au lancement, tâche): un calcul lancé avant un changement de l'index n'est pas rejoint
+inflight_requests: Dict[str, tuple] = {}
+coalesced_requests = 0
+
+# Taille maximale d'un micro-batch pour /api/recommend-batch/stream
+STREAM_MAX_BATCH_SIZE = int(os.getenv("STREAM_MAX_BATCH_SIZE", 64))
+
+# Encodage des CVs : "text" (texte concaténé, par défaut) ou "fields" (un embedding
+# par champ, mis en cache par contenu, puis fusion pondérée des champs)
+CV_ENCODING = os.getenv("CV_ENCODING", "text")
+DEFAULT_CV_FIELD_WEIGHTS = {
+    "skills": 3.0,
+    "experience": 2.0,
+    "education": 1.0,
+    "location": 0.5,
+    "contract_type": 0.5,
+    "languages": 0.5,
+    "certifications": 1.0,
+}
+FIELD_EMBEDDING_CACHE_SIZE = int(os.getenv("FIELD_EMBEDDING_CACHE_SIZE", 20000))
+
+def parse_field_weights(value: str) -> Dict[str, float]:
+    """CV_FIELD_WEIGHTS="skills=3,experience=2" (les champs absents gardent leur poids par défaut)"""
+    weights = dict(DEFAULT_CV_FIELD_WEIGHTS)
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, weight = item.partition("=")
+        if name.strip() not in weights:
+            print(f"Warning: unknown CV field '{name.strip()}' in CV_FIELD_WEIGHTS, ignored")
+            continue
+        weights[name.strip()] = float(weight)
+    return weights
+
+CV_FIELD_WEIGHTS = parse_field_weights(os.getenv("CV_FIELD_WEIGHTS", ""))
+# (champ, contenu) -> embedding normalisé, LRU
+field_embedding_cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+field_embedding_lock = threading.Lock()
+
+def _index_items():
+    """Taille des index chargés (évaluée au moment du scrape /metrics)"""
+    return {
+        ("jobs",): len(jobs_df) if jobs_df is not None else 0,
+        ("courses",): len(courses_df) if courses_df is not None else 0,
+        ("candidates",): len(candidate_index) if candidate_index is not None else 0,
+        ("jobs_bm25",): len(lexical_index) if lexical_index is not None else 0,
+        ("jobs_geo",): geo_index.located if geo_index is not None else 0,
+        ("jobs_salary",): int(salary_ranges.known.sum()) if salary_ranges is not None else 0,
+        ("jobs_experience",): int(experience_ranges.known.sum()) if experience_ranges is not None else 0,
+        ("jobs_delta",): job_index.delta_size if job_index is not None else 0,
+    }
+
+def _index_bytes():
+    return {
+        ("jobs",): job_embeddings.nbytes if job_embeddings is not None else 0,
+        ("courses",): course_embeddings.nbytes if course_embeddings is not None else 0,
+        ("candidates",): candidate_index.nbytes if candidate_index is not None else 0,
+        ("jobs_bm25",): lexical_index.nbytes if lexical_index is not None else 0,
+        ("jobs_geo",): geo_index.nbytes if geo_index is not None else 0,
+        ("jobs_salary",): salary_ranges.nbytes if salary_ranges is not None else 0,
+        ("jobs_experience",): experience_ranges.nbytes if experience_ranges is not None else 0,
+        ("jobs_delta",): job_index.delta.nbytes if job_index is not None else 0,
+    }
+
+INDEX_ITEMS.set_function(_index_items)
+INDEX_BYTES.set_function(_index_bytes)
 
 # Request/Response models
 class UserCV(BaseModel):
@@ -84,14 +358,19 @@ class RecommendationFilters(BaseModel):
     salary_min: Optional[float] = None
     salary_max: Optional[float] = None
     contract_type: Optional[str] = None
-    experience_level: Optional[str] = None  # "junior", "mid", "senior"
+    experience_level: Optional[str] = None  # "junior", "mid", "senior" ou années ("3-5 ans")
     company_size: Optional[str] = None  # "startup", "small", "medium", "large"
+    radius_km: Optional[float] = None  # jobs à moins de radius_km de location (ou latitude/longitude)
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
 class RecommendationResponse(BaseModel):
     recommendations: List[JobRecommendation]
     message: str
     total_found: Optional[int] = None
     filters_applied: Optional[Dict] = None
+    partial: Optional[bool] = None
+    missing_shards: Optional[List[str]] = None
 
 class CertificationRecommendation(BaseModel):
     title: str
@@ -108,6 +387,46 @@ class CertificationRecommendationResponse(BaseModel):
     skill_gap: Optional[List[str]] = None
     total_found: Optional[int] = None
 
+class CombinedRecommendationResponse(BaseModel):
+    jobs: RecommendationResponse
+    certifications: Optional[CertificationRecommendationResponse] = None  # None si les cours ne sont pas chargés
+
+class UserProfilePush(BaseModel):
+    profile_version: str  # ex: updatedAt du profil
+    cv: UserCV
+
+class UserProfileItem(UserProfilePush):
+    user_id: str
+
+class UserProfileBatch(BaseModel):
+    profiles: List[UserProfileItem]
+
+class JobPosting(BaseModel):
+    """Job MongoDB (mêmes champs que models/Job.ts, les autres sont ignorés)"""
+    model_config = ConfigDict(populate_by_name=True)
+    id: Optional[str] = Field(None, alias="_id")
+    title: str = ""
+    company: str = ""
+    location: str = ""
+    description: str = ""
+    requirements: List[str] = []
+    skills: List[str] = []
+    experience: str = ""
+    salary: Optional[Dict] = None
+    type: str = ""
+    isActive: bool = True
+
+class JobChanges(BaseModel):
+    upserts: List[JobPosting] = []  # jobs publiés ou modifiés (_id requis)
+    deletes: List[str] = []  # IDs des jobs supprimés
+
+class BulkJobRequest(BaseModel):
+    user_cvs: Optional[List[Dict]] = None  # CVs inline (validés ligne par ligne par le worker)
+    input_path: Optional[str] = None  # ou fichier JSONL (un CV par ligne) sous BULK_JOB_INPUT_DIR
+    top_n: int = Field(5, ge=1, le=50)  # mêmes bornes que /api/recommend, payées pour chaque CV
+    fields: Optional[str] = None
+    mode: Literal["full", "ids"] = "full"
+
 def download_from_s3(bucket_name: str, s3_key: str, local_path: str):
     """Télécharger un fichier depuis S3"""
     if not S3_AVAILABLE:
@@ -191,11 +510,301 @@ def download_data_from_s3(bucket_name: str):
         "data/jobs_index.pkl"
     )
     
+    # Graphe des jobs similaires, profils des rôles, index BM25 et coordonnées (optionnels)
+    download_from_s3(bucket_name, "data/job_knn.npz", KNN_GRAPH_PATH)
+    download_from_s3(bucket_name, "data/role_profiles.npz", ROLE_PROFILES_PATH)
+    download_from_s3(bucket_name, "data/job_bm25.npz", BM25_INDEX_PATH)
+    download_from_s3(bucket_name, "data/job_geo.npz", GEO_INDEX_PATH)
+    
     return embeddings_downloaded and index_downloaded
 
+def build_job_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Normaliser les métadonnées des jobs en tableaux par champ.
+    Pour chaque champ, la première colonne source non vide l'emporte
+    (ex: Job_Role puis title), les valeurs manquantes deviennent "".
+    """
+    columns = {}
+    if "_id" in df.columns:
+        columns["job_id"] = np.array([str(job_id) if pd.notna(job_id) else None for job_id in df["_id"]], dtype=object)
+    else:
+        columns["job_id"] = np.full(len(df), None, dtype=object)
+    for field, sources in JOB_FIELD_SOURCES.items():
+        values = pd.Series("", index=df.index, dtype=object)
+        for source in reversed(sources):
+            if source in df.columns:
+                values = df[source].where(df[source].notna(), values)
+        columns[field] = values.astype(str).to_numpy(dtype=object)
+    return columns
+
+def build_job_aliases(df: pd.DataFrame) -> Dict[str, str]:
+    """
+    ID de chaque quasi-doublon fusionné -> ID du job canonique (colonne duplicate_ids).
+    Sans _id (dataset Kaggle) les membres sont des numéros de ligne d'avant la fusion,
+    qui ne correspondent plus aux lignes chargées: pas d'alias.
+    """
+    if "_id" not in df.columns or "duplicate_ids" not in df.columns:
+        return {}
+    # Un membre republié depuis (segment delta compacté) est un job à part entière
+    loaded = set(df["_id"].dropna().astype(str))
+    return {
+        str(member): str(job_id)
+        for job_id, members in zip(df["_id"].tolist(), df["duplicate_ids"].tolist())
+        if isinstance(members, (list, tuple, np.ndarray))
+        for member in members
+        if str(member) not in loaded
+    }
+
+def canonical_job_id(job_id: str) -> str:
+    """ID du job chargé pour un ID éventuellement fusionné comme quasi-doublon"""
+    return job_aliases.get(job_id, job_id)
+
+def lowercase_text(df: pd.DataFrame, columns) -> pd.Series:
+    """Colonnes texte en minuscules, jointes par un saut de ligne (recherche par sous-chaîne)"""
+    text = pd.Series("", index=df.index, dtype=object)
+    for column in columns:
+        if column in df.columns:
+            text = text + "\n" + df[column].fillna("").astype(str).str.lower()
+    return text
+
+def build_job_rows(df: pd.DataFrame) -> Dict:
+    """Métadonnées par ligne des jobs (colonnes, textes des filtres, intervalles), sans les installer"""
+    ranges = job_ranges(df)
+    return {
+        "jobs_df": df,
+        "job_columns": build_job_columns(df),
+        "job_aliases": build_job_aliases(df),
+        "job_location_text": lowercase_text(df, ("Location", "location")),
+        "job_contract_text": lowercase_text(df, ("Contract_Type", "type")),
+        "job_experience_text": lowercase_text(df, ("Job Experience", "experience")),
+        "salary_ranges": RangeIndex(ranges["salary_min"], ranges["salary_max"]),
+        "experience_ranges": RangeIndex(ranges["experience_min"], ranges["experience_max"]),
+    }
+
+def extend_job_rows(rows: Dict, df: pd.DataFrame) -> Dict:
+    """
+    Métadonnées par ligne (clés de build_job_rows) avec les jobs de df ajoutés à la suite:
+    seules les nouvelles lignes sont analysées, les tableaux existants sont complétés
+    """
+    ranges = job_ranges(df)
+    columns = build_job_columns(df)
+    # Lignes existantes sans colonnes numériques (fichier antérieur, analysé au chargement):
+    # jobs_df n'en a pas non plus pour les nouvelles
+    if not all(column in rows["jobs_df"].columns for column in RANGE_COLUMNS):
+        df = df.drop(columns=list(RANGE_COLUMNS))
+    
+    def append_text(text: pd.Series, sources) -> pd.Series:
+        return pd.concat([text, lowercase_text(df, sources)], ignore_index=True)
+    
+    return {
+        "jobs_df": pd.concat([rows["jobs_df"], df], ignore_index=True),
+        "job_columns": {field: np.concatenate([values, columns[field]]) for field, values in rows["job_columns"].items()},
+        "job_aliases": dict(rows["job_aliases"]),
+        "job_location_text": append_text(rows["job_location_text"], ("Location", "location")),
+        "job_contract_text": append_text(rows["job_contract_text"], ("Contract_Type", "type")),
+        "job_experience_text": append_text(rows["job_experience_text"], ("Job Experience", "experience")),
+        "salary_ranges": rows["salary_ranges"].extend(ranges["salary_min"], ranges["salary_max"]),
+        "experience_ranges": rows["experience_ranges"].extend(ranges["experience_min"], ranges["experience_max"]),
+    }
+
+def installed_job_rows() -> Dict:
+    """Métadonnées par ligne installées (clés de build_job_rows et cache des compétences)"""
+    return {
+        "jobs_df": jobs_df,
+        "job_columns": job_columns,
+        "job_aliases": job_aliases,
+        "job_location_text": job_location_text,
+        "job_contract_text": job_contract_text,
+        "job_experience_text": job_experience_text,
+        "salary_ranges": salary_ranges,
+        "experience_ranges": experience_ranges,
+        "job_skills_cache": job_skills_cache,
+    }
+
+def install_job_rows(rows: Dict):
+    """Installer des métadonnées construites par build_job_rows ou extend_job_rows"""
+    global jobs_df, job_columns, job_skills_cache, job_aliases
+    global job_location_text, job_contract_text, job_experience_text, salary_ranges, experience_ranges
+    jobs_df = rows["jobs_df"]
+    job_columns = rows["job_columns"]
+    job_aliases = rows["job_aliases"]
+    job_location_text = rows["job_location_text"]
+    job_contract_text = rows["job_contract_text"]
+    job_experience_text = rows["job_experience_text"]
+    salary_ranges = rows["salary_ranges"]
+    experience_ranges = rows["experience_ranges"]
+    job_skills_cache = rows["job_skills_cache"] if "job_skills_cache" in rows else [None] * len(jobs_df)
+
+def set_job_rows(df: pd.DataFrame):
+    """Installer les métadonnées par ligne des jobs (colonnes, textes des filtres, intervalles)"""
+    install_job_rows(build_job_rows(df))
+
+def set_jobs_data(df: pd.DataFrame, embeddings: np.ndarray):
+    """Installer l'index des jobs en mémoire (utilisé au chargement et par benchmark.py)"""
+    global job_embeddings, job_index, job_index_version, job_base_version, job_changes, job_loaded_rows
+    set_job_rows(df)
+    job_index = LiveJobIndex(VectorIndex(embeddings, job_columns["job_id"]))
+    job_embeddings = job_index.matrix
+    job_loaded_rows = job_index.rows
+    job_changes = 0
+    job_base_version = job_index_version = embeddings_version(job_embeddings, job_columns["job_id"])
+
+def loaded_job_ids() -> List[str]:
+    """IDs des jobs chargés, comme dans les fichiers dérivés (jobs sans _id, dataset Kaggle: numéro de ligne)"""
+    return [str(job_id) if job_id is not None else str(row) for row, job_id in enumerate(job_columns["job_id"])]
+
+def matches_loaded_jobs(data: Dict) -> bool:
+    """Un fichier dérivé (graphe kNN, BM25, coordonnées) a-t-il été construit sur les jobs chargés"""
+    ids = data["ids"]
+    return len(ids) == len(job_columns["job_id"]) and ids.tolist() == loaded_job_ids()
+
+def load_similar_jobs_graph(path: str = KNN_GRAPH_PATH):
+    """Charger le graphe des jobs similaires s'il correspond aux jobs chargés"""
+    global similar_jobs_graph, similar_job_rows
+    similar_jobs_graph, similar_job_rows = None, {}
+    try:
+        graph = load_knn_graph(path)
+    except Exception as e:
+        print(f"Warning: could not load similar-jobs graph: {e}")
+        return
+    if graph is None:
+        return
+    if not matches_loaded_jobs(graph):
+        print(f"Warning: similar-jobs graph at {path} does not match the loaded jobs, ignored")
+        return
+    similar_jobs_graph = graph
+    similar_job_rows = {job_id: row for row, job_id in enumerate(loaded_job_ids())}
+    print(f"✓ Loaded similar-jobs graph (k={graph['neighbors'].shape[1]})")
+
+def load_lexical_index_data(path: Optional[str] = BM25_INDEX_PATH):
+    """
+    Charger l'index BM25 s'il correspond aux jobs chargés, sinon le construire en mémoire
+    à partir de job_text (path=None: toujours construire)
+    """
+    global lexical_index
+    data = None
+    try:
+        data = load_bm25_index(path) if path else None
+    except Exception as e:
+        print(f"Warning: could not load BM25 index: {e}")
+    if data is not None and not matches_loaded_jobs(data):
+        print(f"Warning: BM25 index at {path} does not match the loaded jobs, rebuilding in memory")
+        data = None
+    if data is None:
+        lexical_index = build_lexical_index(jobs_df)
+        return
+    lexical_index = LexicalIndex(data, len(data["ids"]))
+    print(f"✓ Loaded BM25 index ({len(data['terms'])} terms)")
+
+def build_lexical_index(df: pd.DataFrame) -> Optional[LexicalIndex]:
+    """Index BM25 construit en mémoire à partir de job_text (None sans cette colonne)"""
+    if "job_text" not in df.columns:
+        return None
+    start = time.perf_counter()
+    data = build_bm25_index(df["job_text"].fillna("").astype(str).tolist())
+    print(f"Built BM25 index in memory ({len(data['terms'])} terms, {time.perf_counter() - start:.1f}s)")
+    return LexicalIndex(data, len(df))
+
+def load_geo_index_data(path: Optional[str] = GEO_INDEX_PATH):
+    """
+    Charger les coordonnées des jobs si elles correspondent aux jobs chargés, sinon géocoder
+    leurs localisations en mémoire avec le gazetteer local (path=None: toujours géocoder)
+    """
+    global gazetteer, geo_index
+    try:
+        gazetteer = gazetteer or Gazetteer()
+    except Exception as e:
+        print(f"Warning: could not load gazetteer: {e}")
+        geo_index = None
+        return
+    data = None
+    try:
+        data = load_geo_index(path) if path else None
+    except Exception as e:
+        print(f"Warning: could not load job coordinates: {e}")
+    if data is not None and not matches_loaded_jobs(data):
+        print(f"Warning: job coordinates at {path} do not match the loaded jobs, geocoding in memory")
+        data = None
+    geo_index = build_geo_index(job_columns["location"]) if data is None else GeoIndex(data["latitude"], data["longitude"])
+    print(f"✓ Loaded job coordinates ({geo_index.located}/{len(geo_index)} located, {len(geo_index.points)} places)")
+
+def build_geo_index(locations: np.ndarray) -> GeoIndex:
+    """Coordonnées des jobs géocodées en mémoire avec le gazetteer local"""
+    start = time.perf_counter()
+    data = geocode_locations(locations.tolist(), gazetteer)
+    print(f"Geocoded job locations in memory ({time.perf_counter() - start:.1f}s)")
+    return GeoIndex(data["latitude"], data["longitude"])
+
+def load_role_profiles_data(path: str = ROLE_PROFILES_PATH):
+    """Charger les profils de compétences des rôles s'ils correspondent au modèle chargé"""
+    global role_profiles
+    role_profiles = None
+    with role_cache_lock:
+        role_cache.clear()
+    try:
+        profiles = load_role_profiles(path)
+    except Exception as e:
+        print(f"Warning: could not load role skill profiles: {e}")
+        return
+    if profiles is None or len(profiles["names"]) == 0:
+        return
+    if profiles["centroids"].shape[1] != job_embeddings.shape[1]:
+        print(f"Warning: role skill profiles at {path} do not match the embedding size, ignored")
+        return
+    role_profiles = profiles
+    print(f"✓ Loaded skill profiles of {len(profiles['names'])} job roles")
+
+def build_course_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Métadonnées des cours en tableaux par champ (None/"" pour les valeurs manquantes)"""
+    columns = {}
+    for field in COURSE_TEXT_FIELDS + COURSE_FILTER_FIELDS:
+        if field in df.columns:
+            values = df[field].astype(object).where(df[field].notna(), None)
+        else:
+            values = pd.Series(None, index=df.index, dtype=object)
+        if field in COURSE_TEXT_FIELDS:
+            values = values.fillna("Unknown Course" if field == "title" else "").astype(str)
+        else:
+            values = values.map(lambda v: str(v).strip() if v is not None and str(v).strip() else None)
+            columns[field + "_key"] = values.fillna("").str.lower().to_numpy(dtype=object)
+        columns[field] = values.to_numpy(dtype=object)
+    return columns
+
+def set_courses_data(df: pd.DataFrame, embeddings: np.ndarray):
+    """Installer l'index des cours en mémoire (utilisé au chargement et par benchmark.py)"""
+    global course_embeddings, courses_df, course_index_version, course_index, course_columns
+    global course_skills, course_skill_sets
+    courses_df = df
+    course_columns = build_course_columns(df)
+    course_index = VectorIndex(embeddings)
+    course_embeddings = course_index.matrix
+    course_skills = [
+        extract_skills(f"{description} {skills}")
+        for description, skills in zip(course_columns["description"], course_columns["skills"])
+    ]
+    course_skill_sets = [{skill.lower() for skill in skills} for skills in course_skills]
+    course_index_version = embeddings_version(course_embeddings)
+
+def course_filter_mask(level: Optional[str] = None, provider: Optional[str] = None) -> Optional[np.ndarray]:
+    """Cours correspondant aux filtres (valeurs séparées par des virgules, sans casse), None si aucun filtre"""
+    mask = None
+    for field, value in (("level", level), ("provider", provider)):
+        wanted = [v.strip().lower() for v in (value or "").split(",") if v.strip()]
+        if wanted:
+            field_mask = np.isin(course_columns[field + "_key"], wanted)
+            mask = field_mask if mask is None else mask & field_mask
+    return mask
+
+def embeddings_version(embeddings: np.ndarray, ids=None) -> str:
+    """Empreinte d'un index (vecteurs et identifiants)"""
+    digest = hashlib.blake2b(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes(), digest_size=8)
+    if ids is not None:
+        digest.update("\n".join(str(item_id) for item_id in ids).encode("utf-8"))
+    return digest.hexdigest()
+
 def load_courses_data():
     """Load course/certification data"""
-    global course_embeddings, courses_df
+    global course_embeddings, courses_df, course_index
     
     try:
         course_embeddings_path = os.getenv("COURSE_EMBEDDINGS_PATH", "data/course_embeddings.npy")
@@ -208,19 +817,20 @@ def load_courses_data():
             download_from_gcs(gcs_bucket, "data/courses_index.pkl", course_index_path)
         
         if os.path.exists(course_embeddings_path) and os.path.exists(course_index_path):
-            course_embeddings = np.load(course_embeddings_path)
             with open(course_index_path, "rb") as f:
-                courses_df = pickle.load(f)
+                set_courses_data(pickle.load(f), np.load(course_embeddings_path))
             print(f"✓ Loaded {len(courses_df)} courses and embeddings of shape {course_embeddings.shape}")
         else:
             print("⚠ Course data not found. Certification recommendations will not be available.")
             print("   Run load_courses.py to prepare course data.")
             courses_df = pd.DataFrame()
             course_embeddings = np.array([])
+            course_index = None
     except Exception as e:
         print(f"Error loading course data: {e}")
         courses_df = pd.DataFrame()
         course_embeddings = np.array([])
+        course_index = None
 
 def load_model_and_data():
     """Load the SentenceTransformer model and job embeddings"""
@@ -242,10 +852,13 @@ def load_model_and_data():
         index_path = os.getenv("INDEX_PATH", "data/jobs_index.pkl")
         
         if os.path.exists(embeddings_path) and os.path.exists(index_path):
-            job_embeddings = np.load(embeddings_path)
             with open(index_path, "rb") as f:
-                jobs_df = pickle.load(f)
+                set_jobs_data(pickle.load(f), np.load(embeddings_path))
             print(f"Loaded {len(jobs_df)} jobs and embeddings of shape {job_embeddings.shape}")
+            load_similar_jobs_graph()
+            load_role_profiles_data()
+            load_lexical_index_data()
+            load_geo_index_data()
         else:
             print(f"Warning: Embeddings or index not found at {embeddings_path} or {index_path}")
             print("Please run the initialization script first: python ml-service/init_model.py")
@@ -361,35 +974,116 @@ def download_data_from_gcs(bucket_name: str):
         "data/jobs_index.pkl"
     )
     
+    # Graphe des jobs similaires, profils des rôles, index BM25 et coordonnées (optionnels)
+    download_from_gcs(bucket_name, "data/job_knn.npz", KNN_GRAPH_PATH)
+    download_from_gcs(bucket_name, "data/role_profiles.npz", ROLE_PROFILES_PATH)
+    download_from_gcs(bucket_name, "data/job_bm25.npz", BM25_INDEX_PATH)
+    download_from_gcs(bucket_name, "data/job_geo.npz", GEO_INDEX_PATH)
+    
     return embeddings_downloaded and index_downloaded
 
 # ==================== FONCTIONS UTILITAIRES POUR AMÉLIORATIONS ====================
 
-def extract_skills(text: str) -> List[str]:
-    """Extraire les compétences d'un texte"""
-    if not text:
-        return []
-    
-    # Liste de compétences communes (peut être étendue)
-    common_skills = [
-        "python", "java", "javascript", "react", "node", "sql", "mongodb",
-        "docker", "kubernetes", "aws", "azure", "gcp", "machine learning",
-        "data science", "ai", "deep learning", "tensorflow", "pytorch",
-        "git", "linux", "agile", "scrum", "api", "rest", "graphql"
-    ]
-    
-    text_lower = text.lower()
-    found_skills = []
+def dumps_json(payload) -> bytes:
+    """Sérialiser en JSON (orjson si disponible)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+def json_response(payload, status_code: int = 200) -> Response:
+    """Réponse JSON déjà encodée (pas de re-validation via response_model)"""
+    return Response(content=dumps_json(payload), status_code=status_code, media_type="application/json")
+
+class CachedResponse:
+    """
+    Réponse mise en cache: dict, JSON encodé une seule fois, ETag et version gzip éventuelle.
+    L'encodage est fait par encode() (dans le pool de threads pour les endpoints) ou au
+    premier envoi pour les entrées ajoutées par /api/recommend-batch.
+    """
+    __slots__ = ("payload", "body", "etag", "gzipped")
+
+    def __init__(self, payload: Dict):
+        self.payload = payload
+        self.body: Optional[bytes] = None
+        self.etag = ""
+        self.gzipped: Optional[bytes] = None
+
+    def encode(self) -> "CachedResponse":
+        if self.body is None:
+            body = dumps_json(self.payload)
+            self.etag = body_etag(body)
+            if RESPONSE_GZIP_MIN_BYTES and len(body) >= RESPONSE_GZIP_MIN_BYTES:
+                self.gzipped = gzip.compress(body, compresslevel=5)
+            self.body = body
+        return self
+
+def body_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match contient-il cet ETag (comparaison faible, "*" accepté)"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return any(value == "*" or value.removeprefix("W/") == etag for value in candidates)
+
+def cached_json_response(entry: CachedResponse, request: Optional[Request] = None) -> Response:
+    """Renvoyer les octets du cache tels quels: 304 si le client a déjà cette version, gzip s'il l'accepte"""
+    entry.encode()
+    headers = {"ETag": entry.etag}
+    if entry.gzipped is not None:
+        headers["Vary"] = "Accept-Encoding"
+    if request is not None and etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    if entry.gzipped is not None and request is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=entry.gzipped, media_type="application/json", headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+def encode_texts(texts: List[str], caller: str) -> np.ndarray:
+    """Encoder des textes avec le modèle en enregistrant la taille du batch"""
+    ENCODE_BATCH_SIZE.observe(len(texts), caller)
+    return model.encode(texts, convert_to_numpy=True)
+
+def encode_cvs(user_cvs: List["UserCV"], caller: str) -> np.ndarray:
+    """Embeddings des CVs (une ligne par CV) selon CV_ENCODING"""
+    if CV_ENCODING != "fields":
+        return encode_texts([build_cv_text(user_cv) for user_cv in user_cvs], caller)
     
-    for skill in common_skills:
-        if skill in text_lower:
-            found_skills.append(skill.title())
+    # Champs non vides de chaque CV, puis encodage groupé des contenus absents du cache
+    cv_fields = [
+        [(name, value.strip()) for name in CV_FIELD_WEIGHTS if (value := getattr(user_cv, name) or "").strip()]
+        for user_cv in user_cvs
+    ]
+    keys = {key for fields in cv_fields for key in fields}
+    with field_embedding_lock:
+        cached = {key: field_embedding_cache[key] for key in keys if key in field_embedding_cache}
+        for key in cached:
+            field_embedding_cache.move_to_end(key)
+    missing = [key for key in keys if key not in cached]
+    CACHE_REQUESTS.inc("cv_fields", "hit", amount=len(cached))
+    CACHE_REQUESTS.inc("cv_fields", "miss", amount=len(missing))
     
-    # Extraire aussi les mots en majuscules (souvent des technologies)
-    words = re.findall(r'\b[A-Z][a-z]+\b', text)
-    found_skills.extend([w for w in words if len(w) > 2])
+    if missing:
+        embeddings = encode_texts([value for _, value in missing], caller + "_fields").astype(np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.where(norms > 0, norms, 1.0)
+        with field_embedding_lock:
+            for key, embedding in zip(missing, embeddings):
+                cached[key] = field_embedding_cache[key] = embedding
+            while len(field_embedding_cache) > FIELD_EMBEDDING_CACHE_SIZE:
+                field_embedding_cache.popitem(last=False)
     
-    return list(set(found_skills))[:10]  # Limiter à 10 compétences
+    # Fusion pondérée des champs (normalisée; vecteur nul si le CV est vide)
+    dim = job_embeddings.shape[1]
+    result = np.zeros((len(user_cvs), dim), dtype=np.float32)
+    for row, fields in enumerate(cv_fields):
+        for key in fields:
+            result[row] += CV_FIELD_WEIGHTS[key[0]] * cached[key]
+        norm = np.linalg.norm(result[row])
+        if norm > 0:
+            result[row] /= norm
+    return result
 
 def generate_explanation(
     user_skills: str,
@@ -423,38 +1117,98 @@ def generate_explanation(
 
 def calculate_skill_match(user_skills: str, job_skills: str) -> tuple:
     """Calculer le pourcentage de correspondance des compétences"""
-    user_skill_list = extract_skills(user_skills)
-    job_skill_list = extract_skills(job_skills)
-    
+    return match_skills(extract_skills(user_skills), extract_skills(job_skills))
+
+def match_skills(user_skill_list: List[str], job_skill_list: List[str]) -> tuple:
+    """Comparer des listes de compétences déjà extraites (voir calculate_skill_match)"""
     if not job_skill_list:
         return [], [], 0.0
     
-    matching = [s for s in user_skill_list if s.lower() in [j.lower() for j in job_skill_list]]
-    missing = [s for s in job_skill_list if s.lower() not in [u.lower() for u in user_skill_list]]
+    job_lower = {j.lower() for j in job_skill_list}
+    user_lower = {u.lower() for u in user_skill_list}
+    matching = [s for s in user_skill_list if s.lower() in job_lower]
+    missing = [s for s in job_skill_list if s.lower() not in user_lower]
     
-    match_percentage = (len(matching) / len(job_skill_list) * 100) if job_skill_list else 0.0
+    match_percentage = len(matching) / len(job_skill_list) * 100
     
     return matching[:10], missing[:10], round(match_percentage, 1)
 
+def job_value(field: str, idx: int, index: Optional[LiveJobIndex] = None):
+    """Champ d'un job (colonnes chargées, ou segment delta pour un job publié depuis)"""
+    index = index or job_index
+    if idx < index.base_rows:
+        return job_columns[field][idx]
+    return index.delta_value(field, idx)
+
+def get_job_skills(idx: int) -> List[str]:
+    """Compétences d'un job (extraites une seule fois puis mémorisées)"""
+    index = job_index
+    cache, row = (job_skills_cache, idx) if idx < index.base_rows else (index.delta_skills, idx - index.base_rows)
+    skills = cache[row]
+    if skills is None:
+        skills = extract_skills(job_value("skills_description", idx, index))
+        cache[row] = skills
+    return skills
+
+def resolve_fields(fields: Optional[str], mode: str) -> tuple:
+    """
+    Champs à renvoyer pour chaque recommandation de job.
+    fields= (liste séparée par des virgules) est prioritaire sur mode= ("full" ou "ids").
+    """
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in JOB_RESULT_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(JOB_RESULT_FIELDS)}"
+            )
+        return tuple(f for f in JOB_RESULT_FIELDS if f in requested)
+    if mode == "ids":
+        return JOB_ID_FIELDS
+    if mode != "full":
+        raise HTTPException(status_code=400, detail="mode must be 'full' or 'ids'")
+    return JOB_RESULT_FIELDS
+
+def build_cv_text(user_cv: UserCV) -> str:
+    """Texte combiné du CV utilisé pour l'encodage"""
+    return (
+        f"{user_cv.skills} {user_cv.experience} {user_cv.education} "
+        f"{user_cv.location} {user_cv.contract_type} "
+        f"{user_cv.languages} {user_cv.certifications}"
+    )
+
 def hash_cv(user_cv: UserCV) -> str:
-    """Créer un hash du CV pour le cache"""
-    cv_string = f"{user_cv.skills}|{user_cv.experience}|{user_cv.education}|{user_cv.location}"
+    """Créer un hash du CV pour le cache (tous les champs encodés ou comparés)"""
+    cv_string = "|".join(
+        getattr(user_cv, name) or ""
+        for name in ("skills", "experience", "education", "location", "contract_type", "languages", "certifications")
+    )
     return hashlib.md5(cv_string.encode()).hexdigest()
 
-def get_cached_recommendations(cache_key: str) -> Optional[RecommendationResponse]:
-    """Récupérer des recommandations depuis le cache"""
+def get_cached_recommendations(cache_key: str) -> Optional[CachedResponse]:
+    """Récupérer des recommandations (déjà sérialisées) depuis le cache"""
     if cache_key in recommendation_cache:
         result, timestamp = recommendation_cache[cache_key]
         if time.time() - timestamp < CACHE_TTL:
+            CACHE_REQUESTS.inc("recommendations", "hit")
             return result
         else:
             # Cache expiré, supprimer
             del recommendation_cache[cache_key]
+    CACHE_REQUESTS.inc("recommendations", "miss")
     return None
 
-def set_cached_recommendations(cache_key: str, result: RecommendationResponse):
-    """Mettre en cache des recommandations"""
-    recommendation_cache[cache_key] = (result, time.time())
+def set_cached_recommendations(cache_key: str, result: CachedResponse, version: str):
+    """Mettre en cache des recommandations calculées sur la version version de l'index des jobs"""
+    entry = (result, time.time())
+    recommendation_cache[cache_key] = entry
+    # Index modifié pendant le calcul: résultat servi mais pas gardé. Vérifié après l'écriture
+    # car les changements de l'index mettent à jour job_index_version avant de vider le cache
+    if version != job_index_version:
+        if recommendation_cache.get(cache_key) is entry:
+            recommendation_cache.pop(cache_key, None)
+        return
     # Limiter la taille du cache (garder les 1000 plus récents)
     if len(recommendation_cache) > 1000:
         # Supprimer les plus anciens
@@ -462,58 +1216,327 @@ def set_cached_recommendations(cache_key: str, result: RecommendationResponse):
                         key=lambda k: recommendation_cache[k][1])
         del recommendation_cache[oldest_key]
 
-def apply_filters(
-    jobs_df: pd.DataFrame,
-    scores: np.ndarray,
-    filters: RecommendationFilters
-) -> np.ndarray:
-    """Appliquer des filtres aux jobs et ajuster les scores"""
+async def get_or_compute_recommendations(
+    cache_key: str,
+    compute: Callable[[], Dict],
+    timer: StageTimer
+) -> CachedResponse:
+    """
+    Lire le cache, sinon calculer une seule fois par clé (single-flight).
+    Le premier appel lance le calcul (et la sérialisation) dans le pool de threads; les
+    requêtes identiques qui arrivent pendant ce calcul attendent le même résultat.
+    """
+    global coalesced_requests
+    payload = get_cached_recommendations(cache_key)
+    timer.lap("cache_lookup")
+    if payload is not None:
+        return payload
+    
+    version = job_index_version
+    running = inflight_requests.get(cache_key)
+    if running is not None and running[0] == version:
+        task = running[1]
+        coalesced_requests += 1
+        CACHE_REQUESTS.inc("recommendations", "coalesced")
+        payload = await asyncio.shield(task)
+        timer.lap("coalesced_wait")
+        return payload
+    
+    def compute_entry() -> CachedResponse:
+        # Thread du pool: échantillonné avec la requête (profile=flame) le temps du calcul
+        with profile_thread():
+            entry = CachedResponse(compute()).encode()
+            timer.lap("serialization")
+        return entry
+    
+    async def compute_and_store() -> CachedResponse:
+        try:
+            result = await run_in_threadpool(compute_entry)
+            # Résultat partiel (shard sans réponse): servi mais pas mis en cache
+            if not result.payload.get("partial"):
+                set_cached_recommendations(cache_key, result, version)
+            return result
+        finally:
+            # Une tâche lancée après un changement de l'index a pu la remplacer
+            if inflight_requests.get(cache_key) is inflight:
+                del inflight_requests[cache_key]
+    
+    # Tâche séparée: l'annulation de la première requête n'interrompt pas les autres
+    task = asyncio.ensure_future(compute_and_store())
+    inflight = (version, task)
+    inflight_requests[cache_key] = inflight
+    payload = await asyncio.shield(task)
+    timer.lap("cache_store")
+    return payload
+
+def fit_rows(values: np.ndarray, rows: int, fill) -> np.ndarray:
+    """
+    Tableau par ligne de job ajusté à rows lignes: les jobs du segment delta ne sont dans
+    les structures par ligne (filtres, BM25, coordonnées) qu'après la compaction (valeur fill)
+    """
+    if len(values) >= rows:
+        return values[:rows]
+    return np.concatenate([values, np.full(rows - len(values), fill, dtype=values.dtype)])
+
+def masked_job_scores(cv_emb: np.ndarray, mask: Optional[np.ndarray]) -> np.ndarray:
+    """
+    Similarité du CV avec les jobs qui passent les filtres (-1 pour les autres).
+    Si les filtres retiennent peu de jobs, seules leurs lignes de l'index sont lues.
+    """
+    index = job_index
+    if mask is None:
+        return index.scores(cv_emb)[0]
+    mask = fit_rows(mask, index.rows, False)
+    candidates = np.flatnonzero(mask)
+    if len(candidates) > len(mask) * FILTER_SUBSET_RATIO:
+        scores = index.scores(cv_emb)[0]
+        scores[~mask] = -1  # Score négatif pour exclure
+        return scores
+    scores = np.full(len(mask), -1.0, dtype=np.float32)
+    if len(candidates):
+        scores[candidates] = index.scores_rows(cv_emb, candidates)[0]
+    return scores
+
+def geo_center(filters: RecommendationFilters) -> Optional[tuple]:
+    """
+    Centre et rayon (latitude, longitude, km) d'un filtre géographique, None sans filtre géographique:
+    - radius_km avec latitude/longitude, ou avec location résolue par le gazetteer
+    - latitude/longitude seules: ville la plus proche du point, rayon GEO_CITY_RADIUS_KM
+    """
+    has_point = filters.latitude is not None and filters.longitude is not None
+    if filters.radius_km is None and not has_point:
+        return None
+    if geo_index is None or gazetteer is None:
+        raise HTTPException(status_code=503, detail="Job coordinates not loaded (gazetteer missing)")
+    if filters.radius_km is not None and filters.radius_km <= 0:
+        raise HTTPException(status_code=400, detail="radius_km must be positive")
+    if has_point:
+        if not (-90 <= filters.latitude <= 90 and -180 <= filters.longitude <= 180):
+            raise HTTPException(status_code=400, detail="latitude/longitude out of range")
+        if filters.radius_km is not None:
+            return filters.latitude, filters.longitude, filters.radius_km
+        city = gazetteer.nearest_city(filters.latitude, filters.longitude)
+        return (*gazetteer.coordinates(city), GEO_CITY_RADIUS_KM)
+    city = gazetteer.geocode(filters.location) if filters.location else None
+    if city is None:
+        raise HTTPException(status_code=400, detail=f"Unknown location for radius_km: {filters.location!r}")
+    return (*gazetteer.coordinates(city), filters.radius_km)
+
+def contains_text(text: pd.Series, value: str) -> np.ndarray:
+    """Jobs dont le texte en minuscules contient value"""
+    return text.str.contains(value.lower(), regex=False).to_numpy(dtype=bool)
+
+def filter_mask(jobs_df: pd.DataFrame, filters: RecommendationFilters) -> np.ndarray:
+    """Jobs qui passent les filtres (tableau booléen)"""
     mask = np.ones(len(jobs_df), dtype=bool)
     
-    # Filtre par localisation
-    if filters.location:
-        location_lower = filters.location.lower()
-        mask = mask & jobs_df.apply(
-            lambda row: location_lower in str(row.get("Location", "")).lower() or
-                       location_lower in str(row.get("location", "")).lower(),
-            axis=1
-        )
+    # Filtre géographique (index spatial), sinon par localisation (sous-chaîne)
+    center = geo_center(filters)
+    if center is not None:
+        mask &= fit_rows(geo_index.within(*center), len(mask), False)
+    elif filters.location:
+        mask &= fit_rows(contains_text(job_location_text, filters.location), len(mask), False)
     
     # Filtre par type de contrat
     if filters.contract_type:
-        contract_lower = filters.contract_type.lower()
-        mask = mask & jobs_df.apply(
-            lambda row: contract_lower in str(row.get("Contract_Type", "")).lower() or
-                       contract_lower in str(row.get("type", "")).lower(),
-            axis=1
-        )
+        mask &= fit_rows(contains_text(job_contract_text, filters.contract_type), len(mask), False)
     
-    # Filtre par salaire (si disponible dans les données)
+    # Filtre par salaire: intervalles qui croisent [salary_min, salary_max]
+    # (les jobs sans salaire connu ne sont pas exclus)
     if filters.salary_min or filters.salary_max:
-        def salary_filter(row):
-            salary = row.get("salary", row.get("Salary", 0))
-            if isinstance(salary, (int, float)) and salary > 0:
-                if filters.salary_min and salary < filters.salary_min:
-                    return False
-                if filters.salary_max and salary > filters.salary_max:
-                    return False
-            return True
-        mask = mask & jobs_df.apply(salary_filter, axis=1)
+        salary = salary_ranges
+        matching = salary.overlapping(filters.salary_min or None, filters.salary_max or None) | ~salary.known
+        mask &= fit_rows(matching, len(mask), False)
     
-    # Filtre par niveau d'expérience
+    # Filtre par niveau d'expérience: "junior"/"mid"/"senior", ou années ("3-5 ans");
+    # sinon recherche du texte dans l'expérience demandée par le job
     if filters.experience_level:
-        exp_lower = filters.experience_level.lower()
-        mask = mask & jobs_df.apply(
-            lambda row: exp_lower in str(row.get("Job Experience", "")).lower() or
-                       exp_lower in str(row.get("experience", "")).lower(),
-            axis=1
+        level = experience_level(filters.experience_level)
+        low, high = parse_experience(filters.experience_level)
+        if level is not None:
+            matching = experience_ranges.overlapping_level(*EXPERIENCE_LEVELS[level])
+        elif not np.isnan(low):
+            matching = experience_ranges.overlapping(low, high)
+        else:
+            matching = contains_text(job_experience_text, filters.experience_level.strip())
+        mask &= fit_rows(matching, len(mask), False)
+    
+    return mask
+
+def resolve_retrieval(retrieval: str) -> str:
+    """Vérifier le mode de récupération demandé (retrieval=)"""
+    if retrieval not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"retrieval must be one of: {', '.join(RETRIEVAL_MODES)}")
+    if retrieval != "dense" and lexical_index is None:
+        raise HTTPException(status_code=503, detail="BM25 index not loaded (job_text missing)")
+    return retrieval
+
+def dense_job_search(cv_emb: np.ndarray, k: int, timer: StageTimer) -> tuple:
+    """
+    Les k jobs les plus proches d'un embedding: (lignes ordonnées, similarités, shards manquants).
+    Avec des shards, la requête est envoyée à chacun et leurs top-k fusionnés; un shard en
+    erreur ou trop lent est ignoré (résultat partiel), l'index local sert si aucun ne répond.
+    Les similarités des jobs non renvoyés valent -1.
+    Les shards servent les jobs chargés au démarrage: les jobs publiés depuis sont évalués
+    localement et les jobs supprimés écartés des top-k (demandés d'autant plus grands).
+    """
+    index = job_index
+    shards = job_shards
+    if shards is not None:
+        rows, shard_scores, missing = shards.search(
+            cv_emb, min(k + index.tombstones, SHARD_MAX_K), job_loaded_rows
         )
+        timer.lap("shard_search")
+        for url in shards.urls:
+            SHARD_REQUESTS.inc(url, missing[url].split(":")[0] if url in missing else "ok")
+        if len(missing) < len(shards):
+            published = np.arange(job_loaded_rows, index.rows)
+            scores = np.full(job_loaded_rows + len(published), -1.0, dtype=np.float32)
+            scores[rows] = shard_scores
+            if len(published):
+                scores[published] = index.scores_rows(cv_emb, published)[0]
+                rows = np.concatenate([rows, published])
+            if index.tombstones:
+                active = index.active[:len(scores)]
+                scores[~active] = -1.0
+                rows = rows[active[rows]]
+            return rows[top_k(scores[rows], k)], scores, sorted(missing)
+        print(f"Warning: no job shard answered ({missing}), searching the local index")
+    
+    scores = index.scores(cv_emb)[0]
+    timer.lap("similarity")
+    top_idx = top_k(scores, k)
+    timer.lap("top_k")
+    return top_idx, scores, []
+
+def retrieve_jobs(
+    user_cv: UserCV,
+    cv_emb: np.ndarray,
+    k: int,
+    retrieval: str,
+    timer: StageTimer,
+    mask: Optional[np.ndarray] = None
+) -> tuple:
+    """
+    Les k meilleurs jobs pour un CV: (lignes ordonnées, similarités cosinus).
+    - dense:   similarité avec tous les jobs
+    - hybrid:  HYBRID_CANDIDATES meilleurs jobs denses et BM25 fusionnés par RRF
+    - rescore: similarité calculée seulement sur les meilleurs candidats BM25
+               (tous les jobs si aucun terme du CV n'est indexé)
+    Les similarités des jobs non évalués valent -1.
+    """
+    index = job_index
+    if mask is not None:
+        mask = fit_rows(mask, index.rows, False)
+    if retrieval != "dense":
+        lexical = fit_rows(lexical_index.scores(build_cv_text(user_cv)), index.rows, 0.0)
+        matched = lexical > 0 if mask is None else (lexical > 0) & mask
+        if index.tombstones:
+            matched &= index.active[:len(matched)]
+        timer.lap("lexical")
     
-    # Appliquer le masque aux scores (mettre à 0 les jobs filtrés)
-    filtered_scores = scores.copy()
-    filtered_scores[~mask] = -1  # Score négatif pour exclure
+    if retrieval == "rescore" and matched.any():
+        candidates = top_k(lexical, RESCORE_MAX_CANDIDATES, matched)
+        scores = np.full(len(lexical), -1.0, dtype=np.float32)
+        scores[candidates] = index.scores_rows(cv_emb, candidates)[0]
+        timer.lap("similarity")
+        top_idx = candidates[top_k(scores[candidates], k)]
+        timer.lap("top_k")
+        return top_idx, scores
     
-    return filtered_scores
+    scores = index.scores(cv_emb)[0]
+    timer.lap("similarity")
+    if retrieval != "hybrid":
+        top_idx = top_k(scores, k, mask)
+        timer.lap("top_k")
+        return top_idx, scores
+    
+    dense_top = top_k(scores, HYBRID_CANDIDATES, mask)
+    lexical_top = top_k(lexical, HYBRID_CANDIDATES, matched)
+    fused = np.zeros(len(scores), dtype=np.float64)
+    fused[dense_top] += 1.0 / (RRF_K + np.arange(1, len(dense_top) + 1))
+    fused[lexical_top] += 1.0 / (RRF_K + np.arange(1, len(lexical_top) + 1))
+    union = np.union1d(dense_top, lexical_top)
+    top_idx = union[top_k(fused[union], k)]
+    timer.lap("top_k")
+    return top_idx, scores
+
+def gather_job_rows(indices: np.ndarray, fields=None) -> Dict[str, list]:
+    """Récupérer en une fois les champs (tous par défaut) de tous les jobs indiqués"""
+    index = job_index
+    columns = job_columns
+    if not len(indices) or np.max(indices) < index.base_rows:
+        return {
+            field: column[indices].tolist()
+            for field, column in columns.items()
+            if fields is None or field in fields
+        }
+    return {
+        field: [job_value(field, idx, index) for idx in np.asarray(indices).tolist()]
+        for field in columns
+        if fields is None or field in fields
+    }
+
+def build_job_recommendations(
+    user_skills: str,
+    top_idx: np.ndarray,
+    scores: np.ndarray,
+    top_n: int,
+    timer: StageTimer,
+    fields: tuple = JOB_RESULT_FIELDS
+) -> List[Dict]:
+    """
+    Construire les recommandations (dicts prêts pour le JSON) à partir des meilleurs indices,
+    en ignorant les offres sans compétence correspondante.
+    Seuls les champs demandés sont matérialisés (textes, explication).
+    """
+    rows = gather_job_rows(top_idx, fields)
+    percent_scores = np.round((scores[top_idx] * 100).astype(np.float64), 2).tolist()
+    user_skill_list = extract_skills(user_skills)
+    with_explanation = "explanation" in fields
+    active = job_index.active if job_index.tombstones else None
+    timer.lap("row_access")
+    
+    recommendations = []
+    for i, idx in enumerate(top_idx.tolist()):
+        # Job supprimé depuis le chargement (score -1, retenu si k dépasse les jobs actifs)
+        if active is not None and not active[idx]:
+            continue
+        
+        # Calculer la correspondance des compétences
+        matching_skills, missing_skills, skill_match_pct = match_skills(user_skill_list, get_job_skills(idx))
+        timer.lap("skill_match")
+        
+        # Filtrer les offres avec 0 compétences correspondantes
+        if not matching_skills or skill_match_pct == 0:
+            continue
+        
+        values = {
+            "score": percent_scores[i],
+            "matching_skills": matching_skills if matching_skills else None,
+            "missing_skills": missing_skills if missing_skills else None,
+            "skill_match_percentage": skill_match_pct,
+        }
+        if with_explanation:
+            values["explanation"] = generate_explanation(
+                user_skills,
+                job_value("skills_description", idx),
+                values["score"],
+                matching_skills,
+                missing_skills
+            )
+            timer.lap("explanation")
+        
+        recommendations.append({
+            field: rows[field][i] if field in rows else values[field]
+            for field in fields
+        })
+        
+        # Limiter au nombre demandé après filtrage
+        if len(recommendations) >= top_n:
+            break
+    
+    return recommendations
 
 @app.on_event("startup")
 async def startup_event():
@@ -556,8 +1579,140 @@ async def startup_event():
     load_model_and_data()
     # Charger les données de certifications
     load_courses_data()
-    # Charger les données de certifications
-    load_courses_data()
+    # Recherche dense répartie sur les shards de l'index des jobs
+    start_job_shards()
+    # Compaction des jobs publiés, modifiés ou supprimés depuis le chargement
+    start_job_compactor()
+    # Reprendre les jobs de recommandation en masse non terminés
+    start_bulk_jobs()
+
+def start_job_shards():
+    """Client scatter-gather des shards (JOB_SHARD_URLS), l'index local reste le repli"""
+    global job_shards
+    if JOB_SHARD_URLS and job_shards is None:
+        job_shards = ShardedJobSearch(JOB_SHARD_URLS)
+        print(f"✓ Dense job search sharded over {len(job_shards)} shards: {', '.join(JOB_SHARD_URLS)}")
+
+def apply_job_changes(postings: List[JobPosting], deletes: List[str]) -> Dict:
+    """
+    Appliquer des jobs publiés/modifiés et supprimés à l'index servi: les nouveaux textes sont
+    encodés en un batch puis ajoutés au segment delta, les anciennes versions et les jobs
+    supprimés ou désactivés deviennent des tombstones
+    """
+    global job_changes, job_index_version
+    deletes = list(deletes) + [posting.id for posting in postings if not posting.isActive]
+    postings = [posting for posting in postings if posting.isActive]
+    embeddings, frame, columns = None, None, {}
+    if postings:
+        frame = jobs_dataframe([{**posting.model_dump(exclude={"id"}), "_id": posting.id} for posting in postings])
+        for column, values in parse_job_ranges(frame).items():
+            frame[column] = values
+        embeddings = encode_texts(frame["job_text"].tolist(), "job_changes")
+        columns = build_job_columns(frame)
+    
+    with job_update_lock:
+        index = job_index
+        for i, posting in enumerate(postings):
+            index.add(
+                posting.id, embeddings[i], frame.iloc[[i]],
+                {field: values[i] for field, values in columns.items()}
+            )
+            job_aliases.pop(posting.id, None)
+        removed = sum(index.remove(job_id) for job_id in deletes)
+        job_changes += 1
+        job_index_version = f"{job_base_version}+{job_changes}"
+        # Les recommandations en cache ne voient pas les changements
+        recommendation_cache.clear()
+    JOB_CHANGES.inc("upsert", amount=len(postings))
+    JOB_CHANGES.inc("delete", amount=removed)
+    if index.delta_size >= JOB_DELTA_MAX_ROWS:
+        job_compact_event.set()
+    return {"indexed": len(postings), "removed": removed, "delta_jobs": index.delta_size, "tombstones": index.tombstones}
+
+def compact_job_index() -> int:
+    """
+    Fusionner le segment delta dans la base: ses lignes sont ajoutées à la suite des métadonnées,
+    de l'index BM25 et des coordonnées, sans reconstruire les lignes existantes (numéros inchangés,
+    tombstones conservés jusqu'à la prochaine synchronisation). L'extension se fait hors de
+    job_update_lock: les changements arrivés entre-temps restent dans le delta du nouvel index.
+    Renvoie le nombre de lignes fusionnées.
+    """
+    global job_index, job_embeddings, lexical_index, geo_index, job_changes, job_index_version
+    with job_compact_lock:
+        with job_update_lock:
+            index = job_index
+            if index is None or not index.delta_size:
+                return 0
+            rows = index.rows
+            base_rows = installed_job_rows()
+            base_lexical_index, base_geo_index = lexical_index, geo_index
+            frames = index.delta_frames[:index.delta_size]
+            skills = index.delta_skills[:index.delta_size]
+        
+        start = time.perf_counter()
+        delta_df = pd.concat(frames, ignore_index=True)
+        new_rows = extend_job_rows(base_rows, delta_df)
+        new_rows["job_skills_cache"] = base_rows["job_skills_cache"] + skills
+        new_lexical_index = None
+        if base_lexical_index is not None:
+            new_lexical_index = base_lexical_index.extend(delta_df["job_text"].fillna("").astype(str).tolist())
+        new_geo_index = None
+        if base_geo_index is not None:
+            locations = new_rows["job_columns"]["location"][len(base_rows["jobs_df"]):]
+            coordinates = geocode_locations(locations.tolist(), gazetteer)
+            new_geo_index = base_geo_index.extend(coordinates["latitude"], coordinates["longitude"])
+        
+        with job_update_lock:
+            if job_index is not index:
+                # Jobs rechargés pendant l'extension (synchronisation): le delta n'existe plus
+                return 0
+            compacted = index.compact(rows)
+            install_job_rows(new_rows)
+            for job_id in compacted.delta_ids:
+                job_aliases.pop(job_id, None)
+            lexical_index, geo_index = new_lexical_index, new_geo_index
+            job_index = compacted
+            job_embeddings = compacted.matrix
+            # Les réponses en cache ont été calculées sans les lignes du delta dans les filtres,
+            # BM25 et coordonnées (fit_rows): nouvelle version, comme apply_job_changes
+            job_changes += 1
+            job_index_version = f"{job_base_version}+{job_changes}"
+            recommendation_cache.clear()
+    merged = len(frames)
+    print(f"✓ Compacted {merged} new job rows into the index "
+          f"({compacted.rows} rows, {compacted.tombstones} deleted, {time.perf_counter() - start:.1f}s)")
+    return merged
+
+def start_job_compactor():
+    """Compaction du segment delta en arrière-plan (toutes les JOB_COMPACT_INTERVAL secondes ou delta plein)"""
+    global job_compactor
+    if job_compactor is not None:
+        return
+    
+    def run():
+        while True:
+            job_compact_event.wait(JOB_COMPACT_INTERVAL)
+            job_compact_event.clear()
+            try:
+                compact_job_index()
+            except Exception as e:
+                print(f"Warning: job index compaction failed: {e}")
+    
+    job_compactor = threading.Thread(target=run, name="job-compactor", daemon=True)
+    job_compactor.start()
+
+def start_bulk_jobs():
+    """Démarrer le pool de workers des jobs en masse (reprend les jobs interrompus)"""
+    global bulk_job_manager
+    if model is None or job_embeddings is None or bulk_job_manager is not None:
+        return
+    bulk_job_manager = BulkJobManager(
+        BulkJobStore(BULK_JOBS_DIR),
+        parse_cv_line,
+        lambda batch, top_n, fields: score_cv_batch(batch, top_n, fields, "bulk_job")
+    )
+    bulk_job_manager.start()
+    BULK_JOBS.set_function(lambda: {(status,): count for status, count in bulk_job_manager.counts().items()})
 
 @app.get("/")
 async def root():
@@ -566,7 +1721,7 @@ async def root():
         "status": "ok",
         "message": "CareerNetwork ML Service is running",
         "model_loaded": model is not None,
-        "jobs_count": len(jobs_df) if jobs_df is not None else 0
+        "jobs_count": len(job_index) if job_index is not None else 0
     }
 
 @app.get("/health")
@@ -575,22 +1730,34 @@ async def health():
     return {
         "status": "healthy",
         "model_loaded": model is not None,
-        "jobs_count": len(jobs_df) if jobs_df is not None else 0,
+        "jobs_count": len(job_index) if job_index is not None else 0,
         "courses_count": len(courses_df) if courses_df is not None else 0
     }
 
 @app.post("/api/recommend", response_model=RecommendationResponse)
-async def recommend_jobs(user_cv: UserCV, top_n: int = Query(5, ge=1, le=50)):
+async def recommend_jobs(
+    user_cv: UserCV,
+    top_n: int = Query(5, ge=1, le=50),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    mode: str = Query("full", description="'full' or 'ids' (job_id and score only)"),
+    retrieval: str = Query("dense", description="'dense', 'hybrid' (BM25 + vectors, RRF) or 'rescore' (vectors on BM25 candidates)"),
+    request: Request = None
+):
     """
     Get job recommendations based on user CV with explanations
     
     Args:
         user_cv: User CV information
         top_n: Number of recommendations to return (default: 5)
+        fields: Fields to include in each recommendation (overrides mode)
+        mode: "full" (default) or "ids" for a lightweight response
+        retrieval: "dense" (default), "hybrid" or "rescore"
     
     Returns:
         List of recommended jobs with similarity scores and explanations
     """
+    result_fields = resolve_fields(fields, mode)
+    retrieval = resolve_retrieval(retrieval)
     if model is None or job_embeddings is None or jobs_df is None or len(jobs_df) == 0:
         raise HTTPException(
             status_code=503,
@@ -598,93 +1765,518 @@ async def recommend_jobs(user_cv: UserCV, top_n: int = Query(5, ge=1, le=50)):
         )
     
     try:
-        # Vérifier le cache
-        cache_key = hash_cv(user_cv) + f"|{top_n}"
-        cached_result = get_cached_recommendations(cache_key)
-        if cached_result:
-            return cached_result
-        
-        # Create combined text from user CV
-        cv_text = (
-            f"{user_cv.skills} {user_cv.experience} {user_cv.education} "
-            f"{user_cv.location} {user_cv.contract_type} "
-            f"{user_cv.languages} {user_cv.certifications}"
+        timer = StageTimer("recommend")
+        record_request_input(user_cv=user_cv, top_n=top_n, fields=result_fields, retrieval=retrieval)
+        entry = await get_or_compute_recommendations(
+            recommend_cache_key(user_cv, top_n, result_fields, retrieval),
+            lambda: compute_recommend_jobs(user_cv, top_n, timer, result_fields, retrieval),
+            timer
         )
-        
-        # Encode user CV
-        cv_emb = model.encode([cv_text], convert_to_numpy=True)
-        
-        # Calculate cosine similarity
-        scores = cosine_similarity(cv_emb, job_embeddings).flatten()
-        
+        response = cached_json_response(entry, request)
+        timer.lap("serialization")
+        timer.finish()
+        return response
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
+
+def recommend_jobs_payload(
+    user_cv: UserCV,
+    top_n: int,
+    timer: StageTimer,
+    fields: tuple = JOB_RESULT_FIELDS
+) -> Dict:
+    """Calculer (ou lire depuis le cache) la réponse de /api/recommend sous forme de dict"""
+    # Vérifier le cache
+    cache_key = recommend_cache_key(user_cv, top_n, fields)
+    version = job_index_version
+    cached_result = get_cached_recommendations(cache_key)
+    timer.lap("cache_lookup")
+    if cached_result:
+        return cached_result.payload
+    
+    result = compute_recommend_jobs(user_cv, top_n, timer, fields)
+    
+    # Mettre en cache (sauf résultat partiel d'un shard sans réponse)
+    if not result.get("partial"):
+        set_cached_recommendations(cache_key, CachedResponse(result), version)
+    timer.lap("cache_store")
+    
+    return result
+
+def recommend_cache_key(user_cv: UserCV, top_n: int, fields: tuple, retrieval: str = "dense") -> str:
+    key = hash_cv(user_cv) + f"|{top_n}|{','.join(fields)}"
+    return key if retrieval == "dense" else f"{key}|{retrieval}"
+
+def compute_recommend_jobs(
+    user_cv: UserCV,
+    top_n: int,
+    timer: StageTimer,
+    fields: tuple = JOB_RESULT_FIELDS,
+    retrieval: str = "dense"
+) -> Dict:
+    """Réponse de /api/recommend calculée sans cache"""
+    # Encode user CV
+    cv_emb = encode_cvs([user_cv], "recommend")
+    timer.lap("encode")
+    
+    # Get top N*2 recommendations initially to filter out those with 0 matching skills
+    missing_shards = []
+    if retrieval == "dense":
+        top_idx, scores, missing_shards = dense_job_search(cv_emb, top_n * 2, timer)
+    else:
+        top_idx, scores = retrieve_jobs(user_cv, cv_emb, top_n * 2, retrieval, timer)
+    
+    return recommendations_from_scores(user_cv, scores, top_n, timer, fields, top_idx, missing_shards)
+
+def recommendations_from_scores(
+    user_cv: UserCV,
+    scores: np.ndarray,
+    top_n: int,
+    timer: StageTimer,
+    fields: tuple = JOB_RESULT_FIELDS,
+    top_idx: Optional[np.ndarray] = None,
+    missing_shards: Optional[List[str]] = None
+) -> Dict:
+    """
+    Réponse de /api/recommend à partir des scores de similarité d'un CV (top_idx: candidats
+    déjà ordonnés; missing_shards: shards sans réponse, le résultat est alors partiel)
+    """
+    if top_idx is None:
         # Get top N*2 recommendations initially to filter out those with 0 matching skills
-        top_idx = scores.argsort()[::-1][:top_n * 2]
+        top_idx = top_k(scores, top_n * 2)
+        timer.lap("top_k")
+    
+    recommendations = build_job_recommendations(user_cv.skills, top_idx, scores, top_n, timer, fields)
+    
+    payload = {
+        "recommendations": recommendations,
+        "message": f"Found {len(recommendations)} recommendations",
+        "total_found": len(recommendations),
+        "filters_applied": None,
+    }
+    if missing_shards:
+        payload["partial"] = True
+        payload["missing_shards"] = missing_shards
+    return payload
+
+@app.get("/api/recommend/by-user/{user_id}", response_model=RecommendationResponse)
+async def recommend_jobs_by_user(
+    user_id: str,
+    top_n: int = Query(5, ge=1, le=50),
+    profile_version: Optional[str] = Query(None, description="Expected profile version (409 if the stored one differs)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    mode: str = Query("full", description="'full' or 'ids' (job_id and score only)"),
+    request: Request = None
+):
+    """
+    Get job recommendations for a user whose profile embedding is stored
+    
+    The profile must have been pushed with PUT /api/users/{user_id}/profile (or
+    POST /api/users/profiles, used by sync_user_profiles.py): no text building nor
+    encoding happens here. Returns 404 if the profile is unknown and 409 if it is
+    stale (other profile_version or encoded with another model), so the caller can
+    push it again. Results precomputed by precompute_recommendations.py for this
+    profile version and the loaded index are served as is.
+    """
+    result_fields = resolve_fields(fields, mode)
+    if model is None or job_embeddings is None or jobs_df is None or len(jobs_df) == 0:
+        raise HTTPException(
+            status_code=503,
+            detail="Model or job data not loaded. Please run the initialization script first."
+        )
+    
+    timer = StageTimer("recommend_by_user")
+    record_request_input(user_id=user_id, top_n=top_n, profile_version=profile_version, fields=result_fields)
+    profile = get_user_profile_store().get(user_id)
+    timer.lap("profile_lookup")
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"No stored profile for user {user_id}")
+    if profile_version is not None and profile["profile_version"] != profile_version:
+        raise HTTPException(status_code=409, detail="Stored profile version is stale")
+    if profile["model"] != embedding_model_id():
+        raise HTTPException(status_code=409, detail="Stored profile was encoded with another model")
+    
+    try:
+        precomputed = get_precomputed_entry(user_id, profile["profile_version"], top_n)
+        timer.lap("precomputed_lookup")
+        if precomputed is not None:
+            recommendations = [
+                {field: rec[field] for field in result_fields}
+                for rec in precomputed["payload"]["jobs"][:top_n]
+            ]
+            response = cached_json_response(CachedResponse({
+                "recommendations": recommendations,
+                "message": f"Found {len(recommendations)} recommendations",
+                "total_found": len(recommendations),
+                "filters_applied": None,
+            }), request)
+            timer.lap("serialization")
+            timer.finish()
+            return response
         
-        # Prepare results with explanations and filter out jobs with 0 matching skills
-        recommendations = []
-        for idx in top_idx:
-            job = jobs_df.iloc[idx]
-            score = round(float(scores[idx] * 100), 2)
-            
-            # Extraire les compétences du job
-            job_skills_text = job.get("Skills/Description", job.get("description", ""))
-            
-            # Calculer la correspondance des compétences
-            matching_skills, missing_skills, skill_match_pct = calculate_skill_match(
-                user_cv.skills,
-                job_skills_text
-            )
-            
-            # Filtrer les offres avec 0 compétences correspondantes
-            if not matching_skills or len(matching_skills) == 0 or skill_match_pct == 0:
-                continue  # Skip jobs with no matching skills
-            
-            # Générer l'explication
-            explanation = generate_explanation(
-                user_cv.skills,
-                job_skills_text,
-                score,
-                matching_skills,
-                missing_skills
-            )
-            
-            recommendation = JobRecommendation(
-                job_id=str(job.get("_id", "")) if "_id" in job else None,
-                job_role=job.get("Job_Role", job.get("title", "")),
-                company=job.get("Company", job.get("company", "")),
-                location=job.get("Location", job.get("location", "")),
-                skills_description=job_skills_text,
-                score=score,
-                explanation=explanation,
-                matching_skills=matching_skills if matching_skills else None,
-                missing_skills=missing_skills if missing_skills else None,
-                skill_match_percentage=skill_match_pct
+        def compute() -> Dict:
+            top_idx, scores, missing_shards = dense_job_search(profile["embedding"], top_n * 2, timer)
+            return recommendations_from_scores(
+                UserCV(**profile["cv"]), scores, top_n, timer, result_fields, top_idx, missing_shards
             )
-            recommendations.append(recommendation)
-            
-            # Limiter au nombre demandé après filtrage
-            if len(recommendations) >= top_n:
-                break
         
-        result = RecommendationResponse(
-            recommendations=recommendations,
-            message=f"Found {len(recommendations)} recommendations",
-            total_found=len(recommendations)
+        entry = await get_or_compute_recommendations(
+            f"user:{user_id}:{profile['profile_version']}|{top_n}|{','.join(result_fields)}", compute, timer
         )
-        
-        # Mettre en cache
-        set_cached_recommendations(cache_key, result)
-        
-        return result
+        response = cached_json_response(entry, request)
+        timer.lap("serialization")
+        timer.finish()
+        return response
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
 
+def require_job_index():
+    if model is None or job_index is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Model or job data not loaded. Please run the initialization script first."
+        )
+
+@app.put("/api/jobs/{job_id}")
+async def upsert_job(job_id: str, job: JobPosting):
+    """
+    Index a new or edited job right away (called when a job is approved, edited or deactivated)
+    
+    The job is encoded and added to the in-memory delta segment searched with the loaded
+    index; its previous version is tombstoned. isActive=false removes it.
+    """
+    require_job_index()
+    job.id = job_id
+    return {"job_id": job_id, **await run_in_threadpool(apply_job_changes, [job], [])}
+
+@app.delete("/api/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """Remove a job from the served index (tombstone until the next sync)"""
+    require_job_index()
+    result = await run_in_threadpool(apply_job_changes, [], [job_id])
+    if not result["removed"]:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found in the index")
+    return {"job_id": job_id, "deleted": True, **result}
+
+@app.post("/api/jobs/batch")
+async def apply_job_batch(changes: JobChanges):
+    """Apply several job upserts and deletes at once (watch_jobs.py change stream consumer)"""
+    require_job_index()
+    if any(not job.id for job in changes.upserts):
+        raise HTTPException(status_code=400, detail="Every upserted job needs an _id")
+    return await run_in_threadpool(apply_job_changes, changes.upserts, changes.deletes)
+
+@app.put("/api/users/{user_id}/profile")
+async def push_user_profile(user_id: str, profile: UserProfilePush):
+    """Store (or update) the embedding of a user profile; re-encodes only if the text changed"""
+    if model is None or job_embeddings is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Please run the initialization script first."
+        )
+    encoded = await run_in_threadpool(store_user_profiles, [(user_id, profile.profile_version, profile.cv)])
+    return {"user_id": user_id, "profile_version": profile.profile_version, "encoded": encoded == 1}
+
+@app.post("/api/users/profiles")
+async def push_user_profiles(batch: UserProfileBatch):
+    """Store several user profiles at once (new or changed texts are encoded in one batch)"""
+    if model is None or job_embeddings is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Please run the initialization script first."
+        )
+    items = [(item.user_id, item.profile_version, item.cv) for item in batch.profiles]
+    encoded = await run_in_threadpool(store_user_profiles, items)
+    return {"received": len(items), "encoded": encoded, "unchanged": len(items) - encoded}
+
+@app.delete("/api/users/{user_id}/profile")
+async def delete_user_profile(user_id: str):
+    """Remove a stored user profile"""
+    if not get_user_profile_store().delete(user_id):
+        raise HTTPException(status_code=404, detail=f"No stored profile for user {user_id}")
+    get_precomputed_store().delete(user_id)
+    if candidate_index is not None:
+        candidate_index.remove(user_id)
+    return {"user_id": user_id, "deleted": True}
+
+@app.get("/api/recommend-candidates")
+async def recommend_candidates(
+    job_id: str,
+    top_n: int = Query(10, ge=1, le=100),
+    mode: str = Query("full", description="'full' or 'ids' (user_id and score only)")
+):
+    """
+    Rank stored candidate profiles for a job (reverse matching for recruiters)
+    
+    The job's row of job_embeddings is used as the query against the candidate index
+    (profiles pushed with PUT /api/users/{user_id}/profile), so nothing is encoded.
+    With mode=full the skill match between each candidate and the job is added.
+    """
+    if mode not in ("full", "ids"):
+        raise HTTPException(status_code=400, detail="mode must be 'full' or 'ids'")
+    if model is None or job_index is None or len(job_index) == 0:
+        raise HTTPException(
+            status_code=503,
+            detail="Model or job data not loaded. Please run the initialization script first."
+        )
+    
+    timer = StageTimer("recommend_candidates")
+    record_request_input(job_id=job_id, top_n=top_n, mode=mode)
+    job_row = job_index.row_of(canonical_job_id(job_id))
+    if job_row is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found in the index")
+    index = get_candidate_index()
+    timer.lap("index_lookup")
+    
+    rows, scores = index.search(job_index.vector(job_row), top_n)
+    timer.lap("similarity")
+    user_ids = [index.ids[row] for row in rows.tolist()]
+    percent_scores = np.round((scores * 100).astype(np.float64), 2).tolist()
+    candidates = [{"user_id": user_id, "score": score} for user_id, score in zip(user_ids, percent_scores)]
+    
+    if mode == "full" and candidates:
+        cvs = get_user_profile_store().get_cvs(user_ids)
+        timer.lap("row_access")
+        job_skills = get_job_skills(job_row)
+        for candidate in candidates:
+            cv = cvs.get(candidate["user_id"], {})
+            matching, missing, percentage = match_skills(extract_skills(cv.get("skills", "")), job_skills)
+            candidate.update({
+                "location": cv.get("location", ""),
+                "matching_skills": matching,
+                "missing_skills": missing,
+                "skill_match_percentage": percentage,
+            })
+        timer.lap("skill_match")
+    
+    response = json_response({
+        "job_id": job_id,
+        "candidates": candidates,
+        "total_candidates": len(index),
+    })
+    timer.lap("serialization")
+    timer.finish()
+    return response
+
+def get_user_profile_store() -> UserProfileStore:
+    global user_profile_store
+    if user_profile_store is None:
+        user_profile_store = UserProfileStore(USER_PROFILES_DB)
+    return user_profile_store
+
+def get_precomputed_store() -> PrecomputedStore:
+    global precomputed_store
+    if precomputed_store is None:
+        precomputed_store = PrecomputedStore(PRECOMPUTED_DB)
+    return precomputed_store
+
+def precomputed_entries() -> int:
+    """Nombre de recommandations précalculées, sans créer la base si elle n'existe pas encore"""
+    if precomputed_store is None and not os.path.exists(PRECOMPUTED_DB):
+        return 0
+    return get_precomputed_store().count()
+
+def current_index_version() -> str:
+    """Version des index servis: modèle/encodage, jobs et cours"""
+    return hashlib.md5(
+        f"{embedding_model_id()}|{job_index_version}|{course_index_version}".encode()
+    ).hexdigest()
+
+def get_precomputed_entry(user_id: str, profile_version: str, top_n: int) -> Optional[Dict]:
+    """Entrée précalculée utilisable: même version de profil et d'index, assez de résultats"""
+    entry = get_precomputed_store().get(user_id)
+    if (
+        entry is None
+        or entry["profile_version"] != profile_version
+        or entry["index_version"] != current_index_version()
+        or top_n > entry["top_k"]
+    ):
+        CACHE_REQUESTS.inc("precomputed", "miss")
+        return None
+    CACHE_REQUESTS.inc("precomputed", "hit")
+    return entry
+
+def precompute_recommendations(
+    k: int = PRECOMPUTE_TOP_K,
+    chunk_size: int = PRECOMPUTE_CHUNK_SIZE,
+    updated_since: Optional[float] = None
+) -> int:
+    """
+    Calculer les k meilleures recommandations de jobs et de certifications de chaque
+    profil stocké (par chunks: un produit matriciel par chunk) et les écrire dans le
+    magasin précalculé. Renvoie le nombre de profils traités.
+    """
+    precomputed = get_precomputed_store()
+    index_version = current_index_version()
+    with_courses = courses_df is not None and len(courses_df) > 0 and len(course_embeddings) > 0
+    total = 0
+    for user_ids, versions, cvs, embeddings in get_user_profile_store().iter_profiles(
+        embedding_model_id(), chunk_size, updated_since
+    ):
+        timer = StageTimer("precompute")
+        user_cvs = [UserCV(**cv) for cv in cvs]
+        job_scores = job_index.scores(embeddings)
+        timer.lap("similarity")
+        
+        course_scores = None
+        if with_courses:
+            skills_lists = [extract_skills(user_cv.skills) for user_cv in user_cvs]
+            texts = [
+                certification_query_text(user_cv, skills, [], None)
+                for user_cv, skills in zip(user_cvs, skills_lists)
+            ]
+            timer.lap("prepare")
+            course_emb = encode_texts(texts, "precompute")
+            timer.lap("encode")
+            course_scores = course_index.scores(course_emb)
+            timer.lap("similarity")
+        
+        rows = []
+        for i, user_cv in enumerate(user_cvs):
+            jobs = recommendations_from_scores(user_cv, job_scores[i], k, timer)["recommendations"]
+            certifications = []
+            if course_scores is not None:
+                certifications = certifications_from_scores(
+                    skills_lists[i], [], course_scores[i], k, timer
+                )["recommendations"]
+            rows.append((
+                user_ids[i], versions[i], index_version, k,
+                dumps_json({"jobs": jobs, "certifications": certifications})
+            ))
+        precomputed.put_many(rows)
+        timer.lap("store")
+        timer.finish()
+        total += len(rows)
+        print(f"  {total} profiles precomputed")
+    return total
+
+def embedding_model_id() -> str:
+    """Identifiant du modèle et de l'encodage courants (un embedding produit autrement est obsolète)"""
+    model_name = os.path.basename(os.getenv("MODEL_PATH", "models/all-MiniLM-L6-v2").rstrip("/"))
+    model_id = f"{model_name}:{job_embeddings.shape[1]}"
+    if CV_ENCODING == "fields":
+        weights = ",".join(f"{name}={weight:g}" for name, weight in CV_FIELD_WEIGHTS.items())
+        model_id += ":fields:" + hashlib.md5(weights.encode()).hexdigest()[:8]
+    return model_id
+
+def store_user_profiles(items: List[tuple]) -> int:
+    """Enregistrer des profils (user_id, version, UserCV), renvoie le nombre de profils encodés"""
+    store = get_user_profile_store()
+    model_id = embedding_model_id()
+    hashes = [
+        fields_hash(getattr(user_cv, name) or "" for name in DEFAULT_CV_FIELD_WEIGHTS)
+        for _, _, user_cv in items
+    ]
+    existing = store.get_hashes([user_id for user_id, _, _ in items])
+    
+    to_encode = [
+        i for i, (user_id, _, _) in enumerate(items)
+        if existing.get(user_id) != (hashes[i], model_id)
+    ]
+    embeddings = {}
+    if to_encode:
+        encoded = encode_cvs([items[i][2] for i in to_encode], "user_profiles")
+        embeddings = dict(zip(to_encode, encoded))
+    
+    store.upsert(
+        (user_id, version, user_cv.model_dump(), hashes[i], model_id, embeddings.get(i))
+        for i, (user_id, version, user_cv) in enumerate(items)
+    )
+    # Mise à jour incrémentale de l'index des candidats s'il est déjà construit
+    if candidate_index is not None:
+        for i, embedding in embeddings.items():
+            candidate_index.upsert(items[i][0], embedding)
+    return len(to_encode)
+
+def get_candidate_index() -> VectorIndex:
+    """Index des candidats construit depuis les profils stockés (encodés avec le modèle courant)"""
+    global candidate_index
+    if candidate_index is None:
+        ids, embeddings = get_user_profile_store().load_embeddings(embedding_model_id())
+        candidate_index = VectorIndex(embeddings, ids, dim=job_embeddings.shape[1])
+        print(f"✓ Built candidate index with {len(candidate_index)} profiles")
+    return candidate_index
+
+@app.get("/api/similar-jobs/{job_id}")
+async def similar_jobs(
+    job_id: str,
+    top_n: int = Query(10, ge=1, le=50),
+    mode: str = Query("full", description="'full' or 'ids' (job_id and score only)")
+):
+    """
+    Jobs most similar to a given job (job detail page)
+    
+    Answered from the precomputed kNN graph (job_graph.py, built by init_model.py and
+    sync_mongodb*.py) with an O(k) lookup, merged with the jobs posted since loading
+    (scored against the job). Without a graph matching the loaded jobs, for a job posted
+    since loading, or if top_n exceeds its k, the job's embedding is compared to all jobs instead.
+    """
+    if mode not in ("full", "ids"):
+        raise HTTPException(status_code=400, detail="mode must be 'full' or 'ids'")
+    if job_index is None or len(job_index) == 0:
+        raise HTTPException(
+            status_code=503,
+            detail="Job data not loaded. Please run the initialization script first."
+        )
+    
+    timer = StageTimer("similar_jobs")
+    index = job_index
+    graph = similar_jobs_graph
+    row = index.row_of(canonical_job_id(job_id))
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    
+    # Le graphe couvre les lignes chargées: les jobs publiés depuis (delta, lignes compactées)
+    # sont comparés au job et fusionnés avec ses voisins du graphe. Parcours complet pour un
+    # job publié depuis le chargement.
+    graph_rows = len(similar_job_rows)
+    if graph is not None and top_n <= graph["neighbors"].shape[1] and row < graph_rows <= index.rows:
+        # Les k voisins: ceux au-delà de top_n remplacent les voisins supprimés
+        rows = graph["neighbors"][row].astype(np.int64)
+        scores = graph["scores"][row].astype(np.float64)
+        if index.rows > graph_rows:
+            new_rows = np.arange(graph_rows, index.rows)
+            new_scores = index.scores_rows(index.vector(row), new_rows)[0].astype(np.float64)
+            rows, scores = np.concatenate([rows, new_rows]), np.concatenate([scores, new_scores])
+            order = np.argsort(-scores, kind="stable")
+            rows, scores = rows[order], scores[order]
+        if index.tombstones:
+            keep = index.active[rows]
+            rows, scores = rows[keep], scores[keep]
+        rows, scores = rows[:top_n], scores[:top_n]
+        source = "graph"
+    else:
+        rows, scores = index.search(index.vector(row), top_n + 1)
+        keep = rows != row
+        rows, scores = rows[keep][:top_n], scores[keep][:top_n]
+        source = "scan"
+    timer.lap("neighbors")
+    
+    fields = JOB_ID_FIELDS if mode == "ids" else ("job_id", "job_role", "company", "location", "skills_description", "score")
+    columns = gather_job_rows(rows, fields)
+    percent_scores = np.round(np.asarray(scores, dtype=np.float64) * 100, 2).tolist()
+    jobs = [
+        {field: percent_scores[i] if field == "score" else columns[field][i] for field in fields}
+        for i in range(len(rows))
+    ]
+    timer.lap("row_access")
+    
+    response = json_response({"job_id": job_id, "similar_jobs": jobs, "source": source})
+    timer.lap("serialization")
+    timer.finish()
+    return response
+
 @app.post("/api/recommend-filtered", response_model=RecommendationResponse)
 async def recommend_jobs_filtered(
     user_cv: UserCV,
     filters: Optional[RecommendationFilters] = None,
-    top_n: int = Query(5, ge=1, le=50)
+    top_n: int = Query(5, ge=1, le=50),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    mode: str = Query("full", description="'full' or 'ids' (job_id and score only)"),
+    retrieval: str = Query("dense", description="'dense', 'hybrid' (BM25 + vectors, RRF) or 'rescore' (vectors on BM25 candidates)"),
+    request: Request = None
 ):
     """
     Get job recommendations with advanced filters
@@ -693,143 +2285,260 @@ async def recommend_jobs_filtered(
         user_cv: User CV information
         filters: Optional filters (location, salary, contract_type, etc.)
         top_n: Number of recommendations to return (default: 5)
+        fields: Fields to include in each recommendation (overrides mode)
+        mode: "full" (default) or "ids" for a lightweight response
+        retrieval: "dense" (default), "hybrid" or "rescore"
     
     Returns:
         List of filtered recommended jobs with explanations
     """
+    result_fields = resolve_fields(fields, mode)
+    retrieval = resolve_retrieval(retrieval)
     if model is None or job_embeddings is None or jobs_df is None or len(jobs_df) == 0:
         raise HTTPException(
             status_code=503,
             detail="Model or job data not loaded. Please run the initialization script first."
         )
+    if filters:
+        geo_center(filters)  # 400/503 avant le calcul
     
     try:
-        # Vérifier le cache avec filtres
+        timer = StageTimer("recommend_filtered")
+        record_request_input(user_cv=user_cv, filters=filters, top_n=top_n, fields=result_fields, retrieval=retrieval)
         filters_str = filters.json() if filters else "no_filters"
-        cache_key = hash_cv(user_cv) + f"|{top_n}|{filters_str}"
-        cached_result = get_cached_recommendations(cache_key)
-        if cached_result:
-            return cached_result
-        
-        # Create combined text from user CV
-        cv_text = (
-            f"{user_cv.skills} {user_cv.experience} {user_cv.education} "
-            f"{user_cv.location} {user_cv.contract_type} "
-            f"{user_cv.languages} {user_cv.certifications}"
+        cache_key = hash_cv(user_cv) + f"|{top_n}|{filters_str}|{','.join(result_fields)}"
+        entry = await get_or_compute_recommendations(
+            cache_key if retrieval == "dense" else f"{cache_key}|{retrieval}",
+            lambda: recommend_jobs_filtered_payload(user_cv, filters, top_n, timer, result_fields, retrieval),
+            timer
         )
-        
-        # Encode user CV
-        cv_emb = model.encode([cv_text], convert_to_numpy=True)
-        
-        # Calculate cosine similarity
-        scores = cosine_similarity(cv_emb, job_embeddings).flatten()
-        
-        # Appliquer les filtres si fournis
-        if filters:
-            scores = apply_filters(jobs_df, scores, filters)
-        
-        # Get top N recommendations (exclure les scores négatifs)
-        valid_indices = np.where(scores >= 0)[0]
-        if len(valid_indices) == 0:
-            return RecommendationResponse(
-                recommendations=[],
-                message="No jobs found matching the filters",
-                total_found=0,
-                filters_applied=filters.dict() if filters else None
-            )
-        
-        # Trier par score et prendre le top N*2 pour filtrer ensuite
-        valid_scores = scores[valid_indices]
-        top_valid_idx = valid_scores.argsort()[::-1][:top_n * 2]
-        top_idx = valid_indices[top_valid_idx]
-        
-        # Prepare results with explanations and filter out jobs with 0 matching skills
-        recommendations = []
-        for idx in top_idx:
-            job = jobs_df.iloc[idx]
-            score = round(float(scores[idx] * 100), 2)
-            
-            # Extraire les compétences du job
-            job_skills_text = job.get("Skills/Description", job.get("description", ""))
-            
-            # Calculer la correspondance des compétences
-            matching_skills, missing_skills, skill_match_pct = calculate_skill_match(
-                user_cv.skills,
-                job_skills_text
-            )
-            
-            # Filtrer les offres avec 0 compétences correspondantes
-            if not matching_skills or len(matching_skills) == 0 or skill_match_pct == 0:
-                continue  # Skip jobs with no matching skills
-            
-            # Générer l'explication
-            explanation = generate_explanation(
-                user_cv.skills,
-                job_skills_text,
-                score,
-                matching_skills,
-                missing_skills
-            )
-            
-            recommendation = JobRecommendation(
-                job_id=str(job.get("_id", "")) if "_id" in job else None,
-                job_role=job.get("Job_Role", job.get("title", "")),
-                company=job.get("Company", job.get("company", "")),
-                location=job.get("Location", job.get("location", "")),
-                skills_description=job_skills_text,
-                score=score,
-                explanation=explanation,
-                matching_skills=matching_skills if matching_skills else None,
-                missing_skills=missing_skills if missing_skills else None,
-                skill_match_percentage=skill_match_pct
-            )
-            recommendations.append(recommendation)
-            
-            # Limiter au nombre demandé après filtrage
-            if len(recommendations) >= top_n:
-                break
-        
-        result = RecommendationResponse(
-            recommendations=recommendations,
-            message=f"Found {len(recommendations)} recommendations matching your filters",
-            total_found=len(valid_indices),
-            filters_applied=filters.dict() if filters else None
-        )
-        
-        # Mettre en cache
-        set_cached_recommendations(cache_key, result)
-        
-        return result
+        response = cached_json_response(entry, request)
+        timer.lap("serialization")
+        timer.finish()
+        return response
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating filtered recommendations: {str(e)}")
 
+def recommend_jobs_filtered_payload(
+    user_cv: UserCV,
+    filters: Optional[RecommendationFilters],
+    top_n: int,
+    timer: StageTimer,
+    fields: tuple = JOB_RESULT_FIELDS,
+    retrieval: str = "dense"
+) -> Dict:
+    """Réponse de /api/recommend-filtered sous forme de dict (calculée sans cache)"""
+    # Encode user CV
+    cv_emb = encode_cvs([user_cv], "recommend_filtered")
+    timer.lap("encode")
+    
+    if retrieval != "dense":
+        # Candidats BM25 (hybrid, rescore) restreints aux jobs qui passent les filtres
+        mask = filter_mask(jobs_df, filters) if filters else None
+        timer.lap("filters")
+        top_idx, scores = retrieve_jobs(user_cv, cv_emb, top_n * 2, retrieval, timer, mask)
+        recommendations = build_job_recommendations(user_cv.skills, top_idx, scores, top_n, timer, fields)
+        return {
+            "recommendations": recommendations,
+            "message": f"Found {len(recommendations)} recommendations matching your filters"
+                       if len(top_idx) else "No jobs found matching the filters",
+            "total_found": int(mask.sum()) if mask is not None else len(scores),
+            "filters_applied": filters.dict() if filters else None,
+        }
+    
+    # Jobs qui passent les filtres, puis similarité (sur ces seuls jobs s'ils sont peu nombreux)
+    mask = filter_mask(jobs_df, filters) if filters else None
+    timer.lap("filters")
+    scores = masked_job_scores(cv_emb, mask)
+    timer.lap("similarity")
+    
+    # Get top N recommendations (exclure les scores négatifs)
+    valid_indices = np.where(scores >= 0)[0]
+    if len(valid_indices) == 0:
+        return {
+            "recommendations": [],
+            "message": "No jobs found matching the filters",
+            "total_found": 0,
+            "filters_applied": filters.dict() if filters else None,
+        }
+    
+    # Trier par score et prendre le top N*2 pour filtrer ensuite
+    top_idx = valid_indices[top_k(scores[valid_indices], top_n * 2)]
+    timer.lap("top_k")
+    
+    recommendations = build_job_recommendations(user_cv.skills, top_idx, scores, top_n, timer, fields)
+    
+    return {
+        "recommendations": recommendations,
+        "message": f"Found {len(recommendations)} recommendations matching your filters",
+        "total_found": len(valid_indices),
+        "filters_applied": filters.dict() if filters else None,
+    }
+
 @app.post("/api/recommend-batch")
-async def recommend_jobs_batch(user_cvs: List[UserCV], top_n: int = 5):
+async def recommend_jobs_batch(
+    user_cvs: List[UserCV],
+    top_n: int = 5,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    mode: str = Query("full", description="'full' or 'ids' (job_id and score only)")
+):
     """
     Get job recommendations for multiple users (batch processing)
     """
+    result_fields = resolve_fields(fields, mode)
     if model is None or job_embeddings is None or jobs_df is None or len(jobs_df) == 0:
         raise HTTPException(
             status_code=503,
             detail="Model or job data not loaded. Please run the initialization script first."
         )
     
+    record_request_input(user_cvs=user_cvs, top_n=top_n, fields=result_fields)
+    timer = StageTimer("recommend_batch")
     results = []
     for user_cv in user_cvs:
         try:
-            response = await recommend_jobs(user_cv, top_n)
-            results.append(response.dict())
+            results.append(recommend_jobs_payload(user_cv, top_n, timer, result_fields))
         except Exception as e:
             results.append({"error": str(e)})
     
-    return {"results": results}
+    response = json_response({"results": results})
+    timer.lap("serialization")
+    timer.finish()
+    return response
+
+@app.post("/api/recommend-batch/stream")
+async def recommend_jobs_batch_stream(
+    request: Request,
+    top_n: int = Query(5, ge=1, le=50),
+    batch_size: int = Query(32, ge=1, description="CVs encoded and scored together (capped by STREAM_MAX_BATCH_SIZE)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    mode: str = Query("full", description="'full' or 'ids' (job_id and score only)")
+):
+    """
+    Streaming variant of /api/recommend-batch (NDJSON)
+    
+    The body is either NDJSON (one UserCV per line, Content-Type: application/x-ndjson),
+    read incrementally, or a JSON array of UserCV. CVs are encoded and scored in
+    micro-batches and one line {"index", "recommendations", ...} (or {"index", "error"})
+    is written per CV as soon as its micro-batch is done. At most one micro-batch is
+    computed ahead of what the client has consumed, so memory stays bounded.
+    """
+    result_fields = resolve_fields(fields, mode)
+    if model is None or job_embeddings is None or jobs_df is None or len(jobs_df) == 0:
+        raise HTTPException(
+            status_code=503,
+            detail="Model or job data not loaded. Please run the initialization script first."
+        )
+    
+    batch_size = min(batch_size, STREAM_MAX_BATCH_SIZE)
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    
+    async def micro_batches() -> AsyncIterator[list]:
+        batch = []
+        async for index, user_cv, error in iter_stream_cvs(request, ndjson):
+            batch.append((index, user_cv, error))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    async def generate() -> AsyncIterator[bytes]:
+        pending = None
+        async for batch in micro_batches():
+            # Calculer le batch suivant pendant l'envoi du précédent (un seul d'avance)
+            task = asyncio.ensure_future(run_in_threadpool(score_cv_batch, batch, top_n, result_fields))
+            if pending is not None:
+                yield await pending
+            pending = task
+        if pending is not None:
+            yield await pending
+    
+    return NDJSONStreamingResponse(generate(), media_type="application/x-ndjson")
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse qui n'écoute pas receive() en parallèle: le générateur lit
+    lui-même le corps de la requête au fil de l'eau (une déconnexion du client est
+    alors signalée par request.stream()).
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+async def iter_stream_cvs(request: Request, ndjson: bool):
+    """Lire les CVs du corps de la requête: (index, UserCV ou None, erreur ou None)"""
+    if not ndjson:
+        try:
+            items = json.loads(await request.body())
+        except ValueError as e:
+            yield 0, None, f"Invalid JSON body: {e}"
+            return
+        if not isinstance(items, list):
+            yield 0, None, "Body must be a JSON array of CVs or NDJSON"
+            return
+        for index, item in enumerate(items):
+            try:
+                yield index, UserCV(**item), None
+            except Exception as e:
+                yield index, None, str(e)
+        return
+    
+    index = 0
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield index, *parse_cv_line(line)
+                index += 1
+    if buffer.strip():
+        yield index, *parse_cv_line(buffer)
+
+def parse_cv_line(line: bytes) -> tuple:
+    try:
+        return UserCV.model_validate_json(line), None
+    except Exception as e:
+        return None, str(e)
+
+def score_cv_batch(batch: list, top_n: int, fields: tuple, endpoint: str = "recommend_batch_stream") -> bytes:
+    """Encoder et scorer un micro-batch de CVs, renvoyer les lignes NDJSON correspondantes"""
+    timer = StageTimer(endpoint)
+    results: Dict[int, Dict] = {}
+    valid = [(index, user_cv) for index, user_cv, error in batch if user_cv is not None]
+    for index, user_cv, error in batch:
+        if user_cv is None:
+            results[index] = {"index": index, "error": error}
+    
+    if valid:
+        try:
+            cv_embs = encode_cvs([user_cv for _, user_cv in valid], endpoint)
+            timer.lap("encode")
+            scores = job_index.scores(cv_embs)
+            timer.lap("similarity")
+            for row, (index, user_cv) in enumerate(valid):
+                payload = recommendations_from_scores(user_cv, scores[row], top_n, timer, fields)
+                results[index] = {"index": index, **payload}
+        except Exception as e:
+            for index, _ in valid:
+                results.setdefault(index, {"index": index, "error": str(e)})
+    
+    chunk = b"".join(dumps_json(results[index]) + b"\n" for index, _, _ in batch)
+    timer.lap("serialization")
+    timer.finish()
+    return chunk
 
 @app.post("/api/recommend-certifications", response_model=CertificationRecommendationResponse)
 async def recommend_certifications(
     user_cv: UserCV,
     target_job_role: Optional[str] = None,
-    top_n: int = Query(5, ge=1, le=20)
+    top_n: int = Query(5, ge=1, le=20),
+    level: Optional[str] = Query(None, description="Course levels to keep (comma-separated)"),
+    provider: Optional[str] = Query(None, description="Course providers to keep (comma-separated)"),
+    request: Request = None
 ):
     """
     Get certification/course recommendations based on user profile and skill gaps
@@ -838,6 +2547,7 @@ async def recommend_certifications(
         user_cv: User CV information
         target_job_role: Target job role (optional, used to identify skill gaps)
         top_n: Number of recommendations to return (default: 5)
+        level, provider: Only recommend courses with one of these levels / providers
     
     Returns:
         List of recommended certifications/courses with explanations
@@ -855,99 +2565,476 @@ async def recommend_certifications(
         )
     
     try:
-        # Extract user skills
-        user_skills_list = extract_skills(user_cv.skills)
+        timer = StageTimer("recommend_certifications")
+        record_request_input(user_cv=user_cv, target_job_role=target_job_role, top_n=top_n, level=level, provider=provider)
+        entry = await get_or_compute_recommendations(
+            f"cert:{hash_cv(user_cv)}|{target_job_role or ''}|{top_n}|{level or ''}|{provider or ''}",
+            lambda: certifications_payload(user_cv, target_job_role, top_n, timer, course_filter_mask(level, provider)),
+            timer
+        )
+        response = cached_json_response(entry, request)
+        timer.lap("serialization")
+        timer.finish()
+        return response
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating certification recommendations: {str(e)}")
+
+@app.get("/api/recommend-certifications/by-user/{user_id}", response_model=CertificationRecommendationResponse)
+async def recommend_certifications_by_user(
+    user_id: str,
+    top_n: int = Query(5, ge=1, le=20),
+    profile_version: Optional[str] = Query(None, description="Expected profile version (409 if the stored one differs)"),
+    level: Optional[str] = Query(None, description="Course levels to keep (comma-separated)"),
+    provider: Optional[str] = Query(None, description="Course providers to keep (comma-separated)"),
+    request: Request = None
+):
+    """
+    Get certification recommendations for a user whose profile is stored
+    
+    Same contract as /api/recommend/by-user/{user_id} (404 unknown profile, 409
+    stale version). Served from precompute_recommendations.py when available and
+    no course filter is given, otherwise computed from the stored CV (without
+    target job role).
+    """
+    if model is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Please run the initialization script first."
+        )
+    if courses_df is None or len(courses_df) == 0 or course_embeddings is None or len(course_embeddings) == 0:
+        raise HTTPException(
+            status_code=503,
+            detail="Course data not loaded. Please run load_courses.py to prepare course data."
+        )
+    
+    timer = StageTimer("recommend_certifications_by_user")
+    record_request_input(user_id=user_id, top_n=top_n, profile_version=profile_version, level=level, provider=provider)
+    profile = get_user_profile_store().get(user_id)
+    timer.lap("profile_lookup")
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"No stored profile for user {user_id}")
+    if profile_version is not None and profile["profile_version"] != profile_version:
+        raise HTTPException(status_code=409, detail="Stored profile version is stale")
+    
+    try:
+        # Les entrées précalculées ne sont pas filtrées
+        mask = course_filter_mask(level, provider)
+        precomputed = get_precomputed_entry(user_id, profile["profile_version"], top_n) if mask is None else None
+        timer.lap("precomputed_lookup")
+        if precomputed is not None:
+            recommendations = precomputed["payload"]["certifications"][:top_n]
+            entry = CachedResponse({
+                "recommendations": recommendations,
+                "message": f"Found {len(recommendations)} certification recommendations",
+                "skill_gap": None,
+                "total_found": len(recommendations),
+            })
+        else:
+            entry = await get_or_compute_recommendations(
+                f"cert-user:{user_id}:{profile['profile_version']}|{top_n}|{level or ''}|{provider or ''}",
+                lambda: certifications_payload(UserCV(**profile["cv"]), None, top_n, timer, mask),
+                timer
+            )
+        response = cached_json_response(entry, request)
+        timer.lap("serialization")
+        timer.finish()
+        return response
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating certification recommendations: {str(e)}")
+
+def certifications_payload(
+    user_cv: UserCV,
+    target_job_role: Optional[str],
+    top_n: int,
+    timer: StageTimer,
+    mask: Optional[np.ndarray] = None
+) -> Dict:
+    """Réponse de /api/recommend-certifications sous forme de dict (mask: cours autorisés)"""
+    # Extract user skills
+    user_skills_list = extract_skills(user_cv.skills)
+    
+    # If target job role is provided, find skill gaps from job recommendations
+    skill_gap = []
+    if target_job_role and role_profiles is not None:
+        # Profil de compétences précalculé du rôle (role_profiles.py)
+        timer.lap("prepare")
+        role_row = resolve_role_profile(target_job_role)
+        timer.lap("role_lookup")
+        skill_gap = role_skill_gap(role_profiles, role_row, user_skills_list)
+        timer.lap("skill_match")
+    elif target_job_role and jobs_df is not None and len(jobs_df) > 0:
+        # Find a similar job to identify required skills
+        target_text = f"{target_job_role} {user_cv.skills}"
+        timer.lap("prepare")
+        target_emb = encode_texts([target_text], "recommend_certifications")
+        timer.lap("encode")
         
-        # If target job role is provided, find skill gaps from job recommendations
-        skill_gap = []
-        if target_job_role and jobs_df is not None and len(jobs_df) > 0:
-            # Find a similar job to identify required skills
-            job_texts = (
-                jobs_df.get("Job_Role", jobs_df.get("title", "")) + " " +
-                jobs_df.get("Skills/Description", jobs_df.get("description", ""))
-            ).tolist()
-            
-            target_text = f"{target_job_role} {user_cv.skills}"
-            target_emb = model.encode([target_text], convert_to_numpy=True)
-            
-            if job_embeddings is not None and len(job_embeddings) > 0:
-                job_scores = cosine_similarity(target_emb, job_embeddings).flatten()
-                best_job_idx = job_scores.argsort()[-1]
-                best_job = jobs_df.iloc[best_job_idx]
-                
-                # Extract required skills from the job
-                job_skills_text = best_job.get("Skills/Description", best_job.get("description", ""))
-                job_skills_list = extract_skills(job_skills_text)
-                
-                # Calculate skill gap
-                skill_gap = [s for s in job_skills_list if s.lower() not in [u.lower() for u in user_skills_list]]
-        
-        # Create user text for course recommendation
-        if skill_gap:
-            user_text = f"""
+        if job_embeddings is not None and len(job_embeddings) > 0:
+            job_scores = job_index.scores(target_emb)[0]
+            best_job_idx = int(np.argmax(job_scores))
+            timer.lap("similarity")
+            skill_gap = skill_gap_from_job(user_skills_list, best_job_idx)
+            timer.lap("skill_match")
+    
+    # Encode user text
+    user_text = certification_query_text(user_cv, user_skills_list, skill_gap, target_job_role)
+    timer.lap("prepare")
+    user_emb = encode_texts([user_text], "recommend_certifications")
+    timer.lap("encode")
+    
+    # Calculate similarity with courses
+    similarities = course_index.scores(user_emb)[0]
+    timer.lap("similarity")
+    
+    return certifications_from_scores(user_skills_list, skill_gap, similarities, top_n, timer, mask)
+
+def cached_role_profile(target_job_role: str) -> Optional[int]:
+    """Profil d'un rôle déjà résolu (cache LRU) ou de même intitulé normalisé, sans encodage"""
+    key = normalize_role(target_job_role) or target_job_role.strip().lower()
+    with role_cache_lock:
+        row = role_cache.get(key)
+        if row is not None:
+            role_cache.move_to_end(key)
+    if row is None:
+        row = role_profiles["row_of"].get(key)
+        if row is not None:
+            remember_role_profile(key, row)
+    CACHE_REQUESTS.inc("role_profiles", "hit" if row is not None else "miss")
+    return row
+
+def remember_role_profile(key: str, row: int):
+    with role_cache_lock:
+        role_cache[key] = row
+        while len(role_cache) > ROLE_CACHE_SIZE:
+            role_cache.popitem(last=False)
+
+def resolve_role_profile(target_job_role: str, role_emb: Optional[np.ndarray] = None) -> int:
+    """Profil du rôle demandé: cache, intitulé identique, sinon centroïde le plus proche"""
+    row = cached_role_profile(target_job_role)
+    if row is None:
+        if role_emb is None:
+            role_emb = encode_texts([target_job_role], "role_profiles")
+        row = int(np.argmax(role_profiles["centroids"] @ normalize_rows(role_emb)[0]))
+        remember_role_profile(normalize_role(target_job_role) or target_job_role.strip().lower(), row)
+    return row
+
+def skill_gap_from_job(user_skills_list: List[str], job_idx: int) -> List[str]:
+    """Compétences requises par un job que l'utilisateur ne possède pas"""
+    user_lower = [u.lower() for u in user_skills_list]
+    return [s for s in get_job_skills(job_idx) if s.lower() not in user_lower]
+
+def certification_query_text(
+    user_cv: UserCV,
+    user_skills_list: List[str],
+    skill_gap: List[str],
+    target_job_role: Optional[str]
+) -> str:
+    """Texte encodé pour chercher les cours (axé sur les compétences manquantes s'il y en a)"""
+    if skill_gap:
+        return f"""
             Target job: {target_job_role or 'Career growth'}
             Current skills: {', '.join(user_skills_list)}
             Missing skills: {', '.join(skill_gap)}
             """
-        else:
-            user_text = f"""
+    return f"""
             Current skills: {', '.join(user_skills_list)}
             Experience: {user_cv.experience}
             Education: {user_cv.education}
             """
+
+def certifications_from_scores(
+    user_skills_list: List[str],
+    skill_gap: List[str],
+    similarities: np.ndarray,
+    top_n: int,
+    timer: StageTimer,
+    mask: Optional[np.ndarray] = None
+) -> Dict:
+    """Recommandations de cours à partir des similarités du profil avec chaque cours (mask: cours autorisés)"""
+    # Get top N recommendations
+    top_idx = top_k(similarities, top_n, mask)
+    percent_scores = np.round((similarities[top_idx] * 100).astype(np.float64), 2).tolist()
+    timer.lap("top_k")
+    
+    # Prepare results
+    recommendations = []
+    for i, idx in enumerate(top_idx.tolist()):
+        score = percent_scores[i]
+        # Compétences extraites au chargement (set_courses_data)
+        skills_covered = course_skills[idx]
+        skill_set = course_skill_sets[idx]
+        timer.lap("row_access")
         
-        # Encode user text
-        user_emb = model.encode([user_text], convert_to_numpy=True)
-        
-        # Calculate similarity with courses
-        similarities = cosine_similarity(user_emb, course_embeddings).flatten()
+        # Generate explanation
+        explanation_parts = []
+        if skill_gap:
+            matching_gap_skills = [s for s in skill_gap if s.lower() in skill_set]
+            if matching_gap_skills:
+                explanation_parts.append(f"Covers {len(matching_gap_skills)} of your missing skills: {', '.join(matching_gap_skills[:3])}")
         
-        # Get top N recommendations
-        top_idx = similarities.argsort()[-top_n:][::-1]
+        if skills_covered:
+            relevant_skills = [s for s in user_skills_list if s.lower() in skill_set]
+            if relevant_skills:
+                explanation_parts.append(f"Builds on your existing skills: {', '.join(relevant_skills[:2])}")
         
-        # Prepare results
-        recommendations = []
-        for idx in top_idx:
-            course = courses_df.iloc[idx]
-            score = round(float(similarities[idx] * 100), 2)
-            
-            # Extract skills from course description
-            course_skills = extract_skills(course.get("description", "") + " " + course.get("skills", ""))
-            
-            # Generate explanation
-            explanation_parts = []
-            if skill_gap:
-                matching_gap_skills = [s for s in skill_gap if s.lower() in [c.lower() for c in course_skills]]
-                if matching_gap_skills:
-                    explanation_parts.append(f"Covers {len(matching_gap_skills)} of your missing skills: {', '.join(matching_gap_skills[:3])}")
-            
-            if course_skills:
-                relevant_skills = [s for s in user_skills_list if s.lower() in [c.lower() for c in course_skills]]
-                if relevant_skills:
-                    explanation_parts.append(f"Builds on your existing skills: {', '.join(relevant_skills[:2])}")
-            
-            explanation = ". ".join(explanation_parts) if explanation_parts else f"Relevant course with {score:.0f}% match to your profile"
-            
-            recommendation = CertificationRecommendation(
-                title=course.get("title", "Unknown Course"),
-                description=course.get("description", ""),
-                provider=course.get("provider"),
-                level=course.get("level"),
-                skills_covered=course_skills[:10] if course_skills else None,
-                score=score,
-                relevance_explanation=explanation
-            )
-            recommendations.append(recommendation)
+        explanation = ". ".join(explanation_parts) if explanation_parts else f"Relevant course with {score:.0f}% match to your profile"
+        timer.lap("explanation")
         
-        return CertificationRecommendationResponse(
-            recommendations=recommendations,
-            message=f"Found {len(recommendations)} certification recommendations",
-            skill_gap=skill_gap[:10] if skill_gap else None,
-            total_found=len(recommendations)
+        recommendations.append({
+            "title": course_columns["title"][idx],
+            "description": course_columns["description"][idx],
+            "provider": course_columns["provider"][idx],
+            "level": course_columns["level"][idx],
+            "skills_covered": skills_covered[:10] if skills_covered else None,
+            "score": score,
+            "relevance_explanation": explanation,
+        })
+        timer.lap("serialization")
+    
+    return {
+        "recommendations": recommendations,
+        "message": f"Found {len(recommendations)} certification recommendations",
+        "skill_gap": skill_gap[:10] if skill_gap else None,
+        "total_found": len(recommendations),
+    }
+
+@app.post("/api/recommend-all", response_model=CombinedRecommendationResponse)
+async def recommend_all(
+    user_cv: UserCV,
+    target_job_role: Optional[str] = None,
+    top_n: int = Query(5, ge=1, le=50),
+    certifications_top_n: int = Query(5, ge=1, le=20),
+    fields: Optional[str] = Query(None, description="Comma-separated job fields to return"),
+    mode: str = Query("full", description="'full' or 'ids' (job_id and score only)"),
+    level: Optional[str] = Query(None, description="Course levels to keep (comma-separated)"),
+    provider: Optional[str] = Query(None, description="Course providers to keep (comma-separated)"),
+    request: Request = None
+):
+    """
+    Get job and certification recommendations for the same profile in one call
+    
+    All query texts (CV, course profile, target role) are encoded in a single batch
+    and jobs are scored once for the CV and the target role. The skill gap comes
+    from the target role's precomputed skill profile (or the best job for it when no
+    role profiles are loaded), or from the top job recommendation when no target
+    role is given; courses are ranked from the shared embeddings.
+    """
+    result_fields = resolve_fields(fields, mode)
+    if model is None or job_embeddings is None or jobs_df is None or len(jobs_df) == 0:
+        raise HTTPException(
+            status_code=503,
+            detail="Model or job data not loaded. Please run the initialization script first."
         )
     
+    try:
+        timer = StageTimer("recommend_all")
+        record_request_input(
+            user_cv=user_cv, target_job_role=target_job_role, top_n=top_n,
+            certifications_top_n=certifications_top_n, fields=result_fields, level=level, provider=provider
+        )
+        cache_key = (
+            f"all:{hash_cv(user_cv)}|{target_job_role or ''}|{top_n}|{certifications_top_n}|{','.join(result_fields)}"
+            f"|{level or ''}|{provider or ''}"
+        )
+        entry = await get_or_compute_recommendations(
+            cache_key,
+            lambda: recommend_all_payload(
+                user_cv, target_job_role, top_n, certifications_top_n, timer, result_fields,
+                course_filter_mask(level, provider) if course_index is not None else None
+            ),
+            timer
+        )
+        response = cached_json_response(entry, request)
+        timer.lap("serialization")
+        timer.finish()
+        return response
+    
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating certification recommendations: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
+
+def recommend_all_payload(
+    user_cv: UserCV,
+    target_job_role: Optional[str],
+    top_n: int,
+    certifications_top_n: int,
+    timer: StageTimer,
+    fields: tuple = JOB_RESULT_FIELDS,
+    course_mask: Optional[np.ndarray] = None
+) -> Dict:
+    """Réponse de /api/recommend-all: {"jobs": ..., "certifications": ...}"""
+    with_courses = courses_df is not None and len(courses_df) > 0 and course_embeddings is not None and len(course_embeddings) > 0
+    user_skills_list = extract_skills(user_cv.skills)
+    
+    # Rôle cible: profil précalculé (déjà résolu ou à résoudre avec l'embedding du rôle)
+    # ou, sans profils de rôles, meilleur job pour "{rôle} {compétences}"
+    use_role_profiles = bool(target_job_role) and role_profiles is not None
+    role_row = cached_role_profile(target_job_role) if use_role_profiles else None
+    
+    # Un seul encodage pour tous les textes de la requête
+    texts = []
+    if CV_ENCODING != "fields":
+        texts.append(build_cv_text(user_cv))
+    if with_courses:
+        texts.append(certification_query_text(user_cv, user_skills_list, [], None))
+    if use_role_profiles and role_row is None:
+        texts.append(target_job_role)
+    elif target_job_role and not use_role_profiles:
+        texts.append(f"{target_job_role} {user_cv.skills}")
+    timer.lap("prepare")
+    embeddings = encode_texts(texts, "recommend_all") if texts else None
+    if CV_ENCODING == "fields":
+        cv_emb = encode_cvs([user_cv], "recommend_all")
+        queries = embeddings
+    else:
+        cv_emb, queries = embeddings[:1], embeddings[1:]
+    course_emb = queries[:1] if with_courses else None
+    target_emb = queries[-1:] if len(texts) > int(CV_ENCODING != "fields") + int(with_courses) else None
+    timer.lap("encode")
+    if use_role_profiles:
+        if role_row is None:
+            role_row = resolve_role_profile(target_job_role, target_emb)
+        target_emb = None
+        timer.lap("role_lookup")
+    
+    # Jobs: un seul produit matriciel pour le CV et le rôle cible
+    job_scores = job_index.scores(cv_emb if target_emb is None else np.vstack([cv_emb, target_emb]))
+    timer.lap("similarity")
+    jobs = recommendations_from_scores(user_cv, job_scores[0], top_n, timer, fields)
+    
+    if not with_courses:
+        return {"jobs": jobs, "certifications": None}
+    
+    # Écart de compétences: profil du rôle cible, meilleur job pour le rôle cible,
+    # sinon première recommandation
+    if use_role_profiles:
+        skill_gap = role_skill_gap(role_profiles, role_row, user_skills_list)
+    elif target_emb is not None:
+        skill_gap = skill_gap_from_job(user_skills_list, int(np.argmax(job_scores[1])))
+    else:
+        best = top_k(job_scores[0], top_n * 2)
+        skill_gap = []
+        for idx in best.tolist():
+            matching, missing, _ = match_skills(user_skills_list, get_job_skills(idx))
+            if matching:
+                skill_gap = missing
+                break
+    timer.lap("skill_match")
+    
+    # Cours: profil de compétences (+ rôle cible) à partir des embeddings déjà calculés
+    course_query = normalize_rows(course_emb)
+    if use_role_profiles:
+        course_query = course_query + role_profiles["centroids"][role_row]
+    elif target_emb is not None:
+        course_query = course_query + normalize_rows(target_emb)
+    similarities = course_index.scores(course_query)[0]
+    timer.lap("similarity")
+    certifications = certifications_from_scores(
+        user_skills_list, skill_gap, similarities, certifications_top_n, timer, course_mask
+    )
+    
+    return {"jobs": jobs, "certifications": certifications}
+
+@app.post("/api/bulk-jobs", status_code=202)
+async def submit_bulk_job(request: BulkJobRequest):
+    """
+    Submit an asynchronous bulk recommendation job
+    
+    Provide either user_cvs (inline) or input_path (a JSONL file with one UserCV per line,
+    relative to BULK_JOB_INPUT_DIR). Returns the job with its job_id; poll
+    GET /api/bulk-jobs/{job_id} and download GET /api/bulk-jobs/{job_id}/results.
+    """
+    result_fields = resolve_fields(request.fields, request.mode)
+    if bulk_job_manager is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Model or job data not loaded. Please run the initialization script first."
+        )
+    if (request.user_cvs is None) == (request.input_path is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of user_cvs or input_path")
+    
+    if request.user_cvs is not None:
+        lines = (dumps_json(cv) for cv in request.user_cvs)
+        job = await run_in_threadpool(bulk_job_manager.submit, request.top_n, result_fields, cv_lines=lines)
+    else:
+        input_dir = os.path.realpath(BULK_JOB_INPUT_DIR)
+        source_path = os.path.realpath(os.path.join(input_dir, request.input_path))
+        if os.path.commonpath([input_dir, source_path]) != input_dir or not os.path.isfile(source_path):
+            raise HTTPException(status_code=400, detail=f"input_path must be a file under {BULK_JOB_INPUT_DIR}")
+        job = await run_in_threadpool(bulk_job_manager.submit, request.top_n, result_fields, source_path=source_path)
+    return bulk_job_view(job)
+
+@app.get("/api/bulk-jobs")
+async def list_bulk_jobs():
+    """List bulk recommendation jobs"""
+    jobs = bulk_job_manager.list() if bulk_job_manager is not None else []
+    return {"jobs": [bulk_job_view(job) for job in jobs]}
+
+@app.get("/api/bulk-jobs/{job_id}")
+async def get_bulk_job(job_id: str):
+    """Status and progress of a bulk recommendation job"""
+    return bulk_job_view(get_bulk_job_or_404(job_id))
+
+@app.get("/api/bulk-jobs/{job_id}/results")
+async def get_bulk_job_results(job_id: str):
+    """
+    Download the results of a bulk job (NDJSON, one line per CV in input order)
+    
+    While the job is running, the lines of the chunks already checkpointed are returned.
+    """
+    job = get_bulk_job_or_404(job_id)
+    path = bulk_job_manager.store.results_path(job_id)
+    
+    def read_results(size: int):
+        with open(path, "rb") as f:
+            while size > 0:
+                chunk = f.read(min(size, 1 << 20))
+                if not chunk:
+                    break
+                size -= len(chunk)
+                yield chunk
+    
+    return StreamingResponse(
+        read_results(job["results_bytes"]),
+        media_type="application/x-ndjson",
+        headers={"X-Job-Status": job["status"]}
+    )
+
+@app.delete("/api/bulk-jobs/{job_id}")
+async def cancel_bulk_job(job_id: str):
+    """Cancel a queued or running bulk job (results computed so far are kept)"""
+    get_bulk_job_or_404(job_id)
+    return bulk_job_view(bulk_job_manager.cancel(job_id))
+
+def get_bulk_job_or_404(job_id: str) -> Dict:
+    job = bulk_job_manager.get(job_id) if bulk_job_manager is not None else None
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Bulk job {job_id} not found")
+    return job
+
+def bulk_job_view(job: Dict) -> Dict:
+    """Vue publique d'un job (sans les offsets internes de reprise)"""
+    total = job["total"]
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "top_n": job["top_n"],
+        "fields": job["fields"],
+        "total": total,
+        "processed": job["processed"],
+        "invalid": job["invalid"],
+        "progress": round(job["processed"] / total * 100, 2) if total else (100.0 if total == 0 else 0.0),
+        "error": job["error"],
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics (per-stage and per-endpoint latency, cache, index and memory)"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 @app.get("/api/cache/stats")
 async def get_cache_stats():
@@ -955,7 +3042,19 @@ async def get_cache_stats():
     return {
         "cache_size": len(recommendation_cache),
         "cache_ttl_seconds": CACHE_TTL,
-        "max_cache_size": 1000
+        "inflight_requests": len(inflight_requests),
+        "job_shards": job_shards.urls if job_shards is not None else [],
+        "coalesced_requests": coalesced_requests,
+        "max_cache_size": 1000,
+        "cv_encoding": CV_ENCODING,
+        "field_embedding_cache_size": len(field_embedding_cache),
+        "max_field_embedding_cache_size": FIELD_EMBEDDING_CACHE_SIZE,
+        "precomputed_entries": precomputed_entries(),
+        "role_profiles": len(role_profiles["names"]) if role_profiles is not None else 0,
+        "role_cache_size": len(role_cache),
+        "job_delta_rows": job_index.delta_size if job_index is not None else 0,
+        "job_tombstones": job_index.tombstones if job_index is not None else 0,
+        "index_version": current_index_version() if job_embeddings is not None and len(job_embeddings) else None
     }
 
 @app.delete("/api/cache/clear")
@@ -964,6 +3063,10 @@ async def clear_cache():
     global recommendation_cache
     cleared_count = len(recommendation_cache)
     recommendation_cache.clear()
+    with field_embedding_lock:
+        field_embedding_cache.clear()
+    with role_cache_lock:
+        role_cache.clear()
     return {
         "message": "Cache cleared successfully",
         "items_cleared": cleared_count
@@ -0,0 +1,527 @@
+"""
+Reproducible benchmark suite for the ML service
+Generates synthetic job, course and CV corpora at a configurable scale, installs
+them in the service (stub or real encoder) and measures throughput and
+p50/p95/p99 latency for each recommendation endpoint, either in-process
+(direct endpoint calls) or over HTTP with a concurrent load generator.
+Results are stored as JSON and can be compared against a stored baseline.
+
+Examples:
+  python benchmark.py --jobs 10000 --output results.json
+  python benchmark.py --jobs 100000 --mode http --concurrency 16 --compare baseline.json
+  python benchmark.py --jobs 50000 --save-corpus data/bench   # pour un serveur séparé
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+SKILLS = [
+    "Python", "Java", "JavaScript", "React", "Node", "SQL", "MongoDB", "Docker",
+    "Kubernetes", "AWS", "Azure", "GCP", "Machine Learning", "Data Science",
+    "Deep Learning", "TensorFlow", "PyTorch", "Git", "Linux", "Agile", "Scrum",
+    "REST", "GraphQL", "Spark", "Hadoop", "Tableau", "Power BI", "Excel", "Scala",
+    "Go", "Rust", "C++", "TypeScript", "Angular", "Vue", "Django", "Flask",
+    "FastAPI", "Pandas", "NumPy", "Airflow", "Kafka", "Terraform", "Jenkins",
+]
+WORDS = (
+    "the team project data product customer platform build develop maintain design "
+    "analyze deliver improve support collaborate with across business stakeholders "
+    "requirements experience years strong knowledge understanding working environment "
+    "responsible for models pipelines services applications systems quality testing "
+    "performance scalable reliable cloud infrastructure reporting dashboards insights "
+    "communication skills problem solving ownership mentoring junior senior engineers "
+    "startup enterprise fintech retail health logistics telecom banking insurance"
+).split()
+ROLES = [
+    "Data Scientist", "Data Analyst", "Data Engineer", "Machine Learning Engineer",
+    "Backend Developer", "Frontend Developer", "Full Stack Developer", "DevOps Engineer",
+    "Cloud Architect", "Business Analyst", "Product Manager", "QA Engineer",
+]
+CITIES = [
+    "Casablanca", "Rabat", "Marrakech", "Tanger", "Fès", "Agadir",
+    "Bangalore, India", "Mumbai, India", "Paris", "Remote",
+]
+CONTRACTS = ["CDI", "CDD", "Stage", "Freelance", "Internship", "Full-time"]
+LEVELS = ["Beginner", "Intermediate", "Advanced", "Professional"]
+PROVIDERS = ["Coursera", "Udemy", "edX", "AWS", "Google", "Microsoft"]
+
+
+# ==================== CORPUS SYNTHÉTIQUES ====================
+
+def _text(rng: np.random.Generator, mean_words: int, skills_ratio: float = 0.15) -> str:
+    """Texte aléatoire de longueur réaliste (loi log-normale autour de mean_words)"""
+    n = max(3, int(rng.lognormal(np.log(mean_words), 0.5)))
+    words = rng.choice(WORDS, n).tolist()
+    n_skills = max(1, int(n * skills_ratio))
+    positions = rng.integers(0, n, n_skills)
+    for pos, skill in zip(positions, rng.choice(SKILLS, n_skills)):
+        words[pos] = skill
+    return " ".join(words)
+
+
+def generate_jobs(n: int, seed: int = 0) -> pd.DataFrame:
+    """Jobs au format de data/jobs_index.pkl (colonnes Kaggle + MongoDB)"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        skills = ", ".join(rng.choice(SKILLS, int(rng.integers(3, 9)), replace=False))
+        description = f"{skills} {_text(rng, 120)}"
+        low = int(rng.integers(0, 10))
+        rows.append({
+            "_id": f"{i:024x}",
+            "Job_Role": str(rng.choice(ROLES)),
+            "Company": f"Company {int(rng.integers(0, max(1, n // 20)))}",
+            "Location": str(rng.choice(CITIES)),
+            "Skills/Description": description,
+            "Job Experience": f"{low}-{low + int(rng.integers(1, 6))} Yrs",
+            "Contract_Type": str(rng.choice(CONTRACTS)),
+            "salary": float(rng.integers(4, 40) * 1000),
+        })
+    df = pd.DataFrame(rows)
+    df["job_text"] = (
+        df["Skills/Description"] + " " + df["Job Experience"] + " " +
+        df["Location"] + " " + df["Contract_Type"]
+    )
+    return df
+
+
+def generate_courses(n: int, seed: int = 1) -> pd.DataFrame:
+    """Cours au format de data/courses_index.pkl"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        skills = ", ".join(rng.choice(SKILLS, int(rng.integers(2, 6)), replace=False))
+        rows.append({
+            "title": f"{rng.choice(SKILLS)} course {i}",
+            "description": f"{_text(rng, 60)}. Skills: {skills}",
+            "provider": str(rng.choice(PROVIDERS)),
+            "level": str(rng.choice(LEVELS)),
+            "skills": skills,
+        })
+    return pd.DataFrame(rows)
+
+
+def generate_cvs(n: int, seed: int = 2) -> List[Dict[str, str]]:
+    """Profils utilisateurs au format UserCV"""
+    rng = np.random.default_rng(seed)
+    cvs = []
+    for _ in range(n):
+        cvs.append({
+            "skills": ", ".join(rng.choice(SKILLS, int(rng.integers(2, 12)), replace=False)),
+            "experience": _text(rng, 80),
+            "education": f"Master {rng.choice(['Computer Science', 'Statistics', 'Finance'])}",
+            "location": str(rng.choice(CITIES)),
+            "contract_type": str(rng.choice(CONTRACTS)),
+            "languages": "Français, Anglais",
+            "certifications": "",
+        })
+    return cvs
+
+
+# ==================== ENCODEURS ====================
+
+class StubEncoder:
+    """
+    Encodeur déterministe sans modèle : chaque texte donne un vecteur pseudo-aléatoire
+    dérivé de son hash. Permet de mesurer le pipeline sans le coût du transformer.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.md5(str(text).encode()).digest()[:8], "little")
+            out[i] = np.random.default_rng(seed).standard_normal(self.dim, dtype=np.float32)
+        if kwargs.get("normalize_embeddings"):
+            out /= np.linalg.norm(out, axis=1, keepdims=True)
+        return out
+
+
+def load_encoder(kind: str, dim: int):
+    if kind == "stub":
+        return StubEncoder(dim)
+    from sentence_transformers import SentenceTransformer
+    model_path = os.getenv("MODEL_PATH", "models/all-MiniLM-L6-v2")
+    return SentenceTransformer(model_path if os.path.exists(model_path) else "all-MiniLM-L6-v2")
+
+
+def corpus_embeddings(encoder, texts: List[str], seed: int) -> np.ndarray:
+    """Embeddings du corpus : aléatoires pour le stub (rapide à grande échelle), encodés sinon"""
+    if isinstance(encoder, StubEncoder):
+        rng = np.random.default_rng(seed)
+        return rng.standard_normal((len(texts), encoder.dim), dtype=np.float32)
+    return encoder.encode(texts, convert_to_numpy=True, batch_size=128, show_progress_bar=True)
+
+
+def build_corpus(args, encoder):
+    start = time.perf_counter()
+    jobs_df = generate_jobs(args.jobs, args.seed)
+    courses_df = generate_courses(args.courses, args.seed + 1)
+    cvs = generate_cvs(args.cvs, args.seed + 2)
+    job_embeddings = corpus_embeddings(encoder, jobs_df["job_text"].tolist(), args.seed)
+    course_embeddings = corpus_embeddings(
+        encoder, (courses_df["title"] + ". " + courses_df["description"]).tolist(), args.seed + 1
+    )
+    print(f"Generated {len(jobs_df)} jobs, {len(courses_df)} courses, {len(cvs)} CVs "
+          f"in {time.perf_counter() - start:.1f}s")
+    return jobs_df, job_embeddings, courses_df, course_embeddings, cvs
+
+
+def save_corpus(directory: str, jobs_df, job_embeddings, courses_df, course_embeddings, cvs):
+    """Sauvegarder le corpus au format du service (pour un serveur lancé séparément)"""
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, "job_embeddings.npy"), job_embeddings)
+    with open(os.path.join(directory, "jobs_index.pkl"), "wb") as f:
+        pickle.dump(jobs_df, f)
+    np.save(os.path.join(directory, "course_embeddings.npy"), course_embeddings)
+    with open(os.path.join(directory, "courses_index.pkl"), "wb") as f:
+        pickle.dump(courses_df, f)
+    with open(os.path.join(directory, "cvs.jsonl"), "w", encoding="utf-8") as f:
+        for cv in cvs:
+            f.write(json.dumps(cv, ensure_ascii=False) + "\n")
+    print(f"✓ Corpus saved to {directory} (set EMBEDDINGS_PATH/INDEX_PATH/COURSE_* to serve it)")
+
+
+# ==================== SCÉNARIOS ====================
+
+def job_posting(cv: Dict[str, str]) -> Dict:
+    """Job MongoDB publié en temps réel (même _id à chaque appel: modification du job)"""
+    return {
+        "_id": "benchmark-live-job", "title": "Data Scientist", "company": "Benchmark",
+        "location": cv["location"], "description": cv["experience"],
+        "skills": [skill.strip() for skill in cv["skills"].split(",")], "type": "full-time",
+    }
+
+
+def scenarios(top_n: int, batch_size: int):
+    """(nom, chemin HTTP, construction du corps JSON à partir d'une liste de CVs)"""
+    return [
+        ("recommend", f"/api/recommend?top_n={top_n}", lambda cvs: cvs[0]),
+        ("recommend_hybrid", f"/api/recommend?top_n={top_n}&retrieval=hybrid", lambda cvs: cvs[0]),
+        ("recommend_rescore", f"/api/recommend?top_n={top_n}&retrieval=rescore", lambda cvs: cvs[0]),
+        ("recommend_filtered", f"/api/recommend-filtered?top_n={top_n}",
+         lambda cvs: {"user_cv": cvs[0], "filters": {"location": cvs[0]["location"]}}),
+        ("recommend_geo", f"/api/recommend-filtered?top_n={top_n}",
+         lambda cvs: {"user_cv": cvs[0], "filters": {"location": "Casablanca", "radius_km": 50}}),
+        ("recommend_ranges", f"/api/recommend-filtered?top_n={top_n}",
+         lambda cvs: {"user_cv": cvs[0], "filters": {"salary_min": 20000, "experience_level": "senior"}}),
+        ("recommend_batch", f"/api/recommend-batch?top_n={top_n}", lambda cvs: cvs[:batch_size]),
+        ("recommend_certifications", f"/api/recommend-certifications?top_n={top_n}&target_job_role=Data%20Scientist",
+         lambda cvs: cvs[0]),
+        ("recommend_all", f"/api/recommend-all?top_n={top_n}&certifications_top_n={top_n}&target_job_role=Data%20Scientist",
+         lambda cvs: cvs[0]),
+        # En dernier: ajoute des lignes au segment delta de l'index des jobs
+        ("job_upsert", "/api/jobs/batch", lambda cvs: {"upserts": [job_posting(cvs[0])]}),
+    ]
+
+
+def summarize(latencies: List[float], wall: float, errors: int = 0) -> Dict[str, float]:
+    values = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "mean_ms": round(float(values.mean()), 3) if len(values) else 0.0,
+        "p50_ms": round(float(np.percentile(values, 50)), 3) if len(values) else 0.0,
+        "p95_ms": round(float(np.percentile(values, 95)), 3) if len(values) else 0.0,
+        "p99_ms": round(float(np.percentile(values, 99)), 3) if len(values) else 0.0,
+    }
+
+
+def run_inprocess(service, cvs: List[Dict], requests: int, top_n: int, batch_size: int, warmup: int):
+    """Appeler directement les coroutines des endpoints (sans couche HTTP)"""
+    UserCV = service.UserCV
+    # Appel direct: les valeurs par défaut Query(...) ne sont pas résolues par FastAPI
+    job_fields = {"fields": None, "mode": "full"}
+    course_filters = {"level": None, "provider": None}
+    dense = {"retrieval": "dense"}
+    calls: Dict[str, Callable] = {
+        "recommend": lambda i: service.recommend_jobs(UserCV(**cvs[i % len(cvs)]), top_n=top_n, **job_fields, **dense),
+        # Même CV à chaque appel: réponses servies par le cache (octets déjà encodés)
+        "recommend_cached": lambda i: service.recommend_jobs(UserCV(**cvs[0]), top_n=top_n, **job_fields, **dense),
+        "recommend_hybrid": lambda i: service.recommend_jobs(
+            UserCV(**cvs[i % len(cvs)]), top_n=top_n, **job_fields, retrieval="hybrid"
+        ),
+        "recommend_rescore": lambda i: service.recommend_jobs(
+            UserCV(**cvs[i % len(cvs)]), top_n=top_n, **job_fields, retrieval="rescore"
+        ),
+        "recommend_filtered": lambda i: service.recommend_jobs_filtered(
+            UserCV(**cvs[i % len(cvs)]),
+            filters=service.RecommendationFilters(location=cvs[i % len(cvs)]["location"]),
+            top_n=top_n, **job_fields, **dense
+        ),
+        "recommend_geo": lambda i: service.recommend_jobs_filtered(
+            UserCV(**cvs[i % len(cvs)]),
+            filters=service.RecommendationFilters(location="Casablanca", radius_km=50),
+            top_n=top_n, **job_fields, **dense
+        ),
+        "recommend_ranges": lambda i: service.recommend_jobs_filtered(
+            UserCV(**cvs[i % len(cvs)]),
+            filters=service.RecommendationFilters(salary_min=20000, experience_level="senior"),
+            top_n=top_n, **job_fields, **dense
+        ),
+        "recommend_batch": lambda i: service.recommend_jobs_batch(
+            [UserCV(**cvs[(i * batch_size + k) % len(cvs)]) for k in range(batch_size)], top_n=top_n, **job_fields
+        ),
+        "recommend_certifications": lambda i: service.recommend_certifications(
+            UserCV(**cvs[i % len(cvs)]), target_job_role="Data Scientist", top_n=top_n, **course_filters
+        ),
+        "recommend_all": lambda i: service.recommend_all(
+            UserCV(**cvs[i % len(cvs)]), target_job_role="Data Scientist", top_n=top_n,
+            certifications_top_n=top_n, **job_fields, **course_filters
+        ),
+        "job_upsert": lambda i: service.apply_job_batch(
+            service.JobChanges(upserts=[job_posting(cvs[i % len(cvs)])])
+        ),
+    }
+    results = {}
+    loop = asyncio.new_event_loop()
+    try:
+        for name, call in calls.items():
+            service.recommendation_cache.clear()
+            for i in range(warmup):
+                loop.run_until_complete(call(i))
+            service.recommendation_cache.clear()
+            latencies = []
+            wall_start = time.perf_counter()
+            for i in range(requests):
+                start = time.perf_counter()
+                loop.run_until_complete(call(warmup + i))
+                latencies.append(time.perf_counter() - start)
+            results[name] = summarize(latencies, time.perf_counter() - wall_start)
+            print(f"  {name:28s} {_format_row(results[name])}")
+    finally:
+        loop.close()
+    return results
+
+
+def _post(url: str, body: bytes, timeout: float) -> int:
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+        return response.status
+
+
+def run_http(base_url: str, cvs: List[Dict], requests: int, concurrency: int,
+             top_n: int, batch_size: int, warmup: int, timeout: float):
+    """Générateur de charge concurrent (un thread par client simultané)"""
+    results = {}
+    for name, path, make_body in scenarios(top_n, batch_size):
+        url = base_url.rstrip("/") + path
+        # Corps différents à chaque requête pour ne pas mesurer le cache
+        bodies = [
+            json.dumps(make_body([cvs[(i * batch_size + k) % len(cvs)] for k in range(batch_size)])).encode()
+            for i in range(requests + warmup)
+        ]
+        for body in bodies[:warmup]:
+            _post(url, body, timeout)
+
+        latencies: List[float] = []
+        errors = [0]
+        lock = threading.Lock()
+        counter = iter(range(warmup, warmup + requests))
+
+        def worker():
+            while True:
+                with lock:
+                    index = next(counter, None)
+                if index is None:
+                    return
+                start = time.perf_counter()
+                try:
+                    _post(url, bodies[index], timeout)
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        latencies.append(elapsed)
+                except Exception:
+                    with lock:
+                        errors[0] += 1
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(worker)
+        results[name] = summarize(latencies, time.perf_counter() - wall_start, errors[0])
+        print(f"  {name:28s} {_format_row(results[name])}")
+    return results
+
+
+def start_local_server(port: int):
+    """Lancer le service dans un thread (lifespan désactivé pour garder le corpus synthétique)"""
+    import uvicorn
+    import app as service
+    config = uvicorn.Config(service.app, host="127.0.0.1", port=port, lifespan="off", log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if server.started:
+            break
+        time.sleep(0.1)
+    return server, thread
+
+
+# ==================== RÉSULTATS ====================
+
+def _format_row(stats: Dict[str, float]) -> str:
+    return (f"{stats['throughput_rps']:>9.1f} req/s  p50 {stats['p50_ms']:>8.2f} ms  "
+            f"p95 {stats['p95_ms']:>8.2f} ms  p99 {stats['p99_ms']:>8.2f} ms  errors {stats['errors']}")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def compare_results(current: Dict, baseline: Dict, max_regression: float) -> bool:
+    """Afficher les écarts avec la référence; retourne False en cas de régression"""
+    ok = True
+    print("\nComparison with baseline (negative = faster):")
+    for mode, endpoints in current["results"].items():
+        for name, stats in endpoints.items():
+            reference = baseline.get("results", {}).get(mode, {}).get(name)
+            if not reference:
+                print(f"  {mode}/{name}: no baseline")
+                continue
+            deltas = []
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                if reference[key] > 0:
+                    change = (stats[key] - reference[key]) / reference[key] * 100
+                    deltas.append(f"{key[:-3]} {change:+6.1f}%")
+                    if key == "p95_ms" and change > max_regression:
+                        ok = False
+            if reference["throughput_rps"] > 0:
+                change = (stats["throughput_rps"] - reference["throughput_rps"]) / reference["throughput_rps"] * 100
+                deltas.append(f"throughput {change:+6.1f}%")
+            print(f"  {mode}/{name:26s} " + "  ".join(deltas))
+    if not ok:
+        print(f"✗ p95 regression above {max_regression}%")
+    return ok
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the CareerNetwork ML service")
+    parser.add_argument("--jobs", type=int, default=10000, help="Number of synthetic jobs")
+    parser.add_argument("--courses", type=int, default=2000, help="Number of synthetic courses")
+    parser.add_argument("--cvs", type=int, default=2000,
+                        help="Number of synthetic CVs (keep above requests x batch size to avoid cache hits)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--encoder", choices=["stub", "real"], default="stub")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding size for the stub encoder")
+    parser.add_argument("--mode", choices=["inprocess", "http", "both"], default="inprocess")
+    parser.add_argument("--url", help="Target an already running server instead of a local one")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the local server (http mode)")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=8, help="CVs per /api/recommend-batch call")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--max-regression", type=float, default=10.0,
+                        help="Fail (exit 1) if p95 regresses by more than this percentage")
+    parser.add_argument("--save-corpus", help="Save the synthetic corpus to this directory and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("=" * 60)
+    print("CareerNetwork ML Service Benchmark")
+    print("=" * 60)
+
+    encoder = load_encoder(args.encoder, args.dim)
+    jobs_df, job_embeddings, courses_df, course_embeddings, cvs = build_corpus(args, encoder)
+
+    if args.save_corpus:
+        save_corpus(args.save_corpus, jobs_df, job_embeddings, courses_df, course_embeddings, cvs)
+        return 0
+
+    results: Dict[str, Dict] = {}
+    if not args.url:
+        import app as service
+        service.model = encoder
+        service.set_jobs_data(jobs_df, job_embeddings)
+        service.load_lexical_index_data(path=None)
+        service.load_geo_index_data(path=None)
+        service.set_courses_data(courses_df, course_embeddings)
+
+        if args.mode in ("inprocess", "both"):
+            print("\nIn-process:")
+            results["inprocess"] = run_inprocess(
+                service, cvs, args.requests, args.top_n, args.batch_size, args.warmup
+            )
+
+    if args.mode in ("http", "both") or args.url:
+        server = None
+        base_url = args.url
+        if not base_url:
+            server, _ = start_local_server(args.port)
+            base_url = f"http://127.0.0.1:{args.port}"
+        print(f"\nHTTP ({base_url}, concurrency {args.concurrency}):")
+        try:
+            results["http"] = run_http(
+                base_url, cvs, args.requests, args.concurrency, args.top_n,
+                args.batch_size, args.warmup, args.timeout
+            )
+        finally:
+            if server is not None:
+                server.should_exit = True
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "encoder": args.encoder,
+            "dim": int(job_embeddings.shape[1]),
+            "jobs": args.jobs,
+            "courses": args.courses,
+            "cvs": args.cvs,
+            "seed": args.seed,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "top_n": args.top_n,
+            "batch_size": args.batch_size,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare_results(report, baseline, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""
+Asynchronous bulk recommendation jobs for the ML service
+
+A job is a list of CVs (submitted inline or as a reference to a JSONL file) that
+is processed in the background by a small pool of worker threads. Each worker
+encodes and scores the CVs in large chunks and appends one NDJSON line per CV to
+the job's result file.
+
+Everything lives on disk under BULK_JOBS_DIR, one directory per job:
+- meta.json     status, progress and parameters (rewritten atomically)
+- input.jsonl   the CVs of an inline submission
+- results.jsonl one {"index", "recommendations", ...} or {"index", "error"} line per CV
+
+After each chunk the input offset and result size are checkpointed in meta.json,
+so queued or running jobs resume where they stopped when the service restarts
+(any partially written chunk is truncated away).
+"""
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional
+
+BULK_JOBS_DIR = os.getenv("BULK_JOBS_DIR", "data/bulk_jobs")
+BULK_JOB_WORKERS = int(os.getenv("BULK_JOB_WORKERS", 1))
+BULK_JOB_CHUNK_SIZE = int(os.getenv("BULK_JOB_CHUNK_SIZE", 512))
+# Répertoire autorisé pour les fichiers JSONL référencés (input_path)
+BULK_JOB_INPUT_DIR = os.getenv("BULK_JOB_INPUT_DIR", "data")
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+
+class BulkJobStore:
+    """Répertoire de jobs sur disque (un sous-dossier par job)"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.directory, job_id)
+
+    def meta_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), "meta.json")
+
+    def input_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), "input.jsonl")
+
+    def results_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), "results.jsonl")
+
+    def save(self, job: Dict):
+        path = self.meta_path(job["job_id"])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def load(self, job_id: str) -> Optional[Dict]:
+        try:
+            with open(self.meta_path(job_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load_all(self) -> List[Dict]:
+        jobs = []
+        for name in os.listdir(self.directory):
+            job = self.load(name)
+            if job is not None:
+                jobs.append(job)
+        return sorted(jobs, key=lambda job: job["created_at"])
+
+
+class BulkJobManager:
+    """
+    File d'attente et pool de workers des jobs de recommandation en masse.
+
+    parse_line(bytes) -> (UserCV ou None, erreur ou None) et
+    score_chunk([(index, cv, erreur), ...], top_n, fields) -> bytes NDJSON
+    sont fournis par app.py, ce module ne dépend pas du modèle.
+    """
+
+    def __init__(
+        self,
+        store: BulkJobStore,
+        parse_line: Callable,
+        score_chunk: Callable,
+        workers: int = BULK_JOB_WORKERS,
+        chunk_size: int = BULK_JOB_CHUNK_SIZE
+    ):
+        self.store = store
+        self.parse_line = parse_line
+        self.score_chunk = score_chunk
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Recharger les jobs depuis le disque, relancer ceux non terminés et démarrer les workers"""
+        resumed = 0
+        for job in self.store.load_all():
+            if job["status"] in ACTIVE_STATUSES:
+                job["status"] = STATUS_QUEUED
+                self.store.save(job)
+                self._queue.put(job["job_id"])
+                resumed += 1
+            self.jobs[job["job_id"]] = job
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"bulk-job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if resumed:
+            print(f"✓ Resumed {resumed} bulk recommendation job(s)")
+
+    def submit(
+        self,
+        top_n: int,
+        fields: Iterable[str],
+        cv_lines: Optional[Iterable[bytes]] = None,
+        source_path: Optional[str] = None
+    ) -> Dict:
+        """Créer un job à partir de lignes JSON (une par CV) ou d'un fichier JSONL existant"""
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.store.job_dir(job_id))
+        total = None
+        if cv_lines is not None:
+            total = 0
+            with open(self.store.input_path(job_id), "wb") as f:
+                for line in cv_lines:
+                    f.write(line.rstrip(b"\n") + b"\n")
+                    total += 1
+            source_path = self.store.input_path(job_id)
+        open(self.store.results_path(job_id), "wb").close()
+
+        job = {
+            "job_id": job_id,
+            "status": STATUS_QUEUED,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "source_path": source_path,
+            "top_n": top_n,
+            "fields": list(fields),
+            "total": total,
+            "processed": 0,
+            "invalid": 0,
+            "input_offset": 0,
+            "results_bytes": 0,
+            "error": None,
+        }
+        self.store.save(job)
+        with self._lock:
+            self.jobs[job_id] = job
+        self._queue.put(job_id)
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """Annuler un job en attente ou en cours (pris en compte entre deux chunks)"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] in ACTIVE_STATUSES:
+                job["status"] = STATUS_CANCELLED
+                job["finished_at"] = time.time()
+                self.store.save(job)
+            return dict(job)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return counts
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            except Exception as e:
+                print(f"✗ Bulk job {job_id} failed: {e}")
+                self._finish(job_id, STATUS_FAILED, str(e))
+            finally:
+                self._queue.task_done()
+
+    def _update(self, job_id: str, **changes) -> Optional[Dict]:
+        """Appliquer des changements et les persister, sauf si le job a été annulé entre-temps"""
+        with self._lock:
+            job = self.jobs[job_id]
+            if job["status"] not in ACTIVE_STATUSES:
+                return None
+            job.update(changes)
+            self.store.save(job)
+            return dict(job)
+
+    def _finish(self, job_id: str, status: str, error: Optional[str] = None):
+        self._update(job_id, status=status, error=error, finished_at=time.time())
+
+    def _run(self, job_id: str):
+        job = self._update(job_id, status=STATUS_RUNNING)
+        if job is None:
+            return
+        if job["started_at"] is None:
+            job = self._update(job_id, started_at=time.time())
+            if job is None:
+                return
+        source_path = job["source_path"]
+        if job["total"] is None:
+            with open(source_path, "rb") as f:
+                job = self._update(job_id, total=sum(1 for line in f if line.strip()))
+            if job is None:
+                return
+
+        index = job["processed"]
+        offset = job["input_offset"]
+        with open(source_path, "rb") as source, open(self.store.results_path(job_id), "r+b") as results:
+            # Reprise: ignorer l'entrée déjà traitée et tronquer un éventuel chunk partiel
+            source.seek(offset)
+            results.truncate(job["results_bytes"])
+            results.seek(job["results_bytes"])
+
+            while True:
+                batch = []
+                while len(batch) < self.chunk_size:
+                    line = source.readline()
+                    if not line:
+                        break
+                    offset += len(line)
+                    if line.strip():
+                        batch.append((index, *self.parse_line(line)))
+                        index += 1
+                if not batch:
+                    break
+
+                chunk = self.score_chunk(batch, job["top_n"], tuple(job["fields"]))
+                results.write(chunk)
+                results.flush()
+                os.fsync(results.fileno())
+                invalid = sum(1 for _, user_cv, _ in batch if user_cv is None)
+                job = self._update(
+                    job_id,
+                    processed=index,
+                    invalid=job["invalid"] + invalid,
+                    input_offset=offset,
+                    results_bytes=results.tell()
+                )
+                if job is None:
+                    return  # annulé
+
+        self._finish(job_id, STATUS_COMPLETED)
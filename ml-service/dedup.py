@@ -0,0 +1,176 @@
+"""
+Near-duplicate job detection (MinHash + LSH over job_text)
+
+Scraped and re-posted jobs are often near-identical. Before encoding, the sync and
+init pipelines collapse them into one canonical row, without comparing every pair:
+- each job_text becomes a set of word shingles (DEDUP_SHINGLE_SIZE words)
+- a MinHash signature of DEDUP_NUM_PERM values estimates the Jaccard similarity
+  of two sets (share of equal values)
+- signatures are cut into DEDUP_BANDS bands: only jobs with an identical band are
+  candidate pairs, kept when their estimated similarity reaches DEDUP_THRESHOLD
+- jobs with a different title or company (DEDUP_KEY_COLUMNS) are never candidates
+
+The first row of each group is canonical; the IDs of the other members are kept in
+its "duplicate_ids" column, so the service can still resolve them (job aliases).
+"""
+import os
+import time
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from lexical_index import tokenize
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", 0.85))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", 128))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", 16))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", 3))
+# Colonnes qui doivent être identiques (casse et espaces ignorés) pour fusionner deux jobs:
+# la même description publiée pour deux postes ou deux employeurs n'est pas un doublon
+DEDUP_KEY_COLUMNS = ("Job_Role", "Company")
+
+_MAX_HASH = np.uint32((1 << 32) - 1)
+# Nombre de shingles hachés par produit (mémoire: DEDUP_NUM_PERM x taille x 4 octets)
+_CHUNK_SHINGLES = 65536
+_FNV_PRIME = np.uint32(16777619)
+
+
+def shingle_hashes(texts: Sequence[str], size: int = DEDUP_SHINGLE_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash 32 bits des shingles (groupes de `size` mots consécutifs) de chaque texte:
+    (hashes, lignes) triés par ligne, sans doublon dans une même ligne
+    """
+    # Hash de chaque terme calculé une seule fois, shingles combinés en vectoriel
+    token_hashes: Dict[str, int] = {}
+    streams, lengths = [], np.zeros(len(texts), dtype=np.int64)
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths[row] = len(tokens)
+        for token in tokens:
+            if token not in token_hashes:
+                token_hashes[token] = zlib.crc32(token.encode("utf-8"))
+        streams.append([token_hashes[token] for token in tokens])
+    flat = np.fromiter((value for stream in streams for value in stream), dtype=np.uint32, count=int(lengths.sum()))
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+    # Un shingle commence à chaque position suivie d'au moins size - 1 termes du même texte;
+    # un texte plus court que size donne un seul shingle (tous ses termes)
+    width = np.minimum(lengths, size)
+    counts = np.where(lengths > 0, np.maximum(lengths - size + 1, 1), 0)
+    rows = np.repeat(np.arange(len(texts)), counts)
+    positions = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts) + starts[rows]
+    hashes = np.zeros(len(positions), dtype=np.uint32)
+    for offset in range(size):
+        inside = offset < width[rows]
+        hashes[inside] = (hashes[inside] * _FNV_PRIME) ^ flat[positions[inside] + offset]
+
+    keys = np.unique((rows.astype(np.uint64) << np.uint64(32)) | hashes.astype(np.uint64))
+    return (keys & np.uint64(_MAX_HASH)).astype(np.uint32), (keys >> np.uint64(32)).astype(np.int64)
+
+
+def minhash_signatures(texts: Sequence[str], num_perm: int = DEDUP_NUM_PERM, seed: int = 1) -> np.ndarray:
+    """Signatures MinHash (N, num_perm) uint32; les textes vides ont une signature à MAX_HASH"""
+    # Permutations de l'espace 32 bits: (a * x + b) mod 2^32, a impair
+    rng = np.random.default_rng(seed)
+    a = (rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64) | np.uint64(1)).astype(np.uint32)[:, None]
+    b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64).astype(np.uint32)[:, None]
+
+    hashes, rows = shingle_hashes(texts)
+    signatures = np.full((len(texts), num_perm), _MAX_HASH, dtype=np.uint32)
+    # Shingles de plusieurs textes hachés ensemble (découpés aux frontières de textes),
+    # minimum par texte avec reduceat
+    doc_starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]) if len(rows) else np.empty(0, dtype=np.int64)
+    position = 0
+    while position < len(doc_starts):
+        limit = doc_starts[position] + _CHUNK_SHINGLES
+        end = max(int(np.searchsorted(doc_starts, limit)), position + 1)
+        first = doc_starts[position]
+        last = doc_starts[end] if end < len(doc_starts) else len(hashes)
+        permuted = a * hashes[first:last] + b
+        signatures[rows[doc_starts[position:end]]] = np.minimum.reduceat(
+            permuted, doc_starts[position:end] - first, axis=1
+        ).T
+        position = end
+    return signatures
+
+
+def find_near_duplicates(
+    texts: Sequence[str],
+    threshold: float = DEDUP_THRESHOLD,
+    num_perm: int = DEDUP_NUM_PERM,
+    bands: int = DEDUP_BANDS,
+    keys: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Ligne canonique (plus petite ligne du groupe) de chaque texte
+    (keys: code entier par texte, seuls les textes de même code sont comparés)
+    """
+    signatures = minhash_signatures(texts, num_perm)
+    codes = np.zeros(len(texts), dtype=np.uint32) if keys is None else np.asarray(keys).astype(np.uint32)
+    parent = np.arange(len(texts))
+
+    def find(row: int) -> int:
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+
+    non_empty = np.flatnonzero((signatures != _MAX_HASH).any(axis=1))
+    rows_per_band = num_perm // bands
+    for band in range(bands):
+        # Bande précédée du code: deux lignes de codes différents n'ont jamais la même clé
+        columns = slice(band * rows_per_band, (band + 1) * rows_per_band)
+        block = np.column_stack([codes[non_empty], signatures[non_empty, columns]])
+        buckets = block.view(np.dtype((np.void, block.dtype.itemsize * block.shape[1]))).ravel()
+        order = np.argsort(buckets, kind="stable")
+        sorted_keys = buckets[order]
+        # Groupes d'au moins deux lignes ayant cette bande identique
+        boundaries = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+        starts = np.concatenate([[0], boundaries])
+        ends = np.concatenate([boundaries, [len(order)]])
+        for group in np.flatnonzero(ends - starts > 1).tolist():
+            members = non_empty[order[starts[group]:ends[group]]]
+            first = members[0]
+            similarity = (signatures[members[1:]] == signatures[first]).mean(axis=1)
+            for member in members[1:][similarity >= threshold]:
+                root_a, root_b = find(first), find(member)
+                if root_a != root_b:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+    return np.array([find(row) for row in range(len(texts))], dtype=np.int64)
+
+
+def collapse_near_duplicates(
+    df: pd.DataFrame,
+    text_column: str = "job_text",
+    key_columns: Sequence[str] = DEDUP_KEY_COLUMNS,
+    id_column: str = "_id"
+) -> pd.DataFrame:
+    """
+    Garder une ligne par groupe de quasi-doublons, avec les IDs des autres membres
+    dans "duplicate_ids" (numéros de ligne d'origine sans colonne d'ID)
+    """
+    start = time.perf_counter()
+    if len(df) == 0:
+        return df.assign(duplicate_ids=[])
+    key = pd.Series("", index=df.index, dtype=object)
+    for column in key_columns:
+        if column in df.columns:
+            key = key + "|" + df[column].fillna("").astype(str).str.strip().str.lower()
+    codes, _ = pd.factorize(key)
+    canonical = find_near_duplicates(df[text_column].fillna("").astype(str).tolist(), keys=codes)
+    ids: List[str] = (
+        df[id_column].astype(str).tolist() if id_column in df.columns else [str(row) for row in range(len(df))]
+    )
+    members: dict = {}
+    for row, root in enumerate(canonical.tolist()):
+        if row != root:
+            members.setdefault(root, []).append(ids[row])
+    keep = np.flatnonzero(canonical == np.arange(len(df)))
+    collapsed = df.iloc[keep].reset_index(drop=True)
+    collapsed["duplicate_ids"] = [members.get(row, []) for row in keep.tolist()]
+    print(f"✓ Near-duplicate jobs collapsed: {len(df)} -> {len(collapsed)} "
+          f"({len(df) - len(collapsed)} duplicates, {time.perf_counter() - start:.1f}s)")
+    return collapsed
@@ -0,0 +1,234 @@
+"""
+Geocoding of job locations and spatial index (radius / nearest-city filters)
+
+Job locations are free text ("Bangalore, India", "Casablanca - Maroc", "Remote"). The
+sync and init pipelines resolve them once to coordinates with a local gazetteer
+(GAZETTEER_PATH, CSV name/aliases/country/latitude/longitude/population, shipped in
+gazetteer/cities.csv; no network call) and save in GEO_INDEX_PATH:
+- ids       (N,)          job IDs, to check the file matches the loaded jobs
+- latitude  float32 (N,)  NaN when no city was recognized
+- longitude float32 (N,)
+- city      str (N,)      gazetteer name of the recognized city ("" otherwise)
+
+The service indexes the distinct coordinates in a ball tree (haversine metric, with
+scikit-learn; numpy scan otherwise): a radius query visits the matching points only
+and returns their jobs as a boolean mask that restricts the vector search.
+"""
+import copy
+import csv
+import os
+import re
+import time
+import unicodedata
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from sklearn.neighbors import BallTree
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+GAZETTEER_PATH = os.getenv(
+    "GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer", "cities.csv")
+)
+GEO_INDEX_PATH = os.getenv("GEO_INDEX_PATH", "data/job_geo.npz")
+# Rayon autour de la ville la plus proche d'un point (filtre latitude/longitude sans radius_km)
+GEO_CITY_RADIUS_KM = float(os.getenv("GEO_CITY_RADIUS_KM", 30))
+EARTH_RADIUS_KM = 6371.0088
+
+
+def normalize_place(text: str) -> str:
+    """Minuscules sans accents ni ponctuation: "Fès - Maroc" -> "fes maroc" """
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode("ascii").lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def haversine_km(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Distance (km) d'un point à chaque point (latitudes, longitudes en degrés)"""
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    lats, lons = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class PointIndex:
+    """Points en degrés: ceux à moins de radius_km d'un point, le plus proche d'un point"""
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self._tree = None
+        if SKLEARN_AVAILABLE and len(self.latitudes):
+            self._tree = BallTree(np.radians(np.column_stack([self.latitudes, self.longitudes])), metric="haversine")
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        if self._tree is not None:
+            return self._tree.query_radius(np.radians([[latitude, longitude]]), r=radius_km / EARTH_RADIUS_KM)[0]
+        return np.flatnonzero(haversine_km(latitude, longitude, self.latitudes, self.longitudes) <= radius_km)
+
+    def nearest(self, latitude: float, longitude: float) -> Tuple[int, float]:
+        """(point le plus proche, distance en km), (-1, inf) sans point"""
+        if not len(self):
+            return -1, float("inf")
+        if self._tree is not None:
+            distances, points = self._tree.query(np.radians([[latitude, longitude]]), k=1)
+            return int(points[0, 0]), float(distances[0, 0] * EARTH_RADIUS_KM)
+        distances = haversine_km(latitude, longitude, self.latitudes, self.longitudes)
+        point = int(np.argmin(distances))
+        return point, float(distances[point])
+
+
+class Gazetteer:
+    """Villes connues (noms et alias normalisés) et leurs coordonnées"""
+
+    def __init__(self, path: str = GAZETTEER_PATH):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        self.names = [row["name"] for row in rows]
+        self.countries = [row["country"] for row in rows]
+        population = np.array([float(row["population"] or 0) for row in rows])
+        self.points = PointIndex(
+            np.array([float(row["latitude"]) for row in rows]),
+            np.array([float(row["longitude"]) for row in rows])
+        )
+        # Nom ou alias normalisé -> ville (la plus peuplée si un nom est partagé)
+        self._places: Dict[str, int] = {}
+        for city, row in enumerate(rows):
+            for alias in [row["name"], *(row["aliases"] or "").split(";")]:
+                key = normalize_place(alias)
+                if key and (key not in self._places or population[city] > population[self._places[key]]):
+                    self._places[key] = city
+        self._max_words = max((len(key.split()) for key in self._places), default=1)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def coordinates(self, city: int) -> Tuple[float, float]:
+        return float(self.points.latitudes[city]), float(self.points.longitudes[city])
+
+    def geocode(self, text: str) -> Optional[int]:
+        """Première ville citée dans un texte (à position égale, le nom le plus long), None sinon"""
+        words = normalize_place(text).split()
+        for start in range(len(words)):
+            for size in range(min(self._max_words, len(words) - start), 0, -1):
+                city = self._places.get(" ".join(words[start:start + size]))
+                if city is not None:
+                    return city
+        return None
+
+    def nearest_city(self, latitude: float, longitude: float) -> Optional[int]:
+        city, _ = self.points.nearest(latitude, longitude)
+        return city if city >= 0 else None
+
+
+def geocode_locations(locations: Sequence[str], gazetteer: Gazetteer) -> Dict[str, np.ndarray]:
+    """Coordonnées et ville de chaque localisation (chaque texte distinct n'est résolu qu'une fois)"""
+    resolved: Dict[str, Optional[int]] = {}
+    cities = np.empty(len(locations), dtype=object)
+    for row, location in enumerate(locations):
+        text = str(location or "")
+        if text not in resolved:
+            resolved[text] = gazetteer.geocode(text)
+        cities[row] = resolved[text]
+    known = np.array([city is not None for city in cities], dtype=bool)
+    rows = cities[known].astype(np.int64)
+    latitude = np.full(len(cities), np.nan, dtype=np.float32)
+    longitude = np.full(len(cities), np.nan, dtype=np.float32)
+    latitude[known] = gazetteer.points.latitudes[rows]
+    longitude[known] = gazetteer.points.longitudes[rows]
+    names = np.array([gazetteer.names[city] if city is not None else "" for city in cities.tolist()], dtype=str)
+    return {"latitude": latitude, "longitude": longitude, "city": names}
+
+
+class GeoIndex:
+    """Coordonnées des jobs indexées par point distinct: masque des jobs à moins de radius_km"""
+
+    def __init__(self, latitude: np.ndarray, longitude: np.ndarray):
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        self.n_jobs = len(latitude)
+        known = np.flatnonzero(~np.isnan(latitude) & ~np.isnan(longitude))
+        self.located = len(known)
+        # Les jobs d'une même ville partagent un point: l'arbre ne contient que les points distincts
+        points, point_of_job = np.unique(
+            np.column_stack([latitude[known], longitude[known]]).reshape(-1, 2), axis=0, return_inverse=True
+        )
+        point_of_job = point_of_job.ravel()
+        self.points = PointIndex(points[:, 0], points[:, 1])
+        self._job_rows = known[np.argsort(point_of_job, kind="stable")]
+        self._indptr = np.zeros(len(points) + 1, dtype=np.int64)
+        self._indptr[1:] = np.cumsum(np.bincount(point_of_job, minlength=len(points)))
+
+    def __len__(self) -> int:
+        return self.n_jobs
+
+    @property
+    def nbytes(self) -> int:
+        return self._job_rows.nbytes + self._indptr.nbytes + 16 * len(self.points)
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Jobs localisés à moins de radius_km du point (tableau booléen)"""
+        mask = np.zeros(self.n_jobs, dtype=bool)
+        points = self.points.within(latitude, longitude, radius_km)
+        if len(points):
+            mask[np.concatenate([self._job_rows[self._indptr[p]:self._indptr[p + 1]] for p in points.tolist()])] = True
+        return mask
+
+    def extend(self, latitude: np.ndarray, longitude: np.ndarray) -> "GeoIndex":
+        """
+        Index avec des jobs ajoutés à la suite (lignes n_jobs et suivantes): les points connus sont
+        gardés, l'arbre n'est reconstruit que si une nouvelle ville apparaît
+        """
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        known = np.flatnonzero(~np.isnan(latitude) & ~np.isnan(longitude))
+        point_rows = {point: p for p, point in enumerate(zip(self.points.latitudes.tolist(), self.points.longitudes.tolist()))}
+        point_of_job = np.array(
+            [point_rows.setdefault(point, len(point_rows)) for point in zip(latitude[known].tolist(), longitude[known].tolist())],
+            dtype=np.int64
+        )
+        extended = copy.copy(self)
+        extended.n_jobs = self.n_jobs + len(latitude)
+        extended.located = self.located + len(known)
+        if len(point_rows) > len(self.points):
+            points = np.array(list(point_rows), dtype=np.float64)
+            extended.points = PointIndex(points[:, 0], points[:, 1])
+        # Jobs existants puis nouveaux (lignes supérieures) de chaque point
+        point_of_job = np.concatenate([np.repeat(np.arange(len(self.points)), np.diff(self._indptr)), point_of_job])
+        job_rows = np.concatenate([self._job_rows, known + self.n_jobs])
+        extended._job_rows = job_rows[np.argsort(point_of_job, kind="stable")]
+        extended._indptr = np.zeros(len(point_rows) + 1, dtype=np.int64)
+        extended._indptr[1:] = np.cumsum(np.bincount(point_of_job, minlength=len(point_rows)))
+        return extended
+
+
+def save_geo_index(path: str, ids: Sequence, geo: Dict[str, np.ndarray]):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, ids=np.array([str(job_id) for job_id in ids]), **geo)
+    os.replace(tmp_path, path)
+
+
+def load_geo_index(path: str = GEO_INDEX_PATH) -> Optional[Dict[str, np.ndarray]]:
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def refresh_geo_index(ids: Sequence, locations: Sequence[str], path: str = GEO_INDEX_PATH) -> str:
+    """Géocoder les localisations des jobs avec le gazetteer local et les sauvegarder"""
+    start = time.perf_counter()
+    geo = geocode_locations(locations, Gazetteer())
+    save_geo_index(path, ids, geo)
+    located = int((geo["city"] != "").sum())
+    print(f"✓ Job locations geocoded to {path} ({located}/{len(geo['city'])} located, "
+          f"{time.perf_counter() - start:.1f}s)")
+    return path
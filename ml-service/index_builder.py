@@ -0,0 +1,506 @@
+"""
+Job index build pipeline shared by the sync scripts (sync_mongodb*.py)
+
+The active MongoDB jobs are read in batches by three overlapping stages, each in its
+own thread and linked by bounded queues: while batch n is encoded, batch n+1 is
+converted to the service columns and batch n+2 fetched. Near duplicates are then
+collapsed (their embeddings dropped) and the derived artifacts (jobs index,
+similar-jobs graph, role profiles, BM25, coordinates) written in parallel.
+
+The files form one bundle described by MANIFEST_PATH (version, job count, size and
+sha256 of each file, stage timings), built once and published concurrently to every
+sink given with --sink or SYNC_SINKS (comma-separated):
+- local:<directory>  copy of the files (atomic per file), e.g. a shared volume
+- gcs:<bucket>       Google Cloud Storage, keys data/... read by app.py
+- s3:<bucket>        S3, same keys
+- fake:<name>        in memory (FakeSink.published), for tests
+The manifest is published last, and only to the sinks that received every file: a
+reader that sees a new manifest sees the whole bundle. The time spent in each stage
+is reported at the end (stages overlap, so their sum exceeds the wall time).
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pymongo import MongoClient
+from sentence_transformers import SentenceTransformer
+
+from dedup import DEDUP_ENABLED, collapse_near_duplicates
+from geo import refresh_geo_index, GEO_INDEX_PATH
+from job_delta import jobs_dataframe
+from job_graph import refresh_knn_graph, KNN_GRAPH_PATH
+from job_ranges import add_range_columns
+from lexical_index import refresh_bm25_index, BM25_INDEX_PATH
+from role_profiles import refresh_role_profiles, ROLE_PROFILES_PATH
+
+# AWS S3 support (optional)
+try:
+    import boto3
+    S3_AVAILABLE = True
+except ImportError:
+    S3_AVAILABLE = False
+
+# Google Cloud Storage support (optional)
+try:
+    from google.cloud import storage
+    from google.oauth2 import service_account
+    GCS_AVAILABLE = True
+except ImportError:
+    GCS_AVAILABLE = False
+
+EMBEDDINGS_PATH = os.getenv("EMBEDDINGS_PATH", "data/job_embeddings.npy")
+INDEX_PATH = os.getenv("INDEX_PATH", "data/jobs_index.pkl")
+MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", "data/index_manifest.json")
+MODEL_PATH = os.getenv("MODEL_PATH", "models/all-MiniLM-L6-v2")
+SYNC_SINKS = [spec.strip() for spec in os.getenv("SYNC_SINKS", "").split(",") if spec.strip()]
+# Jobs par batch du pipeline (lecture MongoDB, conversion, encodage) et batches en attente entre deux étapes
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", 1000))
+SYNC_QUEUE_DEPTH = int(os.getenv("SYNC_QUEUE_DEPTH", 2))
+# Envois simultanés (tous sinks confondus)
+SYNC_UPLOAD_WORKERS = int(os.getenv("SYNC_UPLOAD_WORKERS", 8))
+
+_DONE = object()
+
+
+class StageTimings:
+    """Temps passé dans chaque étape et nombre d'éléments traités (étapes concurrentes)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds: Dict[str, float] = {}
+        self.items: Dict[str, int] = {}
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, items)
+
+    def add(self, name: str, seconds: float, items: int = 0):
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            self.items[name] = self.items.get(name, 0) + items
+
+    def report(self) -> Dict[str, float]:
+        timings = {name: round(seconds, 3) for name, seconds in self.seconds.items()}
+        timings["total"] = round(time.perf_counter() - self.start, 3)
+        return timings
+
+    def print_report(self):
+        print("\nStage timings:")
+        for name, seconds in self.report().items():
+            items = self.items.get(name, 0)
+            print(f"  {name:36s} {seconds:8.2f}s" + (f"  ({items} jobs)" if items else ""))
+
+
+def run_pipeline(source: Iterable, stages: Sequence[Tuple[str, Callable]], timings: StageTimings,
+                 source_name: str = "fetch", depth: int = SYNC_QUEUE_DEPTH) -> List:
+    """
+    Lire source et appliquer chaque étape (nom, fonction) dans son propre thread, les batches
+    passant d'une étape à la suivante par des files bornées; renvoie les sorties de la
+    dernière étape dans l'ordre. La première erreur arrête la lecture et est relevée.
+    """
+    queues = [queue.Queue(depth) for _ in range(len(stages) + 1)]
+    errors: List[BaseException] = []
+
+    def produce():
+        try:
+            batches = iter(source)
+            while not errors:
+                start = time.perf_counter()
+                batch = next(batches, _DONE)
+                if batch is _DONE:
+                    break
+                timings.add(source_name, time.perf_counter() - start, len(batch))
+                queues[0].put(batch)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            queues[0].put(_DONE)
+
+    def work(name: str, function: Callable, inbox: queue.Queue, outbox: queue.Queue):
+        # Après une erreur, les batches restants sont seulement vidés (l'étape précédente ne bloque pas)
+        while True:
+            batch = inbox.get()
+            if batch is _DONE:
+                break
+            if errors:
+                continue
+            try:
+                with timings.stage(name, len(batch)):
+                    result = function(batch)
+                outbox.put(result)
+            except Exception as e:
+                errors.append(e)
+        outbox.put(_DONE)
+
+    threads = [threading.Thread(target=produce, name=f"sync-{source_name}", daemon=True)]
+    threads += [
+        threading.Thread(target=work, args=(name, function, queues[i], queues[i + 1]), name=f"sync-{name}", daemon=True)
+        for i, (name, function) in enumerate(stages)
+    ]
+    for thread in threads:
+        thread.start()
+    results = []
+    while True:
+        result = queues[-1].get()
+        if result is _DONE:
+            break
+        results.append(result)
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+# ==================== SOURCE ====================
+
+def connect_mongodb():
+    """Connect to MongoDB"""
+    mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/careernetwork")
+    client = MongoClient(mongo_uri)
+    db = client.get_database()
+    return db
+
+
+def fetch_job_batches(db, batch_size: int = SYNC_BATCH_SIZE):
+    """Active jobs of MongoDB, batch_size documents at a time"""
+    batch = []
+    for job in db.jobs.find({"isActive": True}, batch_size=batch_size):
+        batch.append(job)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_model(model_path: str = MODEL_PATH) -> SentenceTransformer:
+    if not os.path.exists(model_path):
+        print(f"Model not found at {model_path}, downloading...")
+        model = SentenceTransformer('all-MiniLM-L6-v2')
+        os.makedirs("models", exist_ok=True)
+        model.save(model_path)
+        return model
+    print(f"Loading model from {model_path}...")
+    return SentenceTransformer(model_path)
+
+
+def build_jobs(batches: Iterable[List[Dict]], model, timings: StageTimings) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Jobs MongoDB -> (DataFrame du service, embeddings), lecture/conversion/encodage en parallèle"""
+    def encode(df: pd.DataFrame):
+        return df, model.encode(df['job_text'].tolist(), convert_to_numpy=True)
+
+    results = run_pipeline(batches, [("transform", jobs_dataframe), ("encode", encode)], timings)
+    if not results:
+        return pd.DataFrame(), np.array([])
+    df = pd.concat([df for df, _ in results], ignore_index=True)
+    embeddings = np.vstack([embeddings for _, embeddings in results])
+    print(f"Found {len(df)} active jobs, embeddings of shape {embeddings.shape}")
+
+    with timings.stage("ranges"):
+        # Salaire ({min, max}) et années d'expérience en colonnes numériques (filtres par intervalle)
+        df = add_range_columns(df)
+    if DEDUP_ENABLED:
+        # Les quasi-doublons sont encodés avec leur batch puis leurs embeddings écartés
+        with timings.stage("dedup", len(df)):
+            df = collapse_near_duplicates(df.assign(_row=np.arange(len(df))))
+            embeddings = embeddings[df.pop("_row").to_numpy()]
+    return df, embeddings
+
+
+# ==================== ARTEFACTS ====================
+
+def save_embeddings_and_index(embeddings: np.ndarray, df: pd.DataFrame) -> List[str]:
+    """Save embeddings and job index (written next to the target, then renamed)"""
+    for path in (EMBEDDINGS_PATH, INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(EMBEDDINGS_PATH + ".tmp", "wb") as f:
+        np.save(f, embeddings)
+    with open(INDEX_PATH + ".tmp", "wb") as f:
+        pickle.dump(df, f)
+    os.replace(EMBEDDINGS_PATH + ".tmp", EMBEDDINGS_PATH)
+    os.replace(INDEX_PATH + ".tmp", INDEX_PATH)
+    print(f"✓ Embeddings and job index saved to {EMBEDDINGS_PATH}, {INDEX_PATH}")
+    return [EMBEDDINGS_PATH, INDEX_PATH]
+
+
+def build_artifacts(df: pd.DataFrame, embeddings: np.ndarray, timings: StageTimings) -> List[str]:
+    """Écrire en parallèle l'index des jobs et les artefacts dérivés, renvoie leurs chemins"""
+    ids = df['_id'].astype(str).tolist()
+    tasks = {
+        "save_index": lambda: save_embeddings_and_index(embeddings, df),
+        # Graphe des jobs similaires (seules les listes de voisins touchées quand c'est possible)
+        "knn_graph": lambda: [refresh_knn_graph(ids, embeddings, KNN_GRAPH_PATH)],
+        # Profils de compétences des rôles (écart de compétences pour un rôle cible)
+        "role_profiles": lambda: [refresh_role_profiles(
+            df['Job_Role'].fillna("").astype(str).tolist(), df['Skills/Description'].tolist(), embeddings,
+            path=ROLE_PROFILES_PATH
+        )],
+        # Index inversé BM25 des job_text (recherche hybride)
+        "bm25": lambda: [refresh_bm25_index(ids, df['job_text'].tolist(), BM25_INDEX_PATH)],
+        # Coordonnées des jobs (gazetteer local, filtres rayon / ville la plus proche)
+        "geo": lambda: [refresh_geo_index(ids, df['Location'].fillna("").astype(str).tolist(), GEO_INDEX_PATH)],
+    }
+
+    def run(name: str) -> List[str]:
+        with timings.stage(name):
+            return tasks[name]()
+
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        return [path for paths in executor.map(run, tasks) for path in paths]
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_manifest(paths: List[str], df: pd.DataFrame, embeddings: np.ndarray, timings: StageTimings,
+                   path: str = MANIFEST_PATH) -> Dict:
+    """Manifest du bundle: version (date + empreinte des jobs), fichiers (clé distante, taille, sha256)"""
+    with timings.stage("checksum"):
+        with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+            checksums = list(executor.map(file_sha256, paths))
+    fingerprint = hashlib.md5(
+        "|".join(df['_id'].astype(str)).encode() + np.ascontiguousarray(embeddings, dtype=np.float32).tobytes()
+    ).hexdigest()
+    manifest = {
+        "version": f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{fingerprint[:8]}",
+        "jobs": len(df),
+        "dim": int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+        "model": os.path.basename(os.path.normpath(MODEL_PATH)),
+        "files": {
+            bundle_key(file_path): {"bytes": os.path.getsize(file_path), "sha256": checksum}
+            for file_path, checksum in zip(paths, checksums)
+        },
+        "timings": timings.report(),
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+    return manifest
+
+
+def bundle_key(path: str) -> str:
+    """Clé d'un fichier dans les sinks (data/<nom>, comme les téléchargements de app.py)"""
+    return f"data/{os.path.basename(path)}"
+
+
+# ==================== SINKS ====================
+
+class LocalSink:
+    """Copie du bundle dans un répertoire"""
+
+    def __init__(self, directory: str):
+        self.name = f"local:{directory}"
+        self.directory = directory
+        self.model_files = False
+
+    def upload(self, local_path: str, key: str):
+        target = os.path.join(self.directory, key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(local_path, target + ".tmp")
+        os.replace(target + ".tmp", target)
+
+
+class GCSSink:
+    """Bucket Google Cloud Storage (clé de service GOOGLE_APPLICATION_CREDENTIALS ou identifiants par défaut)"""
+
+    def __init__(self, bucket_name: str):
+        self.name = f"gcs:{bucket_name}"
+        service_account_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+        if service_account_path and os.path.exists(service_account_path):
+            credentials = service_account.Credentials.from_service_account_file(service_account_path)
+            client = storage.Client(credentials=credentials)
+        else:
+            client = storage.Client()
+        self.bucket = client.bucket(bucket_name)
+        # Upload model files too (optionnel, peut être fait une seule fois)
+        self.model_files = os.getenv("UPLOAD_MODEL_TO_GCS", "false").lower() == "true"
+
+    def upload(self, local_path: str, key: str):
+        self.bucket.blob(key).upload_from_filename(local_path)
+
+
+class S3Sink:
+    """Bucket S3 (identifiants AWS de l'environnement)"""
+
+    def __init__(self, bucket_name: str):
+        self.name = f"s3:{bucket_name}"
+        self.bucket_name = bucket_name
+        self.client = boto3.client('s3')
+        # Upload model files too (optionnel, peut être fait une seule fois)
+        self.model_files = os.getenv("UPLOAD_MODEL_TO_S3", "false").lower() == "true"
+
+    def upload(self, local_path: str, key: str):
+        self.client.upload_file(local_path, self.bucket_name, key)
+
+
+class FakeSink:
+    """Sink en mémoire pour les tests: clé -> contenu publié (fail: clés dont l'envoi échoue)"""
+
+    def __init__(self, name: str = "fake", fail: Sequence[str] = ()):
+        self.name = f"fake:{name}"
+        self.model_files = False
+        self.fail = set(fail)
+        self.published: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def upload(self, local_path: str, key: str):
+        if key in self.fail:
+            raise OSError(f"upload of {key} refused")
+        with open(local_path, "rb") as f:
+            content = f.read()
+        with self._lock:
+            self.published[key] = content
+
+
+SINK_TYPES = {"local": LocalSink, "gcs": GCSSink, "s3": S3Sink, "fake": FakeSink}
+SINK_AVAILABLE = {"gcs": lambda: GCS_AVAILABLE, "s3": lambda: S3_AVAILABLE}
+
+
+def parse_sinks(specs: Sequence[str]) -> list:
+    """Sinks "type:cible" (local:/mnt/data, gcs:bucket, s3:bucket, fake:name); indisponibles ignorés"""
+    sinks = []
+    for spec in specs:
+        kind, _, target = spec.partition(":")
+        if kind not in SINK_TYPES or not target:
+            raise ValueError(f"Invalid sink {spec!r} (expected local:<dir>, gcs:<bucket>, s3:<bucket> or fake:<name>)")
+        if not SINK_AVAILABLE.get(kind, lambda: True)():
+            print(f"Warning: {kind} client library not available, skipping sink {spec}")
+            continue
+        sinks.append(SINK_TYPES[kind](target))
+    return sinks
+
+
+def model_files(model_path: str = MODEL_PATH) -> List[Tuple[str, str]]:
+    """(chemin local, clé models/...) des fichiers du modèle"""
+    files = []
+    for root, _, names in os.walk(model_path):
+        for name in names:
+            local_file = os.path.join(root, name)
+            relative_path = os.path.relpath(local_file, os.path.dirname(os.path.normpath(model_path)))
+            files.append((local_file, f"models/{relative_path}".replace("\\", "/")))
+    return files
+
+
+def publish_bundle(paths: List[str], sinks: list, timings: StageTimings,
+                   manifest_path: str = MANIFEST_PATH, workers: int = SYNC_UPLOAD_WORKERS) -> Dict[str, Dict]:
+    """
+    Envoyer les fichiers du bundle à tous les sinks en parallèle, puis le manifest à ceux qui
+    ont tout reçu; un sink en erreur n'arrête pas les autres. Renvoie le bilan par sink.
+    """
+    uploads = [
+        (sink, local_path, key)
+        for sink in sinks
+        for local_path, key in [(path, bundle_key(path)) for path in paths] + (model_files() if sink.model_files else [])
+    ]
+    results = {sink.name: {"uploaded": 0, "bytes": 0, "failed": [], "seconds": 0.0} for sink in sinks}
+    lock = threading.Lock()
+
+    def upload(sink, local_path: str, key: str):
+        start = time.perf_counter()
+        try:
+            sink.upload(local_path, key)
+            error = None
+        except Exception as e:
+            error = e
+            print(f"✗ Error uploading {local_path} to {sink.name}: {e}")
+        elapsed = time.perf_counter() - start
+        timings.add(f"publish {sink.name}", elapsed)
+        with lock:
+            result = results[sink.name]
+            result["seconds"] += elapsed
+            if error is None:
+                result["uploaded"] += 1
+                result["bytes"] += os.path.getsize(local_path)
+            else:
+                result["failed"].append(key)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(lambda item: upload(*item), uploads))
+        complete = [sink for sink in sinks if not results[sink.name]["failed"]]
+        list(executor.map(lambda sink: upload(sink, manifest_path, bundle_key(manifest_path)), complete))
+    for sink in sinks:
+        result = results[sink.name]
+        status = "✓" if not result["failed"] else "✗"
+        print(f"{status} {sink.name}: {result['uploaded']} files, {result['bytes'] / 1e6:.1f} MB"
+              + (f", failed: {', '.join(result['failed'])}" if result["failed"] else ""))
+    return results
+
+
+def build_index(batches: Iterable[List[Dict]], model, sinks: Sequence = (), timings: Optional[StageTimings] = None) -> Dict:
+    """Construire le bundle à partir des batches de jobs MongoDB et le publier, renvoie le manifest"""
+    timings = timings or StageTimings()
+    df, embeddings = build_jobs(batches, model, timings)
+    if len(df) == 0:
+        return {}
+    paths = build_artifacts(df, embeddings, timings)
+    manifest = write_manifest(paths, df, embeddings, timings)
+    print(f"✓ Index bundle {manifest['version']} written ({len(paths)} files, manifest {MANIFEST_PATH})")
+    if sinks:
+        print(f"Publishing to {len(sinks)} sinks: {', '.join(sink.name for sink in sinks)}")
+        manifest["published"] = publish_bundle(paths, list(sinks), timings)
+    timings.print_report()
+    return manifest
+
+
+def main(argv=None, default_sinks: Sequence[str] = ()):
+    """Main function to sync MongoDB jobs (sinks: --sink, SYNC_SINKS, then default_sinks)"""
+    parser = argparse.ArgumentParser(description="Build the job index from MongoDB and publish it")
+    parser.add_argument("--sink", action="append", default=[],
+                        help="local:<dir>, gcs:<bucket>, s3:<bucket> or fake:<name> (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=SYNC_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Syncing MongoDB Jobs with Recommendation System")
+    print("=" * 60)
+
+    try:
+        specs = list(dict.fromkeys([*args.sink, *SYNC_SINKS, *default_sinks]))
+        sinks = parse_sinks(specs)
+        db = connect_mongodb()
+        model = load_model()
+        manifest = build_index(fetch_job_batches(db, args.batch_size), model, sinks)
+        if not manifest:
+            print("No jobs found. Please add jobs to MongoDB first.")
+            return 1
+
+        failed = [name for name, result in manifest.get("published", {}).items() if result["failed"]]
+        print("\n" + "=" * 60)
+        print("✓ Sync completed successfully!" if not failed else f"⚠ Sync completed, publishing failed for: {', '.join(failed)}")
+        print("=" * 60)
+        print(f"Total jobs synced: {manifest['jobs']} (bundle {manifest['version']})")
+        print("\nThe recommendation system is now ready to use your MongoDB jobs.")
+        return 1 if failed else 0
+
+    except Exception as e:
+        print(f"\n✗ Error during sync: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -7,6 +7,12 @@ import numpy as np
 from sentence_transformers import SentenceTransformer
 import pickle
 import os
+from job_graph import refresh_knn_graph
+from role_profiles import refresh_role_profiles
+from lexical_index import refresh_bm25_index
+from geo import refresh_geo_index
+from dedup import DEDUP_ENABLED, collapse_near_duplicates
+from job_ranges import add_range_columns
 
 # Try to import kaggle API
 try:
@@ -115,6 +121,9 @@ def main():
         
         # Step 2: Create combined job text
         df = create_job_text(df)
+        df = add_range_columns(df)
+        if DEDUP_ENABLED:
+            df = collapse_near_duplicates(df)
         
         # Step 3: Generate embeddings
         model, embeddings = generate_embeddings(df)
@@ -122,6 +131,22 @@ def main():
         # Step 4: Save everything
         save_model_and_data(model, embeddings, df)
         
+        # Step 5: Precompute similar jobs (kNN graph, jobs identified by row number)
+        refresh_knn_graph(list(range(len(df))), embeddings)
+        
+        # Step 6: Skill profiles of job roles (skill gap for a target role)
+        refresh_role_profiles(
+            df['Job_Role'].fillna("").astype(str).tolist(),
+            df['Skills/Description'].fillna("").astype(str).tolist(),
+            embeddings
+        )
+        
+        # Step 7: BM25 inverted index over job_text (hybrid retrieval)
+        refresh_bm25_index(list(range(len(df))), df['job_text'].fillna("").astype(str).tolist())
+        
+        # Step 8: Job coordinates from the local gazetteer (radius / nearest-city filters)
+        refresh_geo_index(list(range(len(df))), df['Location'].fillna("").astype(str).tolist())
+        
         print("\n" + "=" * 60)
         print("✓ Initialization completed successfully!")
         print("=" * 60)
@@ -0,0 +1,199 @@
+"""
+Real-time job updates: delta segment and tombstones of the job index
+
+Jobs posted, edited or removed after the last sync (PUT/DELETE /api/jobs/{job_id},
+POST /api/jobs/batch, fed by watch_jobs.py) are applied to the live index without
+reloading it:
+- a new or edited job is encoded alone and appended to the delta segment (rows
+  base_rows and following), searched with the base rows by every dense query
+- the previous row of an edited job, a deleted job or a deactivated one is
+  tombstoned in the active bitmap of its segment and scores -1
+
+Row numbers never change: the background compaction (app.py) appends the delta rows
+to the base segment and to the per-row structures (columns, BM25 postings, coordinates,
+ranges), tombstones included, without rebuilding the existing rows, so a request
+started before the swap still reads the right jobs. Tombstoned rows are dropped, and
+BM25 statistics recomputed, by the next sync.
+"""
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from vector_index import VectorIndex, top_k
+
+# Compaction du segment delta dans la base: toutes les JOB_COMPACT_INTERVAL secondes,
+# ou dès que le delta atteint JOB_DELTA_MAX_ROWS lignes
+JOB_COMPACT_INTERVAL = float(os.getenv("JOB_COMPACT_INTERVAL", 30))
+JOB_DELTA_MAX_ROWS = int(os.getenv("JOB_DELTA_MAX_ROWS", 1000))
+# Score des lignes supprimées (exclues comme les jobs filtrés)
+TOMBSTONE_SCORE = -1.0
+
+
+def _join(value) -> str:
+    return " ".join(str(item) for item in value) if isinstance(value, (list, tuple)) else str(value or "")
+
+
+def jobs_dataframe(jobs: List[Dict]) -> pd.DataFrame:
+    """Jobs MongoDB -> colonnes attendues par le service (job_text, Job_Role, Company, Location...)"""
+    df = pd.DataFrame(jobs)
+    if len(df) == 0:
+        return df
+
+    # Create job_text similar to Kaggle dataset format
+    def create_job_text(row):
+        return " ".join([
+            _join(row.get("skills", "")), str(row.get("description", "")), str(row.get("experience", "")),
+            str(row.get("location", "")), str(row.get("type", "")), _join(row.get("requirements", "")),
+        ])
+
+    df['job_text'] = df.apply(create_job_text, axis=1)
+
+    # Add columns for compatibility with recommendation system
+    df['_id'] = df['_id'].astype(str) if '_id' in df.columns else ''  # Keep MongoDB ID
+    df['Job_Role'] = df.get('title', '')
+    df['Company'] = df.get('company', '')
+    df['Location'] = df.get('location', '')
+    df['Skills/Description'] = df.apply(
+        lambda row: _join(row.get("skills", [])) + " " + str(row.get("description", "")),
+        axis=1
+    )
+    df['Job Experience'] = df.get('experience', '')
+    df['Contract_Type'] = df.get('type', '')
+    return df
+
+
+class LiveJobIndex:
+    """
+    Index des jobs servi: segment de base (VectorIndex des jobs chargés ou compactés)
+    + segment delta des jobs ajoutés ou modifiés depuis, tombstones dans les deux.
+    Mêmes méthodes que VectorIndex, les lignes du delta suivent celles de la base.
+    Les écritures (add, remove) et la compaction sont sérialisées par l'appelant.
+    """
+
+    def __init__(self, base: VectorIndex):
+        self.base = base
+        self.base_rows = len(base.ids)
+        # Lignes du delta (clé: numéro de ligne global), champs et DataFrame de chaque ligne
+        self.delta = VectorIndex(dim=base.dim)
+        self.delta_columns: Dict[str, list] = {}
+        self.delta_frames: List[pd.DataFrame] = []
+        self.delta_skills: List[Optional[List[str]]] = []
+        self.delta_ids: List[str] = []
+        self._delta_rows: Dict[str, int] = {}
+        self.tombstones = int((~base.active).sum())
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.delta)
+
+    @property
+    def rows(self) -> int:
+        """Nombre de lignes (base + delta, supprimées incluses)"""
+        return self.base_rows + len(self.delta.ids)
+
+    @property
+    def delta_size(self) -> int:
+        return len(self.delta.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.base.dim
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self.base.matrix
+
+    @property
+    def active(self) -> np.ndarray:
+        """Bitmap des lignes non supprimées"""
+        return np.concatenate([self.base.active, self.delta.active])
+
+    @property
+    def nbytes(self) -> int:
+        return self.base.nbytes + self.delta.nbytes
+
+    def row_of(self, job_id) -> Optional[int]:
+        row = self._delta_rows.get(job_id)
+        if row is not None:
+            return row if self.delta.row_of(row) is not None else None
+        return self.base.row_of(job_id)
+
+    def vector(self, row: int) -> np.ndarray:
+        return self.base.vector(row) if row < self.base_rows else self.delta.vector(row - self.base_rows)
+
+    def delta_value(self, field: str, row: int):
+        return self.delta_columns[field][row - self.base_rows]
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Similarité avec chaque ligne (base puis delta), TOMBSTONE_SCORE pour les lignes supprimées"""
+        scores = self.base.scores(queries)
+        if len(self.delta.ids):
+            scores = np.hstack([scores, self.delta.scores(queries)])
+        if self.tombstones:
+            scores[:, ~self.active[:scores.shape[1]]] = TOMBSTONE_SCORE
+        return scores
+
+    def scores_rows(self, queries: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        in_delta = rows >= self.base_rows
+        if not in_delta.any():
+            scores = self.base.scores_rows(queries, rows)
+        else:
+            scores = np.empty((len(np.atleast_2d(queries)), len(rows)), dtype=np.float32)
+            scores[:, ~in_delta] = self.base.scores_rows(queries, rows[~in_delta])
+            scores[:, in_delta] = self.delta.scores_rows(queries, rows[in_delta] - self.base_rows)
+        if self.tombstones:
+            scores[:, ~self.active[rows]] = TOMBSTONE_SCORE
+        return scores
+
+    def search(self, query: np.ndarray, k: int, mask: Optional[np.ndarray] = None):
+        """Les k lignes actives les plus proches d'une requête: (lignes, scores)"""
+        scores = self.scores(query)[0]
+        allowed = self.active if mask is None else (mask & self.active)
+        rows = top_k(scores, k, None if allowed.all() else allowed)
+        return rows, scores[rows]
+
+    def add(self, job_id: str, vector: np.ndarray, frame: pd.DataFrame, columns: Dict[str, object]) -> int:
+        """Ajouter la nouvelle version d'un job au delta (l'ancienne est supprimée), renvoie sa ligne"""
+        self.remove(job_id)
+        row = self.rows
+        # Métadonnées d'abord: les lecteurs (sans verrou) ne voient la ligne qu'une fois
+        # ajoutée à self.delta, tous ses champs sont alors disponibles
+        for field, value in columns.items():
+            self.delta_columns.setdefault(field, []).append(value)
+        self.delta_frames.append(frame)
+        self.delta_skills.append(None)
+        self.delta_ids.append(job_id)
+        self.delta.upsert(row, vector)
+        self._delta_rows[job_id] = row
+        return row
+
+    def remove(self, job_id: str) -> bool:
+        """Supprimer (tombstone) la ligne active d'un job"""
+        row = self._delta_rows.get(job_id)
+        removed = self.delta.remove(row) if row is not None else self.base.remove(job_id)
+        self.tombstones += int(removed)
+        return removed
+
+    def compact(self, rows: Optional[int] = None) -> "LiveJobIndex":
+        """
+        Index dont la base contient les rows premières lignes (base puis delta, toutes par défaut),
+        tombstones conservés: les lignes du delta sont ajoutées à la matrice de la base, sans la
+        recopier. Les lignes suivantes, ajoutées pendant l'extension des structures par ligne,
+        restent dans le delta du nouvel index avec le même numéro.
+        """
+        rows = self.rows if rows is None else rows
+        merged = rows - self.base_rows
+        base = self.base.extend(self.delta.matrix[:merged], self.delta_ids[:merged])
+        base.active[:] = self.active[:rows]
+        compacted = LiveJobIndex(base)
+        active = self.delta.active
+        for i in range(merged, self.delta_size):
+            row = compacted.add(
+                self.delta_ids[i], self.delta.matrix[i], self.delta_frames[i],
+                {field: values[i] for field, values in self.delta_columns.items()}
+            )
+            if not active[i]:
+                compacted.tombstones += int(compacted.delta.remove(row))
+        return compacted
@@ -0,0 +1,200 @@
+"""
+Precomputed job-to-job k-nearest-neighbour graph ("similar jobs")
+
+The graph is built offline (init_model.py, sync_mongodb*.py) over job_embeddings:
+rows are processed in blocks of KNN_BLOCK_SIZE on a thread pool (numpy releases
+the GIL in the matrix product), so memory stays at block_size x N scores instead
+of N x N. It is saved as compact arrays in KNN_GRAPH_PATH:
+- neighbors  int32   (N, k)  row numbers of the k most similar jobs
+- scores     float16 (N, k)  their cosine similarities
+- ids                (N,)    job IDs, to check the graph matches the loaded index
+- fingerprints uint64 (N,)   hash of each embedding, to detect changed jobs
+
+refresh_knn_graph() reuses a previous graph: only new or modified jobs, and jobs
+whose neighbour list referenced a removed or modified job, are recomputed; the
+other lists are merged with the similarities to the changed jobs.
+"""
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+SIMILAR_JOBS_K = int(os.getenv("SIMILAR_JOBS_K", 20))
+KNN_GRAPH_PATH = os.getenv("KNN_GRAPH_PATH", "data/job_knn.npz")
+KNN_BLOCK_SIZE = int(os.getenv("KNN_BLOCK_SIZE", 2048))
+KNN_WORKERS = int(os.getenv("KNN_WORKERS", os.cpu_count() or 1))
+# Au-delà de cette proportion de jobs modifiés, reconstruire tout le graphe
+KNN_FULL_REBUILD_RATIO = 0.2
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    matrix = np.array(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms > 0, norms, 1.0)
+    return matrix
+
+
+def _top_k_rows(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """k meilleures colonnes de chaque ligne, triées par score décroissant"""
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def _knn_rows(
+    matrix: np.ndarray,
+    rows: np.ndarray,
+    k: int,
+    block_size: int = KNN_BLOCK_SIZE,
+    workers: int = KNN_WORKERS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Voisins (hors soi-même) des lignes demandées, calculés par blocs en parallèle"""
+    neighbors = np.empty((len(rows), k), dtype=np.int32)
+    scores = np.empty((len(rows), k), dtype=np.float32)
+
+    def run_block(start: int):
+        block_rows = rows[start:start + block_size]
+        block = matrix[block_rows] @ matrix.T
+        block[np.arange(len(block_rows)), block_rows] = -np.inf
+        idx, sims = _top_k_rows(block, k)
+        neighbors[start:start + len(block_rows)] = idx
+        scores[start:start + len(block_rows)] = sims
+
+    starts = range(0, len(rows), block_size)
+    if workers > 1 and len(rows) > block_size:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(run_block, starts))
+    else:
+        for start in starts:
+            run_block(start)
+    return neighbors, scores
+
+
+def embedding_fingerprints(embeddings: np.ndarray) -> np.ndarray:
+    """Empreinte 64 bits de chaque embedding (détection des jobs modifiés)"""
+    matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(row.tobytes(), digest_size=8).digest(), "little") for row in matrix],
+        dtype=np.uint64
+    )
+
+
+def build_knn_graph(embeddings: np.ndarray, k: int = SIMILAR_JOBS_K) -> Tuple[np.ndarray, np.ndarray]:
+    """Graphe complet: (voisins int32, scores float16) de forme (N, k)"""
+    matrix = _normalize(embeddings)
+    k = min(k, len(matrix) - 1)
+    if k <= 0:
+        return np.zeros((len(matrix), 0), dtype=np.int32), np.zeros((len(matrix), 0), dtype=np.float16)
+    neighbors, scores = _knn_rows(matrix, np.arange(len(matrix)), k)
+    return neighbors, scores.astype(np.float16)
+
+
+def update_knn_graph(
+    previous: Dict[str, np.ndarray],
+    ids: Sequence,
+    embeddings: np.ndarray,
+    fingerprints: np.ndarray,
+    k: int = SIMILAR_JOBS_K
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Mettre à jour un graphe existant pour un nouvel ensemble de jobs.
+    Renvoie (voisins, scores, nombre de listes recalculées entièrement).
+    """
+    matrix = _normalize(embeddings)
+    n = len(matrix)
+    k = min(k, n - 1)
+    old_neighbors = previous["neighbors"]
+    if k <= 0 or old_neighbors.shape[1] != k:
+        neighbors, scores = build_knn_graph(embeddings, k)
+        return neighbors, scores, n
+
+    # Correspondance ancienne ligne -> nouvelle ligne (-1: supprimé ou modifié)
+    new_row_of = {job_id: row for row, job_id in enumerate(ids)}
+    old_to_new = np.full(len(previous["ids"]) + 1, -1, dtype=np.int64)  # dernière case: voisin absent
+    old_row_of_new = np.full(n, -1, dtype=np.int64)
+    for old_row, job_id in enumerate(previous["ids"]):
+        new_row = new_row_of.get(job_id)
+        if new_row is not None and previous["fingerprints"][old_row] == fingerprints[new_row]:
+            old_to_new[old_row] = new_row
+            old_row_of_new[new_row] = old_row
+
+    stable = np.flatnonzero(old_row_of_new >= 0)
+    changed = np.flatnonzero(old_row_of_new < 0)
+    if len(changed) > KNN_FULL_REBUILD_RATIO * n:
+        neighbors, scores = build_knn_graph(embeddings, k)
+        return neighbors, scores, n
+
+    neighbors = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    mapped = old_to_new[old_neighbors[old_row_of_new[stable]]]
+    neighbors[stable] = mapped
+    scores[stable] = previous["scores"][old_row_of_new[stable]].astype(np.float32)
+
+    # Listes à recalculer: jobs modifiés/nouveaux et listes pointant vers un job disparu ou modifié
+    broken = stable[(mapped < 0).any(axis=1)]
+    recompute = np.concatenate([changed, broken])
+    if len(recompute):
+        neighbors[recompute], scores[recompute] = _knn_rows(matrix, recompute, k)
+
+    # Les autres listes ne peuvent changer que par l'arrivée d'un job modifié/nouveau plus proche
+    intact = np.setdiff1d(stable, broken, assume_unique=True)
+    if len(changed) and len(intact):
+        for start in range(0, len(intact), KNN_BLOCK_SIZE):
+            rows = intact[start:start + KNN_BLOCK_SIZE]
+            candidate_scores = matrix[rows] @ matrix[changed].T
+            merged_scores = np.concatenate([scores[rows], candidate_scores], axis=1)
+            merged_ids = np.concatenate([neighbors[rows], np.broadcast_to(changed, candidate_scores.shape)], axis=1)
+            top, top_scores = _top_k_rows(merged_scores, k)
+            neighbors[rows] = np.take_along_axis(merged_ids, top, axis=1)
+            scores[rows] = top_scores
+
+    return neighbors, scores.astype(np.float16), len(recompute)
+
+
+def save_knn_graph(path: str, ids: Sequence, neighbors: np.ndarray, scores: np.ndarray, fingerprints: np.ndarray):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    np.savez(
+        tmp_path,
+        neighbors=neighbors.astype(np.int32),
+        scores=scores.astype(np.float16),
+        ids=np.array([str(job_id) for job_id in ids]),
+        fingerprints=fingerprints
+    )
+    os.replace(tmp_path, path)
+
+
+def load_knn_graph(path: str = KNN_GRAPH_PATH) -> Optional[Dict[str, np.ndarray]]:
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def refresh_knn_graph(ids: Sequence, embeddings: np.ndarray, path: str = KNN_GRAPH_PATH, k: int = SIMILAR_JOBS_K) -> str:
+    """Construire ou mettre à jour (incrémentalement si possible) le graphe et le sauvegarder"""
+    start = time.perf_counter()
+    ids = [str(job_id) for job_id in ids]
+    fingerprints = embedding_fingerprints(embeddings)
+    previous = None
+    try:
+        previous = load_knn_graph(path)
+    except Exception as e:
+        print(f"Warning: could not read previous similar-jobs graph ({e}), rebuilding")
+
+    if previous is not None and len(set(ids)) == len(ids):
+        neighbors, scores, recomputed = update_knn_graph(previous, ids, embeddings, fingerprints, k)
+        print(f"Updated similar-jobs graph: {recomputed}/{len(ids)} neighbour lists recomputed")
+    else:
+        neighbors, scores = build_knn_graph(embeddings, k)
+        print(f"Built similar-jobs graph for {len(ids)} jobs")
+
+    save_knn_graph(path, ids, neighbors, scores, fingerprints)
+    print(f"✓ Similar-jobs graph saved to {path} (k={neighbors.shape[1]}, {time.perf_counter() - start:.1f}s)")
+    return path
@@ -0,0 +1,237 @@
+"""
+Numeric salary and experience ranges of the jobs (salary_min/salary_max, experience_level filters)
+
+Salaries ({"min": 40000, "max": 55000} in MongoDB, "$59K-$99K", "50 000 MAD" or,
+in the Indian jobs dataset, "₹ 3,00,000 - 5,00,000" and "8-12 LPA" in lakhs) and experience ("5 to 15 Years", "2-5 ans", "3+ yrs", "Senior") are free
+form. The sync and init pipelines parse them once into the numeric columns
+salary_min/salary_max and experience_min/experience_max (years, NaN when unknown,
+inf for an open range such as "3+ years"), saved with the jobs index.
+
+The service keeps, per column pair, the rows sorted by lower bound and by upper
+bound: a range filter is two binary searches, and only the matching rows are
+written to the boolean mask combined with the other filters.
+"""
+import copy
+import math
+import re
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+RANGE_COLUMNS = ("salary_min", "salary_max", "experience_min", "experience_max")
+SALARY_SOURCE_COLUMNS = ("salary", "Salary", "Salary Range", "salary_range")
+EXPERIENCE_SOURCE_COLUMNS = ("Job Experience", "experience", "Experience")
+
+# Niveaux du filtre experience_level: années [début, fin)
+EXPERIENCE_LEVELS: Dict[str, Tuple[float, float]] = {
+    "junior": (0.0, 2.0),
+    "mid": (2.0, 5.0),
+    "senior": (5.0, math.inf),
+}
+# Mots-clés d'un texte d'expérience sans nombre d'années
+EXPERIENCE_KEYWORDS: Dict[str, str] = {
+    "junior": "junior", "entry": "junior", "fresher": "junior", "graduate": "junior", "debutant": "junior",
+    "intern": "junior", "internship": "junior", "stage": "junior", "stagiaire": "junior",
+    "mid": "mid", "intermediate": "mid", "confirme": "mid",
+    "senior": "senior", "lead": "senior", "expert": "senior", "principal": "senior",
+}
+
+_NUMBER = r"\d{1,3}(?:[ ,.\u00a0\u202f]\d{3})+(?![\d.,])|\d+(?:[.,]\d+)?"
+_SALARY_AMOUNT = re.compile(
+    rf"({_NUMBER})\s*(lpa|lakhs?|lacs?|crores?|cr(?![a-z])|[kml](?![a-z]))?", re.IGNORECASE
+)
+# Multiplicateur des suffixes de montant (LPA: lakhs per annum)
+SALARY_SCALES = {"k": 1e3, "m": 1e6, "l": 1e5, "lpa": 1e5, "lakh": 1e5, "lac": 1e5, "cr": 1e7, "crore": 1e7}
+# Virgules de groupement: "50,000", et groupement indien en lakhs "3,00,000" / "12,34,567"
+_GROUPING_COMMA = re.compile(r"(?<=\d),(?=\d{3}(?!\d)|\d{2},\d)")
+_EXPERIENCE_SPAN = re.compile(
+    rf"({_NUMBER})\s*(?:(?:-|–|to|à|a|and|et)\s*({_NUMBER}))?\s*(\+)?\s*"
+    r"(years?|yrs?|y\b|ans?\b|années?|annees?|months?|mois)",
+    re.IGNORECASE
+)
+_WORD = re.compile(r"[a-z]+")
+
+
+def _number(text: str) -> float:
+    """"50 000" / "50,000" / "50.000" (milliers) ou "2,5" / "2.5" (décimal)"""
+    if re.fullmatch(r"\d{1,3}(?:[ ,.\u00a0\u202f]\d{3})+", text):
+        return float(re.sub(r"\D", "", text))
+    return float(text.replace(",", "."))
+
+
+def _strip_accents(text: str) -> str:
+    return text.replace("é", "e").replace("è", "e").replace("ê", "e")
+
+
+def parse_salary(value) -> Tuple[float, float]:
+    """
+    (min, max) d'un salaire: nombre, {"min", "max"} ou texte ("$59K-$99K", "₹ 3,00,000 - 5,00,000",
+    "12.5 LPA", "1.2 Cr"); (nan, nan) si inconnu
+    """
+    if isinstance(value, dict):
+        bounds = [value.get("min"), value.get("max")]
+        numbers = [float(v) for v in bounds if isinstance(v, (int, float)) and not isinstance(v, bool) and v > 0]
+    elif isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        numbers = [float(value)] if value > 0 else []
+    elif isinstance(value, str):
+        text = _GROUPING_COMMA.sub("", value)
+        amounts = [(_number(amount), SALARY_SCALES.get(suffix.lower().rstrip("s"), 1.0))
+                   for amount, suffix in _SALARY_AMOUNT.findall(text)]
+        # "40-55K": un montant sans suffixe (< 1000) prend celui de l'autre borne
+        unit = next((scale for _, scale in amounts if scale > 1), 1.0)
+        numbers = [number * (unit if scale == 1 and number < 1000 else scale) for number, scale in amounts]
+        numbers = [number for number in numbers if number > 0]
+    else:
+        numbers = []
+    numbers = [number for number in numbers if math.isfinite(number)]
+    if not numbers:
+        return math.nan, math.nan
+    numbers = numbers[:2]
+    return min(numbers), max(numbers)
+
+
+def parse_experience(value) -> Tuple[float, float]:
+    """(min, max) en années d'un texte d'expérience ("2-5 ans", "3+ years", "Senior"); (nan, nan) si inconnu"""
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        return (float(value), float(value)) if value >= 0 and not math.isnan(value) else (math.nan, math.nan)
+    text = str(value or "").strip()
+    if not text:
+        return math.nan, math.nan
+    if re.fullmatch(_NUMBER, text):
+        years = _number(text)
+        return years, years
+    match = _EXPERIENCE_SPAN.search(text)
+    if match:
+        low, high, plus, unit = match.groups()
+        scale = 1 / 12 if unit.lower().startswith(("month", "mois")) else 1.0
+        low = _number(low) * scale
+        high = _number(high) * scale if high else low
+        return min(low, high), (math.inf if plus else max(low, high))
+    for word in _WORD.findall(_strip_accents(text.lower())):
+        level = EXPERIENCE_KEYWORDS.get(word)
+        if level is not None:
+            return EXPERIENCE_LEVELS[level]
+    return math.nan, math.nan
+
+
+def experience_level(value: str) -> Optional[str]:
+    """Niveau ("junior", "mid", "senior") d'un mot-clé du filtre experience_level ("Débutant" -> "junior")"""
+    return EXPERIENCE_KEYWORDS.get(_strip_accents(str(value or "").strip().lower()))
+
+
+def _source(df: pd.DataFrame, columns) -> Optional[pd.Series]:
+    """Première colonne source présente (valeurs vides complétées par les colonnes suivantes)"""
+    source = None
+    for column in columns:
+        if column in df.columns:
+            values = df[column]
+            source = values if source is None else source.where(source.notna() & (source != ""), values)
+    return source
+
+
+def parse_job_ranges(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Colonnes numériques salary_min/salary_max/experience_min/experience_max (float64, NaN inconnu)"""
+    ranges = {column: np.full(len(df), np.nan) for column in RANGE_COLUMNS}
+    for prefix, columns, parse in (
+        ("salary", SALARY_SOURCE_COLUMNS, parse_salary),
+        ("experience", EXPERIENCE_SOURCE_COLUMNS, parse_experience),
+    ):
+        source = _source(df, columns)
+        if source is None:
+            continue
+        # Chaque valeur distincte n'est analysée qu'une fois
+        parsed: Dict[object, Tuple[float, float]] = {}
+        for row, value in enumerate(source.tolist()):
+            key = repr(value) if isinstance(value, (dict, list)) else value
+            if key not in parsed:
+                parsed[key] = parse(value)
+            ranges[f"{prefix}_min"][row], ranges[f"{prefix}_max"][row] = parsed[key]
+    return ranges
+
+
+def add_range_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Ajouter les colonnes numériques de salaire et d'expérience (sync / init)"""
+    for column, values in parse_job_ranges(df).items():
+        df[column] = values
+    known = ~np.isnan(df["salary_min"].to_numpy()), ~np.isnan(df["experience_min"].to_numpy())
+    print(f"✓ Salary and experience ranges parsed ({int(known[0].sum())}/{len(df)} salaries, "
+          f"{int(known[1].sum())}/{len(df)} experience levels)")
+    return df
+
+
+def job_ranges(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Colonnes numériques du DataFrame, analysées au chargement si le fichier est antérieur"""
+    if all(column in df.columns for column in RANGE_COLUMNS):
+        return {column: df[column].to_numpy(dtype=np.float64) for column in RANGE_COLUMNS}
+    return parse_job_ranges(df)
+
+
+class RangeIndex:
+    """Intervalles [min, max] par job, triés par borne basse et par borne haute"""
+
+    def __init__(self, lows: np.ndarray, highs: np.ndarray):
+        lows = np.asarray(lows, dtype=np.float64)
+        highs = np.asarray(highs, dtype=np.float64)
+        self.n_jobs = len(lows)
+        self.known = ~np.isnan(lows) & ~np.isnan(highs)
+        rows = np.flatnonzero(self.known)
+        self._by_low = rows[np.argsort(lows[rows], kind="stable")]
+        self._lows = lows[self._by_low]
+        self._by_high = rows[np.argsort(highs[rows], kind="stable")]
+        self._highs = highs[self._by_high]
+
+    def __len__(self) -> int:
+        return self.n_jobs
+
+    def extend(self, lows: np.ndarray, highs: np.ndarray) -> "RangeIndex":
+        """Index avec des jobs ajoutés à la suite (lignes n_jobs et suivantes), fusionnés dans les tableaux triés"""
+        added = RangeIndex(lows, highs)
+        extended = copy.copy(self)
+        extended.n_jobs = self.n_jobs + added.n_jobs
+        extended.known = np.concatenate([self.known, added.known])
+        # À borne égale, les lignes existantes d'abord (comme le tri stable de toutes les lignes)
+        positions = np.searchsorted(self._lows, added._lows, side="right")
+        extended._by_low = np.insert(self._by_low, positions, added._by_low + self.n_jobs)
+        extended._lows = np.insert(self._lows, positions, added._lows)
+        positions = np.searchsorted(self._highs, added._highs, side="right")
+        extended._by_high = np.insert(self._by_high, positions, added._by_high + self.n_jobs)
+        extended._highs = np.insert(self._highs, positions, added._highs)
+        return extended
+
+    @property
+    def nbytes(self) -> int:
+        return self.known.nbytes + self._by_low.nbytes + self._lows.nbytes + self._by_high.nbytes + self._highs.nbytes
+
+    def _mask(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.n_jobs, dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def low_below(self, value: float, strict: bool = False) -> np.ndarray:
+        """Jobs dont la borne basse est <= value (< value si strict)"""
+        return self._mask(self._by_low[:np.searchsorted(self._lows, value, side="left" if strict else "right")])
+
+    def low_above(self, value: float) -> np.ndarray:
+        """Jobs dont la borne basse est >= value"""
+        return self._mask(self._by_low[np.searchsorted(self._lows, value, side="left"):])
+
+    def high_above(self, value: float, strict: bool = False) -> np.ndarray:
+        """Jobs dont la borne haute est >= value (> value si strict)"""
+        return self._mask(self._by_high[np.searchsorted(self._highs, value, side="right" if strict else "left"):])
+
+    def overlapping(self, low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        """Jobs connus dont l'intervalle croise [low, high] (bornes absentes: ouvertes)"""
+        mask = self.known.copy()
+        if low is not None:
+            mask &= self.high_above(low)
+        if high is not None:
+            mask &= self.low_below(high)
+        return mask
+
+    def overlapping_level(self, start: float, end: float) -> np.ndarray:
+        """
+        Jobs dont l'intervalle croise le niveau [start, end): "0-2 ans" est junior mais pas mid,
+        "2-5 ans" est mid mais pas senior, "0 an" est junior
+        """
+        return self.low_below(end, strict=True) & (self.high_above(start, strict=True) | self.low_above(start))
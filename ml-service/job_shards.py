@@ -0,0 +1,127 @@
+"""
+Sharded job index: scatter-gather dense search across processes
+
+The job embeddings are split into contiguous row ranges (shard_bounds), each served
+by a shard_server.py process (local port or another node) that only keeps its own
+rows in memory. When JOB_SHARD_URLS is set, the front process sends the query vector
+of /api/recommend to every shard in parallel; each shard answers with its top-k as
+(global rows, scores) sorted by decreasing score and the lists are merged with a heap.
+
+Protocol (HTTP/1.1, keep-alive connections):
+- POST /search?k=K   body: query float32 (dim,)
+                     -> rows int64 (n,) followed by scores float32 (n,)
+                     headers X-Shard-Total (rows of the whole index), X-Shard-Range
+- GET /health        -> JSON description of the shard
+
+A shard that fails, answers after JOB_SHARD_TIMEOUT seconds or serves another index
+(different total) is left out: the merged result is partial and names the missing shards.
+"""
+import heapq
+import http.client
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+JOB_SHARD_URLS = [url.strip().rstrip("/") for url in os.getenv("JOB_SHARD_URLS", "").split(",") if url.strip()]
+JOB_SHARD_TIMEOUT = float(os.getenv("JOB_SHARD_TIMEOUT", 0.5))
+# Requêtes simultanées vers les shards (toutes requêtes du service confondues)
+JOB_SHARD_WORKERS = int(os.getenv("JOB_SHARD_WORKERS", 32))
+# k maximal d'une requête (le service demande top_n * 2 + jobs supprimés, top_n <= 50)
+SHARD_MAX_K = int(os.getenv("SHARD_MAX_K", 1000))
+
+
+def shard_bounds(total: int, count: int) -> List[Tuple[int, int]]:
+    """Plages de lignes [début, fin) des count shards d'un index de total lignes"""
+    return [(total * shard // count, total * (shard + 1) // count) for shard in range(count)]
+
+
+def encode_hits(rows: np.ndarray, scores: np.ndarray) -> bytes:
+    return np.asarray(rows, dtype=np.int64).tobytes() + np.asarray(scores, dtype=np.float32).tobytes()
+
+
+def decode_hits(body: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    count = len(body) // 12
+    if len(body) != count * 12:
+        raise ValueError(f"invalid shard response of {len(body)} bytes")
+    return np.frombuffer(body, dtype=np.int64, count=count), np.frombuffer(body, dtype=np.float32, offset=count * 8)
+
+
+def merge_hits(hits: Sequence[Tuple[np.ndarray, np.ndarray]], k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Fusion des top-k triés de chaque shard: ordre de top_k (score décroissant, ex-aequo par ligne décroissante)"""
+    lists = [zip((-scores).tolist(), (-rows).tolist()) for rows, scores in hits]
+    merged = [item for _, item in zip(range(k), heapq.merge(*lists))]
+    rows = np.array([-row for _, row in merged], dtype=np.int64)
+    scores = np.array([-score for score, _ in merged], dtype=np.float32)
+    return rows, scores
+
+
+class ShardError(Exception):
+    """Réponse d'un shard inutilisable (erreur HTTP, index différent)"""
+
+
+class ShardedJobSearch:
+    """Client scatter-gather des shard_server.py (un pool de connexions par shard)"""
+
+    def __init__(self, urls: Sequence[str], timeout: float = JOB_SHARD_TIMEOUT, workers: int = JOB_SHARD_WORKERS):
+        self.urls = list(urls)
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max(workers, len(self.urls)), thread_name_prefix="job-shard")
+        self._pools: Dict[str, queue.LifoQueue] = {url: queue.LifoQueue() for url in self.urls}
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def _connection(self, url: str) -> http.client.HTTPConnection:
+        try:
+            return self._pools[url].get_nowait()
+        except queue.Empty:
+            parts = urlsplit(url)
+            return http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=self.timeout)
+
+    def _query(self, url: str, query: bytes, k: int, total: int) -> Tuple[np.ndarray, np.ndarray]:
+        connection = self._connection(url)
+        try:
+            connection.request("POST", f"/search?k={k}", body=query,
+                               headers={"Content-Type": "application/octet-stream"})
+            response = connection.getresponse()
+            body = response.read()
+        except Exception:
+            connection.close()
+            raise
+        # Connexion réutilisable seulement après une réponse complète
+        self._pools[url].put(connection)
+        if response.status != 200:
+            raise ShardError(f"HTTP {response.status}: {body[:200].decode('utf-8', 'replace')}")
+        shard_total = int(response.getheader("X-Shard-Total", -1))
+        if shard_total != total:
+            raise ShardError(f"shard serves {shard_total} jobs, {total} loaded")
+        return decode_hits(body)
+
+    def search(self, query: np.ndarray, k: int, total: int) -> Tuple[np.ndarray, np.ndarray, Dict[str, str]]:
+        """
+        Les k meilleures lignes de tous les shards: (lignes, scores, shards manquants -> raison).
+        total: nombre de jobs chargés par le service, que chaque shard doit servir aussi.
+        """
+        body = np.asarray(query, dtype=np.float32).ravel().tobytes()
+        futures = {self._executor.submit(self._query, url, body, k, total): url for url in self.urls}
+        done, _ = wait(futures, timeout=self.timeout)
+        hits, missing = [], {}
+        for future, url in futures.items():
+            if future not in done:
+                missing[url] = "timeout"
+            elif future.exception() is not None:
+                missing[url] = f"error: {future.exception()}"
+            else:
+                hits.append(future.result())
+        rows, scores = merge_hits(hits, k)
+        return rows, scores, missing
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        for pool in self._pools.values():
+            while not pool.empty():
+                pool.get_nowait().close()
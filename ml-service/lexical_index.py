@@ -0,0 +1,183 @@
+"""
+BM25 inverted index over the job texts (lexical candidate generation)
+
+Dense scoring misses exact-term matches (rare frameworks, certification codes) and
+always scans every job. The inverted index is built offline (init_model.py,
+sync_mongodb*.py) from job_text and saved in BM25_INDEX_PATH as CSR arrays:
+- terms    str     (T,)    sorted vocabulary
+- indptr   int64   (T+1,)  postings of term t are indptr[t]:indptr[t + 1]
+- postings int32   (P,)    job rows containing the term
+- weights  float32 (P,)    BM25 contribution of the term to the job (idf, term
+                           frequency and length normalization precomputed)
+- ids              (N,)    job IDs, to check the index matches the loaded jobs
+
+Scoring a query is then a few slices and a bincount over the postings of its
+terms: only jobs sharing at least one term get a non-zero score.
+"""
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "data/job_bm25.npz")
+BM25_K1 = float(os.getenv("BM25_K1", 1.2))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+# Mots vides (anglais/français) ignorés à l'indexation et dans les requêtes
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or",
+    "the", "to", "with", "we", "you", "our", "your", "will", "this", "that",
+    "au", "aux", "avec", "ce", "ces", "dans", "de", "des", "du", "en", "et", "la", "le", "les", "nous",
+    "ou", "par", "pour", "sur", "un", "une", "vous", "yrs", "years", "ans",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Termes d'un texte: minuscules sans accents, "c++", "c#", "node.js" gardés entiers"""
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode("ascii").lower()
+    tokens = (token.rstrip(".") for token in TOKEN_PATTERN.findall(text))
+    return [token for token in tokens if token and token not in STOP_WORDS]
+
+
+def _term_postings(texts: Sequence[str]):
+    """
+    Termes des textes: (vocabulaire trié, terme, ligne et fréquence de chaque posting triés par
+    terme puis par ligne, longueur de chaque texte)
+    """
+    vocabulary: Dict[str, int] = {}
+    term_ids: List[int] = []
+    doc_ids: List[int] = []
+    frequencies: List[int] = []
+    lengths = np.zeros(len(texts), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths[row] = len(tokens)
+        for token, count in Counter(tokens).items():
+            term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+            doc_ids.append(row)
+            frequencies.append(count)
+
+    # Termes triés alphabétiquement, postings triés par terme puis par ligne
+    terms = np.array(sorted(vocabulary), dtype=str)
+    rank = np.empty(len(vocabulary), dtype=np.int64)
+    rank[[vocabulary[term] for term in terms.tolist()]] = np.arange(len(vocabulary))
+    term = rank[np.array(term_ids, dtype=np.int64)]
+    doc = np.array(doc_ids, dtype=np.int32)
+    tf = np.array(frequencies, dtype=np.float32)
+    order = np.lexsort((doc, term))
+    return terms, term[order], doc[order], tf[order], lengths
+
+
+def _bm25_weights(
+    tf: np.ndarray, lengths: np.ndarray, doc_freq: np.ndarray, n_docs: int, average_length: float, k1: float, b: float
+) -> np.ndarray:
+    """Contribution BM25 de postings (fréquence, longueur du texte, nombre de textes contenant le terme)"""
+    idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+    norm = k1 * (1.0 - b + b * lengths / average_length)
+    return (idf * tf * (k1 + 1.0) / (tf + norm)).astype(np.float32)
+
+
+def build_bm25_index(texts: Sequence[str], k1: float = BM25_K1, b: float = BM25_B) -> Dict[str, np.ndarray]:
+    """Index inversé BM25 (tableaux CSR) des textes, un document par ligne"""
+    terms, term, doc, tf, lengths = _term_postings(texts)
+    n_docs = max(len(texts), 1)
+    doc_freq = np.bincount(term, minlength=len(terms)).astype(np.float32)
+    average_length = float(lengths.mean()) if len(texts) and lengths.mean() > 0 else 1.0
+    weights = _bm25_weights(tf, lengths[doc], doc_freq[term], n_docs, average_length, k1, b)
+
+    indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(doc_freq.astype(np.int64))
+    return {
+        "terms": terms, "indptr": indptr, "postings": doc, "weights": weights,
+        "average_length": np.float32(average_length),
+    }
+
+
+class LexicalIndex:
+    """Index BM25 chargé en mémoire: scores lexicaux d'une requête pour chaque job"""
+
+    def __init__(self, data: Dict[str, np.ndarray], n_docs: int):
+        self.terms = data["terms"]
+        self.indptr = data["indptr"]
+        self.postings = data["postings"]
+        self.weights = data["weights"]
+        self.n_docs = n_docs
+        # Longueur moyenne des textes (absente des fichiers plus anciens)
+        self.average_length = float(data["average_length"]) if "average_length" in data else None
+        self._term_rows = {term: row for row, term in enumerate(self.terms.tolist())}
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.postings.nbytes + self.weights.nbytes
+
+    def scores(self, text: str) -> np.ndarray:
+        """Score BM25 de la requête pour chaque job (0 si aucun terme commun)"""
+        rows = [self._term_rows[token] for token in set(tokenize(text)) if token in self._term_rows]
+        if not rows:
+            return np.zeros(self.n_docs, dtype=np.float32)
+        slices = [slice(self.indptr[row], self.indptr[row + 1]) for row in rows]
+        postings = np.concatenate([self.postings[s] for s in slices])
+        weights = np.concatenate([self.weights[s] for s in slices])
+        return np.bincount(postings, weights=weights, minlength=self.n_docs).astype(np.float32)
+
+    def extend(self, texts: Sequence[str], k1: float = BM25_K1, b: float = BM25_B) -> "LexicalIndex":
+        """
+        Index avec les textes ajoutés à la suite (lignes n_docs et suivantes). Seuls ces textes
+        sont analysés: leurs poids utilisent l'idf sur toutes les lignes et la longueur moyenne
+        de l'index, les poids des lignes existantes sont gardés jusqu'à la prochaine construction.
+        """
+        terms, term, doc, tf, lengths = _term_postings(texts)
+        average_length = self.average_length or (float(lengths.mean()) if len(texts) and lengths.mean() > 0 else 1.0)
+        all_terms = np.union1d(self.terms, terms).astype(str)
+        term = np.searchsorted(all_terms, terms)[term]
+        # Postings existants puis nouveaux (lignes supérieures): le tri stable par terme garde l'ordre des lignes
+        all_term = np.concatenate([np.repeat(np.searchsorted(all_terms, self.terms), np.diff(self.indptr)), term])
+        order = np.argsort(all_term, kind="stable")
+        n_docs = self.n_docs + len(texts)
+        doc_freq = np.bincount(all_term, minlength=len(all_terms)).astype(np.float32)
+        weights = _bm25_weights(tf, lengths[doc], doc_freq[term], max(n_docs, 1), average_length, k1, b)
+
+        indptr = np.zeros(len(all_terms) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(doc_freq.astype(np.int64))
+        data = {
+            "terms": all_terms,
+            "indptr": indptr,
+            "postings": np.concatenate([self.postings, (doc + self.n_docs).astype(np.int32)])[order],
+            "weights": np.concatenate([self.weights, weights])[order],
+            "average_length": np.float32(average_length),
+        }
+        return LexicalIndex(data, n_docs)
+
+
+def save_bm25_index(path: str, ids: Sequence, index: Dict[str, np.ndarray]):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, ids=np.array([str(job_id) for job_id in ids]), **index)
+    os.replace(tmp_path, path)
+
+
+def load_bm25_index(path: str = BM25_INDEX_PATH) -> Optional[Dict[str, np.ndarray]]:
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def refresh_bm25_index(ids: Sequence, texts: Sequence[str], path: str = BM25_INDEX_PATH) -> str:
+    """Construire et sauvegarder l'index BM25 des jobs"""
+    start = time.perf_counter()
+    index = build_bm25_index([str(text) for text in texts])
+    save_bm25_index(path, ids, index)
+    print(f"✓ BM25 index saved to {path} ({len(index['terms'])} terms, {len(index['postings'])} postings, "
+          f"{time.perf_counter() - start:.1f}s)")
+    return path
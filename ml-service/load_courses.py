@@ -6,9 +6,11 @@ import pandas as pd
 import numpy as np
 import pickle
 import os
+import codecs
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict
+from typing import Callable, Iterator, List, Dict, Optional
 
 # Try to import kaggle API
 KAGGLE_AVAILABLE = False
@@ -40,248 +42,282 @@ except ImportError:
     print("Warning: kaggle package not installed. Install with: pip install kaggle")
     print("   Continuing without Kaggle datasets...")
 
-def load_courses_from_kaggle():
-    """Load courses from Kaggle datasets"""
-    courses = []
+COURSE_COLUMNS = ["title", "description", "provider", "level", "skills"]
+# Lignes lues par morceau (CSV, JSON Lines) et sources chargées en parallèle
+COURSE_CHUNK_SIZE = int(os.getenv("COURSE_CHUNK_SIZE", 50000))
+COURSE_LOAD_WORKERS = int(os.getenv("COURSE_LOAD_WORKERS", 4))
+
+def detect_encoding(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Encodage d'un CSV, déterminé en une passe sur les octets: utf-8 s'il décode tout le fichier,
+    sinon latin-1 (qui décode tout octet, comme le repli des anciennes lectures successives)
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                decoder.decode(block)
+        decoder.decode(b"", final=True)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+def read_chunks(path: str, encoding: Optional[str] = None, chunk_size: int = COURSE_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Lire un CSV, un JSON Lines (.jsonl/.ndjson) ou un JSON par morceaux de chunk_size lignes"""
+    if path.lower().endswith(".csv"):
+        with pd.read_csv(path, encoding=encoding or detect_encoding(path), chunksize=chunk_size) as reader:
+            yield from reader
+    elif path.lower().endswith((".jsonl", ".ndjson")):
+        with pd.read_json(path, lines=True, chunksize=chunk_size) as reader:
+            yield from reader
+    else:
+        # Un tableau JSON est analysé en entier, seul le mapping se fait par morceaux
+        df = pd.read_json(path)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+def first_value(df: pd.DataFrame, columns: List[str], default=None) -> pd.Series:
+    """
+    Équivalent colonne par colonne de row.get(a) or row.get(b) or ... or default:
+    première colonne présente dont la valeur est vraie (NaN compris, comme en Python)
+    """
+    present = [name for name in columns if name in df.columns]
+    result = pd.Series(default, index=df.index, dtype=object)
+    for name in reversed(present):
+        values = df[name].astype(object)
+        result = values.where(values.to_numpy().astype(bool), result)
+    return result
+
+def column(df: pd.DataFrame, name: str, default=None) -> pd.Series:
+    """Équivalent colonne de row.get(name, default)"""
+    return df[name] if name in df.columns else pd.Series(default, index=df.index, dtype=object)
+
+def as_text(values: pd.Series) -> pd.Series:
+    """str() de chaque valeur (NaN -> "nan", comme dans un f-string)"""
+    return values.astype(object).astype(str)
+
+def filled(values: pd.Series) -> pd.Series:
+    """Valeurs renseignées: non nulles et non vides une fois strippées"""
+    return values.notna() & as_text(values).str.strip().ne("")
+
+def join_parts(parts: List[pd.Series], sep: str = ". ") -> pd.Series:
+    """Joindre les morceaux non vides de chaque ligne (", ".join vectorisé)"""
+    joined = parts[0]
+    for part in parts[1:]:
+        joined = joined + np.where(joined.eq("") | part.eq(""), "", sep) + part
+    return joined
+
+def course_frame(title, description, provider, level, skills) -> pd.DataFrame:
+    return pd.DataFrame({
+        "title": title, "description": description, "provider": provider, "level": level, "skills": skills
+    })[COURSE_COLUMNS]
+
+def map_coursera_details(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Coursera Course Details (Kaggle): Institute, Link, Coursename, Skills, Rating, Review,
+    Level, Type, Duration, Platform -> schéma unifié des cours
+    """
+    title = first_value(df, ["Coursename", "course_title", "Course Name", "title"])
+    skills = first_value(df, ["Skills", "skills", "course_skills"], "")
+    level = first_value(df, ["Level", "course_level", "level"], "")
+    provider = first_value(df, ["Institute", "course_organization", "Organization"], "Coursera")
+    rating = column(df, "Rating", "")
+    duration = column(df, "Duration", "")
     
-    if not KAGGLE_AVAILABLE:
-        print("Warning: Kaggle API not available. Skipping Kaggle dataset download.")
-        return courses
+    # Create description from available fields
+    skills_text, level_text = as_text(skills), as_text(level)
+    has_skills = filled(skills) & skills_text.str.strip().ne("NA")
+    has_level = filled(level)
+    parts = [
+        ("Skills: " + skills_text).where(has_skills, ""),
+        ("Level: " + level_text.str.strip()).where(has_level, ""),
+        ("Rating: " + as_text(rating)).where(filled(rating), ""),
+        ("Duration: " + as_text(duration).str.strip()).where(filled(duration), ""),
+    ]
+    desc = join_parts(parts)
+    desc = desc.where(desc.ne(""), as_text(title) + ". Skills: " + skills_text + ". Level: " + level_text + ".")
     
-    try:
-        # Dataset 1: Coursera Course Details
-        dataset_name = 'anusreemohanan/coursera-course-details'
-        download_path = 'data/kaggle_datasets/coursera'
-        os.makedirs(download_path, exist_ok=True)
-        
-        # Check if dataset already exists
-        csv_files = [f for f in os.listdir(download_path) if f.endswith('.csv')]
-        if not csv_files:
-            print("Downloading Coursera course details from Kaggle...")
-            # Download dataset
-            kaggle.api.dataset_download_files(dataset_name, path=download_path, unzip=True)
-            print(f"Coursera dataset downloaded to: {download_path}")
-            # Re-check for CSV files after download
-            csv_files = [f for f in os.listdir(download_path) if f.endswith('.csv')]
-        else:
-            print(f"Using existing Coursera dataset from {download_path}")
-        
-        # Find CSV files in the dataset
-        if csv_files:
-            # Try different encodings
-            csv_path = os.path.join(download_path, csv_files[0])
-            encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
-            coursera_df = None
-            for encoding in encodings:
-                try:
-                    coursera_df = pd.read_csv(csv_path, encoding=encoding)
-                    print(f"Loaded {len(coursera_df)} Coursera courses (encoding: {encoding})")
-                    break
-                except (UnicodeDecodeError, UnicodeError):
-                    continue
-            
-            if coursera_df is None:
-                print(f"Warning: Could not read CSV file with any encoding. Skipping Coursera dataset.")
-            else:
-                # Map columns based on actual Coursera CSV structure: Institute, Link, Coursename, Skills, Rating, Review, Level, Type, Duration, Platform
-                for _, row in coursera_df.iterrows():
-                    title = row.get("Coursename") or row.get("course_title") or row.get("Course Name") or row.get("title")
-                    skills = row.get("Skills") or row.get("skills") or row.get("course_skills") or ""
-                    level = row.get("Level") or row.get("course_level") or row.get("level") or ""
-                    provider = row.get("Institute") or row.get("course_organization") or row.get("Organization") or "Coursera"
-                    rating = row.get("Rating", "")
-                    review = row.get("Review", "")
-                    duration = row.get("Duration", "")
-                    
-                    # Create description from available fields
-                    desc_parts = []
-                    if pd.notna(skills) and str(skills).strip() and str(skills).strip() != "NA":
-                        desc_parts.append(f"Skills: {skills}")
-                    if pd.notna(level) and str(level).strip():
-                        desc_parts.append(f"Level: {level.strip()}")
-                    if pd.notna(rating) and str(rating).strip():
-                        desc_parts.append(f"Rating: {rating}")
-                    if pd.notna(duration) and str(duration).strip():
-                        desc_parts.append(f"Duration: {duration.strip()}")
-                    
-                    desc = ". ".join(desc_parts) if desc_parts else f"{title}. Skills: {skills}. Level: {level}."
-                    
-                    if pd.notna(title) and str(title).strip():
-                        courses.append({
-                            "title": str(title).strip(),
-                            "description": str(desc).strip(),
-                            "provider": str(provider).strip() if pd.notna(provider) else "Coursera",
-                            "level": str(level).strip() if pd.notna(level) and str(level).strip() else None,
-                            "skills": str(skills).strip() if pd.notna(skills) and str(skills).strip() != "NA" else ""
-                        })
-        else:
-            print("Warning: No CSV files found in Coursera dataset")
-    except Exception as e:
-        print(f"Warning: Could not load Coursera dataset: {e}")
+    keep = filled(title)
+    return course_frame(
+        as_text(title).str.strip(),
+        desc.str.strip(),
+        as_text(provider).str.strip().where(provider.notna(), "Coursera"),
+        level_text.str.strip().where(has_level, None),
+        skills_text.str.strip().where(has_skills, ""),
+    )[keep.to_numpy()]
+
+def map_general_courses(df: pd.DataFrame, json_format: bool = False) -> pd.DataFrame:
+    """Courses (Kaggle, CSV ou JSON) -> schéma unifié des cours"""
+    if json_format:
+        title = first_value(df, ["course_title", "title", "name"])
+        desc = first_value(df, ["description", "course_description"], "")
+        skills = first_value(df, ["skills", "course_skills"], "")
+        level = first_value(df, ["level", "course_level"], "")
+        provider = first_value(df, ["provider", "organization"], "Unknown")
+    else:
+        title = first_value(df, ["course_title", "title", "name", "Course Title"])
+        desc = first_value(df, ["description", "course_description", "Description"], "")
+        skills = first_value(df, ["skills", "Skills", "course_skills"], "")
+        level = first_value(df, ["level", "Level", "course_level"], "")
+        provider = first_value(df, ["provider", "Provider", "organization"], "Unknown")
     
-    try:
-        # Dataset 2: General Courses
-        dataset_name = 'kararhaitham/courses'
-        download_path = 'data/kaggle_datasets/courses'
-        os.makedirs(download_path, exist_ok=True)
-        
-        # Check if dataset already exists
-        csv_files = [f for f in os.listdir(download_path) if f.endswith('.csv')]
-        json_files = [f for f in os.listdir(download_path) if f.endswith('.json')]
-        
-        if not csv_files and not json_files:
-            print("Downloading general courses from Kaggle...")
-            # Download dataset
-            kaggle.api.dataset_download_files(dataset_name, path=download_path, unzip=True)
-            print(f"General courses dataset downloaded to: {download_path}")
-            # Re-check for files after download
-            csv_files = [f for f in os.listdir(download_path) if f.endswith('.csv')]
-            json_files = [f for f in os.listdir(download_path) if f.endswith('.json')]
-        else:
-            print(f"Using existing general courses dataset from {download_path}")
-        
-        # Find CSV/JSON files in the dataset
-        
-        if csv_files:
-            # Try different encodings
-            csv_path = os.path.join(download_path, csv_files[0])
-            encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
-            courses_df = None
-            for encoding in encodings:
-                try:
-                    courses_df = pd.read_csv(csv_path, encoding=encoding)
-                    print(f"Loaded {len(courses_df)} general courses from CSV (encoding: {encoding})")
-                    break
-                except (UnicodeDecodeError, UnicodeError):
-                    continue
-            
-            if courses_df is None:
-                print(f"Warning: Could not read CSV file with any encoding. Trying JSON files...")
-            else:
-                for _, row in courses_df.iterrows():
-                    title = row.get("course_title") or row.get("title") or row.get("name") or row.get("Course Title")
-                    desc = row.get("description") or row.get("course_description") or row.get("Description") or ""
-                    skills = row.get("skills") or row.get("Skills") or row.get("course_skills") or ""
-                    level = row.get("level") or row.get("Level") or row.get("course_level") or ""
-                    provider = row.get("provider") or row.get("Provider") or row.get("organization") or "Unknown"
-                    
-                    if pd.notna(title) and str(title).strip():
-                        if not desc or pd.isna(desc):
-                            desc = f"{title}. Skills: {skills}. Level: {level}."
-                        else:
-                            desc = f"{desc}. Skills: {skills}. Level: {level}."
-                        
-                        courses.append({
-                            "title": str(title).strip(),
-                            "description": str(desc).strip(),
-                            "provider": str(provider).strip() if pd.notna(provider) else "Unknown",
-                            "level": str(level).strip() if pd.notna(level) and str(level).strip() else None,
-                            "skills": str(skills).strip() if pd.notna(skills) else ""
-                        })
-        elif json_files:
-            courses_df = pd.read_json(os.path.join(download_path, json_files[0]))
-            print(f"Loaded {len(courses_df)} general courses from JSON")
-            
-            for _, row in courses_df.iterrows():
-                title = row.get("course_title") or row.get("title") or row.get("name")
-                desc = row.get("description") or row.get("course_description") or ""
-                skills = row.get("skills") or row.get("course_skills") or ""
-                level = row.get("level") or row.get("course_level") or ""
-                provider = row.get("provider") or row.get("organization") or "Unknown"
-                
-                if pd.notna(title) and str(title).strip():
-                    if not desc or pd.isna(desc):
-                        desc = f"{title}. Skills: {skills}. Level: {level}."
-                    else:
-                        desc = f"{desc}. Skills: {skills}. Level: {level}."
-                    
-                    courses.append({
-                        "title": str(title).strip(),
-                        "description": str(desc).strip(),
-                        "provider": str(provider).strip() if pd.notna(provider) else "Unknown",
-                        "level": str(level).strip() if pd.notna(level) and str(level).strip() else None,
-                        "skills": str(skills).strip() if pd.notna(skills) else ""
-                    })
-        else:
-            print("Warning: No CSV or JSON files found in general courses dataset")
-    except Exception as e:
-        print(f"Warning: Could not load general courses dataset: {e}")
+    skills_text, level_text = as_text(skills), as_text(level)
+    suffix = ". Skills: " + skills_text + ". Level: " + level_text + "."
+    has_desc = desc.notna() & desc.to_numpy().astype(bool)
+    desc = (as_text(desc) + suffix).where(has_desc, as_text(title) + suffix)
     
-    return courses
+    keep = filled(title)
+    return course_frame(
+        as_text(title).str.strip(),
+        desc.str.strip(),
+        as_text(provider).str.strip().where(provider.notna(), "Unknown"),
+        level_text.str.strip().where(filled(level), None),
+        skills_text.str.strip().where(skills.notna(), ""),
+    )[keep.to_numpy()]
 
-def load_courses_from_sources():
-    """Load courses from various sources and create a unified dataset"""
-    courses = []
+def map_local_coursera(df: pd.DataFrame) -> pd.DataFrame:
+    """COURSERA_DATA_PATH (colonnes Coursename, Skills, Level) -> schéma unifié des cours"""
+    title = column(df, "Coursename")
+    skills = column(df, "Skills", "")
+    level = column(df, "Level", "")
     
-    # Try to load from Kaggle datasets first
-    print("=" * 60)
-    print("Loading courses from Kaggle datasets...")
-    print("=" * 60)
-    kaggle_courses = load_courses_from_kaggle()
-    courses.extend(kaggle_courses)
+    keep = title.notna()
+    return course_frame(
+        as_text(title),
+        as_text(title) + ". Skills taught: " + as_text(skills) + ". Level: " + as_text(level) + ".",
+        "Coursera",
+        as_text(level).where(level.notna(), None),
+        as_text(skills).where(skills.notna(), ""),
+    )[keep.to_numpy()]
+
+def map_combined_courses(df: pd.DataFrame) -> pd.DataFrame:
+    """COMBINED_COURSES_PATH (course_title, description, provider, level) -> schéma unifié des cours"""
+    title = column(df, "course_title")
+    desc = column(df, "description", "")
+    
+    keep = title.notna()
+    return course_frame(
+        as_text(title),
+        as_text(desc).where(desc.notna(), as_text(title)),
+        column(df, "provider", "Unknown"),
+        column(df, "level"),
+        "",
+    )[keep.to_numpy()]
+
+class TitleDeduplicator:
+    """Cours déjà vus (hash 64 bits du titre en minuscules), filtrés morceau par morceau"""
+    
+    def __init__(self):
+        self.seen = np.empty(0, dtype=np.uint64)
+    
+    def __call__(self, courses: pd.DataFrame) -> pd.DataFrame:
+        keys = courses["title"].str.lower().str.strip().to_numpy(dtype=object)
+        hashes = pd.util.hash_array(keys)
+        new = ~pd.Series(hashes).duplicated().to_numpy() & ~np.isin(hashes, self.seen)
+        self.seen = np.concatenate([self.seen, hashes[new]])
+        return courses[new]
+
+def load_source(name: str, path: str, mapper: Callable[[pd.DataFrame], pd.DataFrame],
+                encoding: Optional[str] = None) -> List[pd.DataFrame]:
+    """Lire une source par morceaux, la convertir au schéma des cours et écarter ses titres en double"""
+    if path.lower().endswith(".csv") and encoding is None:
+        encoding = detect_encoding(path)
+    dedup = TitleDeduplicator()
+    chunks, rows = [], 0
+    for chunk in read_chunks(path, encoding):
+        rows += len(chunk)
+        chunks.append(dedup(mapper(chunk)))
+    print(f"Loaded {rows} {name} from {path}" + (f" (encoding: {encoding})" if encoding else ""))
+    return chunks
+
+def kaggle_dataset_file(dataset_name: str, download_path: str, extensions: tuple) -> Optional[str]:
+    """Premier fichier (par ordre d'extension) d'un dataset Kaggle, téléchargé s'il est absent"""
+    os.makedirs(download_path, exist_ok=True)
+    
+    def find():
+        for extension in extensions:
+            files = sorted(f for f in os.listdir(download_path) if f.endswith(extension))
+            if files:
+                return os.path.join(download_path, files[0])
+        return None
+    
+    path = find()
+    if path is None:
+        print(f"Downloading {dataset_name} from Kaggle...")
+        kaggle.api.dataset_download_files(dataset_name, path=download_path, unzip=True)
+        print(f"Dataset downloaded to: {download_path}")
+        path = find()
+    else:
+        print(f"Using existing {dataset_name} dataset from {download_path}")
+    return path
+
+def load_coursera_details() -> List[pd.DataFrame]:
+    """Dataset 1: Coursera Course Details"""
+    path = kaggle_dataset_file('anusreemohanan/coursera-course-details', 'data/kaggle_datasets/coursera', ('.csv',))
+    if path is None:
+        print("Warning: No CSV files found in Coursera dataset")
+        return []
+    return load_source("Coursera courses", path, map_coursera_details)
+
+def load_general_courses() -> List[pd.DataFrame]:
+    """Dataset 2: General Courses (CSV, sinon JSON)"""
+    path = kaggle_dataset_file('kararhaitham/courses', 'data/kaggle_datasets/courses', ('.csv', '.json'))
+    if path is None:
+        print("Warning: No CSV or JSON files found in general courses dataset")
+        return []
+    json_format = not path.lower().endswith(".csv")
+    return load_source("general courses", path, lambda df: map_general_courses(df, json_format))
+
+def course_sources() -> List[tuple]:
+    """(nom, chargement) des sources disponibles, dans l'ordre de priorité de la déduplication"""
+    sources = []
+    if KAGGLE_AVAILABLE:
+        sources += [("Kaggle Coursera dataset", load_coursera_details), ("Kaggle courses dataset", load_general_courses)]
+    else:
+        print("Warning: Kaggle API not available. Skipping Kaggle dataset download.")
     
     # Source 1: Local Coursera CSV (if available)
     coursera_path = os.getenv("COURSERA_DATA_PATH", "data/coursera.csv")
     if os.path.exists(coursera_path):
-        try:
-            print(f"Loading local Coursera data from {coursera_path}...")
-            coursera_df = pd.read_csv(coursera_path, encoding='latin-1')
-            for _, row in coursera_df.iterrows():
-                title = row.get("Coursename")
-                skills = row.get("Skills", "")
-                level = row.get("Level", "")
-                
-                if pd.notna(title):
-                    description = f"{title}. Skills taught: {skills}. Level: {level}."
-                    courses.append({
-                        "title": str(title),
-                        "description": description,
-                        "provider": "Coursera",
-                        "level": str(level) if pd.notna(level) else None,
-                        "skills": str(skills) if pd.notna(skills) else ""
-                    })
-        except Exception as e:
-            print(f"Warning: Could not load local Coursera data: {e}")
+        sources.append(("local Coursera data", lambda: load_source("local Coursera courses", coursera_path, map_local_coursera)))
     
     # Source 2: Local combined courses dataset (if available)
     combined_path = os.getenv("COMBINED_COURSES_PATH", "data/combined_courses.json")
     if os.path.exists(combined_path):
+        sources.append(("local combined courses", lambda: load_source("local combined courses", combined_path, map_combined_courses)))
+    return sources
+
+def load_courses_from_sources():
+    """Load courses from various sources (in parallel) and create a unified dataset"""
+    print("=" * 60)
+    print("Loading courses...")
+    print("=" * 60)
+    sources = course_sources()
+    
+    def load(source) -> List[pd.DataFrame]:
+        name, loader = source
         try:
-            print(f"Loading local combined courses from {combined_path}...")
-            combined_df = pd.read_json(combined_path)
-            for _, row in combined_df.iterrows():
-                title = row.get("course_title")
-                desc = row.get("description", "")
-                
-                if pd.notna(title):
-                    courses.append({
-                        "title": str(title),
-                        "description": str(desc) if pd.notna(desc) else str(title),
-                        "provider": row.get("provider", "Unknown"),
-                        "level": row.get("level"),
-                        "skills": ""
-                    })
+            return loader()
         except Exception as e:
-            print(f"Warning: Could not load local combined courses data: {e}")
-    
-    # Remove duplicates based on title
-    if courses:
-        seen_titles = set()
-        unique_courses = []
-        for course in courses:
-            title_lower = course["title"].lower().strip()
-            if title_lower not in seen_titles:
-                seen_titles.add(title_lower)
-                unique_courses.append(course)
-        courses = unique_courses
+            print(f"Warning: Could not load {name}: {e}")
+            return []
+    
+    with ThreadPoolExecutor(max_workers=max(1, COURSE_LOAD_WORKERS)) as executor:
+        loaded = list(executor.map(load, sources))
+    
+    # Remove duplicates based on title (first source wins)
+    dedup = TitleDeduplicator()
+    chunks = [dedup(chunk) for chunks in loaded for chunk in chunks]
+    courses = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=COURSE_COLUMNS)
+    if len(courses):
         print(f"Removed duplicates. Total unique courses: {len(courses)}")
     
     # Source 3: Manual course list (fallback)
     if len(courses) == 0:
         print("No course data files found. Creating sample courses...")
-        courses = create_sample_courses()
+        courses = pd.DataFrame(create_sample_courses())
     
-    return pd.DataFrame(courses)
+    return courses
 
 def create_sample_courses():
     """Create sample courses for testing"""
@@ -0,0 +1,298 @@
+"""
+Lightweight in-process metrics for the ML service
+Exposes counters, gauges and histograms in the Prometheus text format (/metrics)
+without any extra dependency. Recording a value costs a dict lookup, a bisect and
+an uncontended lock, so instrumentation can stay enabled in production.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from profiling import record_stages
+
+# Buckets en secondes pour les latences (de 100µs à 10s)
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# Buckets pour les tailles de batch d'encodage
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class: a named metric with a fixed set of label names"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonic counter"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def get(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def samples(self):
+        for values, total in sorted(self._values.items()):
+            yield "", _format_labels(self.labelnames, values), total
+
+
+class Gauge(Metric):
+    """Gauge whose value is either set explicitly or read from a callback at scrape time"""
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        function: Optional[Callable[[], Dict[LabelValues, float]]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function = function
+
+    def set(self, value: float, *labelvalues: str):
+        self._values[labelvalues] = value
+
+    def inc(self, *labelvalues: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1.0):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set_function(self, function: Callable[[], Dict[LabelValues, float]]):
+        self._function = function
+
+    def samples(self):
+        values = dict(self._values)
+        if self._function is not None:
+            try:
+                values.update(self._function())
+            except Exception:
+                pass
+        for labelvalues, value in sorted(values.items()):
+            yield "", _format_labels(self.labelnames, labelvalues), value
+
+
+class Histogram(Metric):
+    """Cumulative histogram with fixed buckets"""
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [counts par bucket (+Inf inclus), somme, total]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[labelvalues] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(k, list(v[0]), v[1], v[2]) for k, v in sorted(self._series.items())]
+        for labelvalues, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                yield "_bucket", _format_labels(self.labelnames, labelvalues, le), cumulative
+            yield "_sum", _format_labels(self.labelnames, labelvalues), total
+            yield "_count", _format_labels(self.labelnames, labelvalues), count
+
+
+class Registry:
+    """Collection of metrics rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# ==================== MÉTRIQUES DU SERVICE ====================
+
+REQUEST_LATENCY = Histogram(
+    "ml_request_duration_seconds",
+    "End-to-end HTTP request latency per endpoint",
+    ("endpoint", "method", "status")
+)
+STAGE_LATENCY = Histogram(
+    "ml_stage_duration_seconds",
+    "Time spent in each stage of the recommendation pipeline",
+    ("endpoint", "stage")
+)
+CACHE_REQUESTS = Counter(
+    "ml_cache_requests_total",
+    "Cache lookups by cache and result (hit/miss)",
+    ("cache", "result")
+)
+SHARD_REQUESTS = Counter(
+    "ml_shard_requests_total",
+    "Scatter-gather searches per job shard and result (ok/timeout/error)",
+    ("shard", "result")
+)
+JOB_CHANGES = Counter(
+    "ml_job_changes_total",
+    "Real-time job index changes by operation (upsert/delete)",
+    ("operation",)
+)
+ENCODE_BATCH_SIZE = Histogram(
+    "ml_encode_batch_size",
+    "Number of texts sent to the encoder per call",
+    ("caller",),
+    buckets=BATCH_SIZE_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "ml_requests_in_flight",
+    "Requests currently being processed (queue depth)"
+)
+INDEX_ITEMS = Gauge(
+    "ml_index_items",
+    "Number of items loaded per index",
+    ("index",)
+)
+INDEX_BYTES = Gauge(
+    "ml_index_bytes",
+    "Memory used by the embedding matrix of each index",
+    ("index",)
+)
+BULK_JOBS = Gauge(
+    "ml_bulk_jobs",
+    "Bulk recommendation jobs by status",
+    ("status",)
+)
+PROCESS_MEMORY = Gauge(
+    "ml_process_resident_memory_bytes",
+    "Resident memory of the service process"
+)
+
+
+def resident_memory_bytes() -> float:
+    """Mémoire résidente du processus (Linux: /proc, sinon pic via resource)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return float(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # ru_maxrss est en Ko sous Linux, en octets sous macOS
+        return float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) * 1024
+    except Exception:
+        return 0.0
+
+
+PROCESS_MEMORY.set_function(lambda: {(): resident_memory_bytes()})
+
+
+class StageTimer:
+    """
+    Accumulate per-stage durations for one request.
+
+    Call lap(stage) after each step: the time elapsed since the previous lap is
+    added to that stage. Stages hit inside a loop (row access, skill matching...)
+    accumulate and are observed once in finish(), keeping the per-row overhead to
+    a single perf_counter call.
+    """
+    __slots__ = ("endpoint", "stages", "_last", "_start")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.stages: Dict[str, float] = {}
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last)
+        self._last = now
+
+    def skip(self):
+        """Ignorer le temps écoulé depuis le dernier lap"""
+        self._last = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def finish(self):
+        for stage, duration in self.stages.items():
+            STAGE_LATENCY.observe(duration, self.endpoint, stage)
+        # Rendre le détail disponible au profilage à la demande (profiling.py)
+        record_stages(self.endpoint, self.stages)
+
+
+def render_metrics() -> str:
+    """Render all registered metrics in the Prometheus text exposition format"""
+    return REGISTRY.render()
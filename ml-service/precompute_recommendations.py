@@ -0,0 +1,62 @@
+"""
+Script to precompute job and certification recommendations for stored user profiles
+Run it on a schedule, after sync_user_profiles.py and the job/course syncs: the
+service then answers /api/recommend/by-user/{user_id} and
+/api/recommend-certifications/by-user/{user_id} with a key lookup as long as
+neither the profile nor the indexes changed since the run.
+"""
+import argparse
+import os
+import time
+
+import app as service
+from precomputed import PRECOMPUTE_TOP_K, PRECOMPUTE_CHUNK_SIZE
+
+
+def main():
+    """Main function to precompute recommendations"""
+    parser = argparse.ArgumentParser(description="Precompute recommendations for stored user profiles")
+    parser.add_argument("--top-k", type=int, default=PRECOMPUTE_TOP_K, help="Recommendations stored per user")
+    parser.add_argument("--chunk-size", type=int, default=PRECOMPUTE_CHUNK_SIZE, help="Profiles scored per matrix product")
+    parser.add_argument(
+        "--active-days", type=float, default=float(os.getenv("PRECOMPUTE_ACTIVE_DAYS", 0)),
+        help="Only profiles pushed during the last N days (0: all profiles)"
+    )
+    parser.add_argument("--purge", action="store_true", help="Delete entries computed on another index")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Precomputing Recommendations for Stored User Profiles")
+    print("=" * 60)
+
+    try:
+        service.load_model_and_data()
+        service.load_courses_data()
+        if service.model is None or service.job_embeddings is None or len(service.job_embeddings) == 0:
+            print("✗ Model or job data not loaded. Please run the initialization script first.")
+            return 1
+
+        updated_since = time.time() - args.active_days * 86400 if args.active_days > 0 else None
+        start = time.perf_counter()
+        total = service.precompute_recommendations(args.top_k, args.chunk_size, updated_since)
+        purged = service.get_precomputed_store().purge(service.current_index_version()) if args.purge else 0
+
+        print("\n" + "=" * 60)
+        print("✓ Precomputation completed successfully!")
+        print("=" * 60)
+        print(f"Profiles processed: {total} ({time.perf_counter() - start:.1f}s)")
+        print(f"Index version: {service.current_index_version()}")
+        if args.purge:
+            print(f"Stale entries purged: {purged}")
+
+    except Exception as e:
+        print(f"\n✗ Error during precomputation: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,97 @@
+"""
+Precomputed per-user recommendations (offline batch, served by key lookup)
+
+precompute_recommendations.py scores every stored user profile against the job
+and course indexes in large chunks and writes, per user ID, the top-K job
+recommendations and the certification recommendations to a SQLite key-value
+table (payloads are zlib-compressed JSON).
+
+Each entry records the profile_version it was computed from and the
+index_version of the service (model, job and course indexes): the service only
+serves an entry when both still match, otherwise it computes online.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, Optional, Tuple
+
+PRECOMPUTED_DB = os.getenv("PRECOMPUTED_DB", "data/precomputed_recommendations.sqlite3")
+# Nombre de recommandations de jobs / de certifications stockées par utilisateur
+PRECOMPUTE_TOP_K = int(os.getenv("PRECOMPUTE_TOP_K", 20))
+PRECOMPUTE_CHUNK_SIZE = int(os.getenv("PRECOMPUTE_CHUNK_SIZE", 1024))
+
+
+class PrecomputedStore:
+    """Recommandations précalculées indexées par user_id (SQLite)"""
+
+    def __init__(self, path: str = PRECOMPUTED_DB):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS recommendations (
+                user_id TEXT PRIMARY KEY,
+                profile_version TEXT NOT NULL,
+                index_version TEXT NOT NULL,
+                top_k INTEGER NOT NULL,
+                payload BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        """Entrée d'un utilisateur: versions, top_k et payload {"jobs", "certifications"}"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT profile_version, index_version, top_k, payload, created_at "
+                "FROM recommendations WHERE user_id = ?",
+                (user_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        version, index_version, k, payload, created_at = row
+        return {
+            "user_id": user_id,
+            "profile_version": version,
+            "index_version": index_version,
+            "top_k": k,
+            "payload": json.loads(zlib.decompress(payload)),
+            "created_at": created_at,
+        }
+
+    def put_many(self, rows: Iterable[Tuple[str, str, str, int, bytes]]):
+        """Enregistrer des entrées: (user_id, profile_version, index_version, top_k, payload JSON)"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO recommendations VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (user_id, str(version), index_version, k, zlib.compress(payload, 6), now)
+                    for user_id, version, index_version, k, payload in rows
+                )
+            )
+
+    def delete(self, user_id: str) -> bool:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM recommendations WHERE user_id = ?", (user_id,)).rowcount > 0
+
+    def purge(self, index_version: str) -> int:
+        """Supprimer les entrées calculées sur un autre index"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM recommendations WHERE index_version != ?", (index_version,)
+            ).rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM recommendations").fetchone()[0]
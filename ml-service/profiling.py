@@ -0,0 +1,212 @@
+"""
+On-demand request profiling and slow-request capture for the ML service
+
+- Every request gets a RequestProfile stored in a context variable. StageTimer
+  (metrics.py) reports its stage durations to it, and endpoints register their
+  input with record_request_input() (a reference only, serialized lazily).
+- Profiling is opt-in per request (?profile=true or header X-Profile: 1): the
+  per-stage breakdown is then added to the JSON response. With profile=flame a
+  sampling profiler runs on the threads executing the request and returns the
+  stacks in collapsed format (one "frame;frame;frame count" per line), which
+  flamegraph.pl / speedscope can render directly.
+- Requests slower than SLOW_REQUEST_THRESHOLD_MS are appended to a JSONL log
+  with their canonicalized input and stage timings so they can be replayed.
+"""
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", 1000))  # 0 = désactivé
+SLOW_REQUEST_LOG_PATH = os.getenv("SLOW_REQUEST_LOG_PATH", "data/slow_requests.jsonl")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", 1))
+PROFILE_MAX_STACK_DEPTH = 64
+
+_slow_log_lock = threading.Lock()
+
+
+class SamplingProfiler:
+    """Échantillonner périodiquement les piles d'un ensemble de threads"""
+
+    def __init__(self, thread_ids: set, interval: float):
+        self.thread_ids = thread_ids
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.thread_ids):
+                if thread_id == own_id:
+                    continue
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                self.stacks[self._collapse(frame)] += 1
+                self.samples += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        names = []
+        while frame is not None and len(names) < PROFILE_MAX_STACK_DEPTH:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def collapsed(self) -> str:
+        """Sortie au format 'collapsed stacks' (compatible flamegraph)"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class RequestProfile:
+    """Stage timings and input captured for the current request"""
+    __slots__ = ("enabled", "stages", "input", "thread_ids", "profiler")
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stages: List[Dict[str, Any]] = []
+        self.input: Optional[Dict[str, Any]] = None
+        self.thread_ids: set = set()
+        self.profiler: Optional[SamplingProfiler] = None
+
+    def add_stages(self, endpoint: str, stages: Dict[str, float]):
+        self.stages.append({"endpoint": endpoint, "stages_ms": {k: round(v * 1000, 3) for k, v in stages.items()}})
+
+    def register_thread(self):
+        self.thread_ids.add(threading.get_ident())
+
+    def unregister_thread(self):
+        self.thread_ids.discard(threading.get_ident())
+
+    def start_sampling(self):
+        self.register_thread()
+        self.profiler = SamplingProfiler(self.thread_ids, PROFILE_SAMPLE_INTERVAL_MS / 1000.0)
+        self.profiler.start()
+
+    def stop_sampling(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "total_ms": round(elapsed * 1000, 3),
+            "stages": self.stages,
+        }
+        if self.profiler is not None:
+            result["samples"] = self.profiler.samples
+            result["sample_interval_ms"] = PROFILE_SAMPLE_INTERVAL_MS
+            result["flamegraph"] = self.profiler.collapsed()
+        return result
+
+
+_current_profile: contextvars.ContextVar = contextvars.ContextVar("request_profile", default=None)
+
+
+def start_request_profile(flag: Optional[str]) -> RequestProfile:
+    """Créer le profil de la requête courante (flag: valeur de ?profile= ou X-Profile)"""
+    mode = (flag or "").lower()
+    profile = RequestProfile(enabled=mode in ("1", "true", "yes", "flame", "sample"))
+    _current_profile.set(profile)
+    if mode in ("flame", "sample"):
+        profile.start_sampling()
+    return profile
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current_profile.get()
+
+
+@contextlib.contextmanager
+def profile_thread():
+    """
+    Échantillonner aussi le thread courant pendant le bloc (travail lancé par run_in_threadpool).
+    Le thread est retiré à la fin: il retourne au pool et sert d'autres requêtes.
+    """
+    profile = _current_profile.get()
+    if profile is None or profile.profiler is None or threading.get_ident() in profile.thread_ids:
+        yield
+        return
+    profile.register_thread()
+    try:
+        yield
+    finally:
+        profile.unregister_thread()
+
+
+def record_stages(endpoint: str, stages: Dict[str, float]):
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.add_stages(endpoint, stages)
+        if profile.profiler is not None:
+            profile.register_thread()
+
+
+def record_request_input(**payload):
+    """Garder une référence vers l'entrée de la requête (sérialisée seulement si lente)"""
+    profile = _current_profile.get()
+    if profile is not None:
+        # Le premier endpoint appelé (ex: batch) garde son entrée
+        if profile.input is None:
+            profile.input = payload
+        if profile.profiler is not None:
+            profile.register_thread()
+
+
+def canonicalize_input(payload: Optional[Dict[str, Any]]) -> Any:
+    """Forme canonique (clés triées, modèles pydantic convertis) de l'entrée"""
+    def convert(value):
+        if hasattr(value, "model_dump"):
+            return convert(value.model_dump())
+        if isinstance(value, dict):
+            return {str(k): convert(v) for k, v in sorted(value.items())}
+        if isinstance(value, (list, tuple)):
+            return [convert(v) for v in value]
+        if isinstance(value, str):
+            return " ".join(value.split())
+        return value
+    return convert(payload) if payload is not None else None
+
+
+def log_slow_request(method: str, path: str, status: int, elapsed: float, profile: RequestProfile):
+    """Ajouter une requête lente au journal JSONL si elle dépasse le seuil"""
+    if SLOW_REQUEST_THRESHOLD_MS <= 0 or elapsed * 1000 < SLOW_REQUEST_THRESHOLD_MS:
+        return
+    canonical = canonicalize_input(profile.input)
+    canonical_json = json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    entry = {
+        "timestamp": time.time(),
+        "method": method,
+        "path": path,
+        "status": status,
+        "total_ms": round(elapsed * 1000, 3),
+        "input_hash": hashlib.sha256(canonical_json.encode()).hexdigest(),
+        "input": canonical,
+        "stages": profile.stages,
+    }
+    try:
+        directory = os.path.dirname(SLOW_REQUEST_LOG_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        line = json.dumps(entry, ensure_ascii=False)
+        with _slow_log_lock, open(SLOW_REQUEST_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except Exception as e:
+        print(f"✗ Error writing slow request log: {e}")
@@ -0,0 +1,135 @@
+"""
+Precomputed skill profiles of job roles (skill gap for a target job role)
+
+Jobs are grouped by normalized role (lowercase, no accents, seniority words and
+"(H/F)" style suffixes removed). For each role with at least ROLE_MIN_JOBS
+postings the builder stores:
+- centroids float32 (R, dim)  normalized mean of the jobs' embeddings
+- counts    int32   (R,)      number of postings
+- skills    str     (R,)      JSON [[skill, share of postings], ...] by decreasing share
+
+A target role is resolved to a profile by exact normalized name, otherwise by the
+nearest centroid of its embedding. The gap is then the profile's frequent skills
+that the user does not have, instead of the skills of one (possibly noisy) posting.
+"""
+import json
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from skills import extract_skills
+
+ROLE_PROFILES_PATH = os.getenv("ROLE_PROFILES_PATH", "data/role_profiles.npz")
+ROLE_MIN_JOBS = int(os.getenv("ROLE_MIN_JOBS", 3))
+# Compétences gardées par rôle et part minimale des offres du rôle qui les demandent
+ROLE_PROFILE_SKILLS = int(os.getenv("ROLE_PROFILE_SKILLS", 30))
+ROLE_SKILL_MIN_SHARE = float(os.getenv("ROLE_SKILL_MIN_SHARE", 0.2))
+
+# Mots ignorés dans un intitulé de poste (niveau, type de contrat)
+ROLE_STOP_WORDS = {
+    "senior", "junior", "sr", "jr", "lead", "principal", "confirme", "confirmee", "debutant", "debutante",
+    "experimente", "experimentee", "stagiaire", "stage", "intern", "internship", "alternance", "alternant",
+    "freelance", "cdi", "cdd", "i", "ii", "iii", "iv",
+}
+
+
+def normalize_role(role: str) -> str:
+    """Clé d'un intitulé de poste: "Senior Data Scientist (H/F)" -> "data scientist" """
+    text = unicodedata.normalize("NFKD", str(role or "")).encode("ascii", "ignore").decode("ascii").lower()
+    text = re.sub(r"\([^)]*\)|\b[hfm]\s*/\s*[hfm]\b", " ", text)
+    words = [word.strip(".") for word in re.split(r"[^a-z0-9+#.]+", text)]
+    return " ".join(word for word in words if word and word not in ROLE_STOP_WORDS)
+
+
+def build_role_profiles(
+    roles: Sequence[str],
+    skill_texts: Sequence[str],
+    embeddings: np.ndarray,
+    min_jobs: int = ROLE_MIN_JOBS
+) -> Dict[str, np.ndarray]:
+    """Regrouper les jobs par rôle normalisé: centroïdes, effectifs et fréquences des compétences"""
+    matrix = np.array(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms > 0, norms, 1.0)
+
+    groups: Dict[str, List[int]] = {}
+    for row, role in enumerate(roles):
+        key = normalize_role(role)
+        if key:
+            groups.setdefault(key, []).append(row)
+    kept = {key: rows for key, rows in groups.items() if len(rows) >= min_jobs}
+    if not kept:
+        kept = groups  # petit corpus: garder tous les rôles
+
+    names = sorted(kept)
+    centroids = np.zeros((len(names), matrix.shape[1] if matrix.ndim == 2 else 0), dtype=np.float32)
+    counts = np.zeros(len(names), dtype=np.int32)
+    skills = []
+    for i, key in enumerate(names):
+        rows = kept[key]
+        centroid = matrix[rows].mean(axis=0)
+        norm = np.linalg.norm(centroid)
+        centroids[i] = centroid / norm if norm > 0 else centroid
+        counts[i] = len(rows)
+        frequencies = Counter(skill for row in rows for skill in set(extract_skills(skill_texts[row])))
+        top = sorted(frequencies.items(), key=lambda item: (-item[1], item[0]))[:ROLE_PROFILE_SKILLS]
+        skills.append(json.dumps([[skill, round(count / len(rows), 4)] for skill, count in top]))
+    return {
+        "names": np.array(names, dtype=str),
+        "centroids": centroids,
+        "counts": counts,
+        "skills": np.array(skills, dtype=str),
+    }
+
+
+def save_role_profiles(path: str, profiles: Dict[str, np.ndarray]):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **profiles)
+    os.replace(tmp_path, path)
+
+
+def load_role_profiles(path: str = ROLE_PROFILES_PATH) -> Optional[Dict]:
+    """Profils de rôles (skills décodé en listes [compétence, part])"""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        profiles = {name: data[name] for name in data.files}
+    profiles["skills"] = [json.loads(value) for value in profiles["skills"].tolist()]
+    profiles["row_of"] = {name: row for row, name in enumerate(profiles["names"].tolist())}
+    return profiles
+
+
+def role_skill_gap(
+    profiles: Dict,
+    row: int,
+    user_skills: Sequence[str],
+    min_share: float = ROLE_SKILL_MIN_SHARE
+) -> List[str]:
+    """Compétences fréquentes du rôle que l'utilisateur ne possède pas (par part décroissante)"""
+    user_lower = {skill.lower() for skill in user_skills}
+    return [
+        skill for skill, share in profiles["skills"][row]
+        if share >= min_share and skill.lower() not in user_lower
+    ]
+
+
+def refresh_role_profiles(
+    roles: Sequence[str],
+    skill_texts: Sequence[str],
+    embeddings: np.ndarray,
+    path: str = ROLE_PROFILES_PATH
+) -> str:
+    """Construire et sauvegarder les profils de rôles des jobs"""
+    start = time.perf_counter()
+    profiles = build_role_profiles(roles, skill_texts, embeddings)
+    save_role_profiles(path, profiles)
+    print(f"✓ Role skill profiles saved to {path} ({len(profiles['names'])} roles, {time.perf_counter() - start:.1f}s)")
+    return path
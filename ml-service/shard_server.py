@@ -0,0 +1,149 @@
+"""
+Job index shard server (scatter-gather search, see job_shards.py)
+
+Serves the rows [start, stop) of the job embeddings (EMBEDDINGS_PATH, read with a
+memory map so only the shard's rows are loaded):
+
+    # one shard (one process per shard, possibly on other nodes)
+    python shard_server.py --shard 0 --shards 4 --port 8100
+
+    # every shard as a local child process, on ports 8100..8103
+    python shard_server.py --shards 4 --port 8100
+
+then start the service with JOB_SHARD_URLS=http://127.0.0.1:8100,...,http://127.0.0.1:8103
+(printed at startup). The shards must be restarted after each sync, like the service.
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from job_shards import encode_hits, shard_bounds, SHARD_MAX_K
+from vector_index import VectorIndex
+
+EMBEDDINGS_PATH = os.getenv("EMBEDDINGS_PATH", "data/job_embeddings.npy")
+
+def load_shard(path: str, shard: int, shards: int):
+    """Index des lignes du shard et description (plage, total)"""
+    matrix = np.load(path, mmap_mode="r")
+    total = len(matrix)
+    start, stop = shard_bounds(total, shards)[shard]
+    index = VectorIndex(np.asarray(matrix[start:stop], dtype=np.float32), dim=matrix.shape[1])
+    info = {"shard": shard, "shards": shards, "start": start, "stop": stop, "total": total, "dim": int(matrix.shape[1])}
+    return index, info
+
+
+def make_server(index: VectorIndex, info: dict, host: str, port: int) -> ThreadingHTTPServer:
+    start = info["start"]
+
+    class ShardHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # En-têtes et corps écrits séparément: sans TCP_NODELAY, ~40 ms d'ACK retardé par réponse
+        disable_nagle_algorithm = True
+
+        def _send(self, status: int, body: bytes, content_type: str, headers: dict = None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, str(value))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status: int, message: str):
+            self._send(status, json.dumps({"detail": message}).encode("utf-8"), "application/json")
+
+        def do_GET(self):
+            if urlsplit(self.path).path != "/health":
+                return self._error(404, "Not found")
+            self._send(200, json.dumps({"status": "healthy", "rows": len(index), **info}).encode("utf-8"),
+                       "application/json")
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if url.path != "/search":
+                return self._error(404, "Not found")
+            try:
+                k = int(parse_qs(url.query).get("k", ["10"])[0])
+            except ValueError:
+                return self._error(400, "k must be an integer")
+            if not 1 <= k <= SHARD_MAX_K:
+                return self._error(400, f"k must be between 1 and {SHARD_MAX_K}")
+            if len(body) != info["dim"] * 4:
+                return self._error(400, f"query must be {info['dim']} float32 values")
+            rows, scores = index.search(np.frombuffer(body, dtype=np.float32), k)
+            self._send(200, encode_hits(rows + start, scores), "application/octet-stream", {
+                "X-Shard-Total": info["total"],
+                "X-Shard-Range": f"{info['start']}-{info['stop']}",
+            })
+
+        def log_message(self, format, *args):
+            pass  # pas de log par requête
+
+    server = ThreadingHTTPServer((host, port), ShardHandler)
+    server.daemon_threads = True
+    return server
+
+
+def spawn_shards(args) -> int:
+    """Lancer chaque shard dans un processus enfant et attendre (Ctrl+C ou SIGTERM arrête tout)"""
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    processes = [
+        subprocess.Popen([
+            sys.executable, os.path.abspath(__file__), "--shard", str(shard), "--shards", str(args.shards),
+            "--host", args.host, "--port", str(args.port + shard), "--embeddings", args.embeddings,
+        ])
+        for shard in range(args.shards)
+    ]
+    urls = ",".join(f"http://{args.host}:{args.port + shard}" for shard in range(args.shards))
+    print(f"JOB_SHARD_URLS={urls}", flush=True)
+    try:
+        while all(process.poll() is None for process in processes):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+    return max((process.returncode or 0) for process in processes)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve a shard of the job embeddings")
+    parser.add_argument("--shard", type=int, help="Shard number (omitted: spawn every shard locally)")
+    parser.add_argument("--shards", type=int, required=True, help="Total number of shards")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100, help="Port (first port when spawning every shard)")
+    parser.add_argument("--embeddings", default=EMBEDDINGS_PATH)
+    args = parser.parse_args(argv)
+
+    if args.shards < 1 or (args.shard is not None and not 0 <= args.shard < args.shards):
+        parser.error("expected 0 <= --shard < --shards")
+    if args.shard is None:
+        return spawn_shards(args)
+
+    index, info = load_shard(args.embeddings, args.shard, args.shards)
+    server = make_server(index, info, args.host, args.port)
+    print(f"✓ Shard {args.shard}/{args.shards}: jobs {info['start']}-{info['stop']} of {info['total']} "
+          f"on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
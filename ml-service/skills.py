@@ -0,0 +1,32 @@
+"""
+Skill extraction shared by the service and the offline index builders
+"""
+import re
+from typing import List
+
+
+def extract_skills(text: str) -> List[str]:
+    """Extraire les compétences d'un texte"""
+    if not text:
+        return []
+    
+    # Liste de compétences communes (peut être étendue)
+    common_skills = [
+        "python", "java", "javascript", "react", "node", "sql", "mongodb",
+        "docker", "kubernetes", "aws", "azure", "gcp", "machine learning",
+        "data science", "ai", "deep learning", "tensorflow", "pytorch",
+        "git", "linux", "agile", "scrum", "api", "rest", "graphql"
+    ]
+    
+    text_lower = text.lower()
+    found_skills = []
+    
+    for skill in common_skills:
+        if skill in text_lower:
+            found_skills.append(skill.title())
+    
+    # Extraire aussi les mots en majuscules (souvent des technologies)
+    words = re.findall(r'\b[A-Z][a-z]+\b', text)
+    found_skills.extend([w for w in words if len(w) > 2])
+    
+    return list(set(found_skills))[:10]  # Limiter à 10 compétences
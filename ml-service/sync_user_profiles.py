@@ -0,0 +1,156 @@
+"""
+Script to sync user profiles from MongoDB into the ML service profile store
+Profiles are sent to POST /api/users/profiles in batches; the service only
+re-encodes the profiles whose text changed. Only users updated since the last
+run are sent (use --full to resend everything).
+"""
+import argparse
+import json
+import os
+import urllib.request
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo import MongoClient
+
+STATE_PATH = os.getenv("USER_PROFILES_SYNC_STATE", "data/user_profiles_sync.json")
+
+
+def connect_mongodb():
+    """Connect to MongoDB"""
+    mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/careernetwork")
+    client = MongoClient(mongo_uri)
+    db = client.get_database()
+    return db
+
+
+def join_entries(entries, keys: List[str]) -> str:
+    """Même format que pages/api/recommend.ts (champs séparés par un espace, entrées par une virgule)"""
+    if isinstance(entries, list):
+        return ", ".join(
+            " ".join(str(entry.get(key) or "") for key in keys) if isinstance(entry, dict) else str(entry)
+            for entry in entries
+        )
+    return str(entries or "")
+
+
+def build_user_cv(user: Dict) -> Dict:
+    """Construire le CV envoyé au service ML à partir du document utilisateur"""
+    profile = user.get("profile") or {}
+    skills = profile.get("skills") or []
+    return {
+        "skills": ", ".join(skills) if isinstance(skills, list) else str(skills),
+        "experience": join_entries(profile.get("experience") or [], ["title", "company", "description"]),
+        "education": join_entries(profile.get("education") or [], ["degree", "field", "school"]),
+        "location": f"{profile.get('city') or ''} {profile.get('country') or ''}".strip(),
+        "contract_type": "",
+        "languages": join_entries(profile.get("languages") or [], ["name", "level"]),
+        "certifications": join_entries(profile.get("certifications") or [], ["name", "issuer"]),
+    }
+
+
+def profile_version(user: Dict) -> str:
+    """Version du profil: updatedAt en millisecondes (comme Date.getTime() côté Next.js)"""
+    updated_at = user.get("updatedAt")
+    if isinstance(updated_at, datetime):
+        # pymongo renvoie des datetimes UTC naïfs
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        return str(int(updated_at.timestamp() * 1000))
+    return str(updated_at or "")
+
+
+def load_last_sync() -> Optional[datetime]:
+    try:
+        with open(STATE_PATH) as f:
+            return datetime.fromisoformat(json.load(f)["last_updated_at"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_last_sync(last_updated_at: datetime):
+    os.makedirs(os.path.dirname(STATE_PATH) or ".", exist_ok=True)
+    with open(STATE_PATH, "w") as f:
+        json.dump({"last_updated_at": last_updated_at.isoformat()}, f)
+
+
+def push_profiles(service_url: str, profiles: List[Dict]) -> Dict:
+    request = urllib.request.Request(
+        f"{service_url}/api/users/profiles",
+        data=json.dumps({"profiles": profiles}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=300) as response:
+        return json.loads(response.read())
+
+
+def main():
+    """Main function to sync MongoDB user profiles"""
+    parser = argparse.ArgumentParser(description="Sync user profiles into the ML service profile store")
+    parser.add_argument("--full", action="store_true", help="Resend every profile, not only the updated ones")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    service_url = os.getenv("ML_SERVICE_URL", "http://localhost:8000").rstrip("/")
+
+    print("=" * 60)
+    print("Syncing MongoDB User Profiles with the ML Service")
+    print("=" * 60)
+
+    try:
+        db = connect_mongodb()
+
+        query: Dict = {"userType": {"$ne": "recruiter"}}
+        last_sync = None if args.full else load_last_sync()
+        if last_sync is not None:
+            query["updatedAt"] = {"$gt": last_sync}
+            print(f"Fetching users updated since {last_sync.isoformat()}...")
+        else:
+            print("Fetching all users...")
+
+        cursor = db.users.find(query, {"profile": 1, "updatedAt": 1}).sort("updatedAt", 1)
+        batch: List[Dict] = []
+        totals = {"received": 0, "encoded": 0, "unchanged": 0}
+        last_updated_at = last_sync
+
+        def flush():
+            result = push_profiles(service_url, batch)
+            for key in totals:
+                totals[key] += result.get(key, 0)
+            print(f"  {totals['received']} profiles sent ({totals['encoded']} encoded)")
+            batch.clear()
+
+        for user in cursor:
+            batch.append({
+                "user_id": str(user["_id"]),
+                "profile_version": profile_version(user),
+                "cv": build_user_cv(user),
+            })
+            if isinstance(user.get("updatedAt"), datetime):
+                last_updated_at = user["updatedAt"]
+            if len(batch) >= args.batch_size:
+                flush()
+        if batch:
+            flush()
+
+        if last_updated_at is not None:
+            save_last_sync(last_updated_at)
+
+        print("\n" + "=" * 60)
+        print("✓ Sync completed successfully!")
+        print("=" * 60)
+        print(f"Profiles sent: {totals['received']}")
+        print(f"Profiles encoded: {totals['encoded']} (unchanged: {totals['unchanged']})")
+
+    except Exception as e:
+        print(f"\n✗ Error during sync: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,89 @@
+"""
+Fixtures des tests du service ML: petit corpus synthétique de jobs encodé par un encodeur
+déterministe (sac de mots haché), à la place du modèle SentenceTransformer
+"""
+import hashlib
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SKILLS = ["Python", "Java", "SQL", "React", "Docker", "AWS", "Machine Learning", "Node", "Kubernetes", "Git"]
+CITIES = ["Casablanca", "Rabat", "Bangalore, India", "Mumbai", "Marrakech"]
+
+
+class HashingEncoder:
+    """Encodeur de test: mots hachés dans 32 dimensions (mêmes méthodes que SentenceTransformer)"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def save(self, path):
+        pass
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        embeddings = np.full((len(texts), 32), 0.01, dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in str(text).lower().split():
+                h = int(hashlib.md5(word.encode()).hexdigest()[:8], 16)
+                embeddings[i, h % 32] += 1.0 + (h >> 8) % 3
+        return embeddings
+
+
+def write_jobs(path: str, count: int = 200):
+    """Jobs au format du dataset Kaggle (jobs_index.pkl) et leurs embeddings"""
+    rng = np.random.default_rng(0)
+    rows = []
+    for i in range(count):
+        skills = ", ".join(rng.choice(SKILLS, 4, replace=False))
+        rows.append({
+            "_id": f"{i:024x}",
+            "Job_Role": f"Engineer {i % 17}",
+            "Company": f"Company {i % 23}",
+            "Location": CITIES[i % len(CITIES)],
+            "Skills/Description": f"{skills} description Developer",
+            "Job Experience": f"{i % 10}-{i % 10 + 3} Yrs",
+            "Contract_Type": ["CDI", "CDD", "Internship"][i % 3],
+        })
+    df = pd.DataFrame(rows)
+    df["job_text"] = df["Skills/Description"] + " " + df["Job Experience"] + " " + df["Location"]
+    os.makedirs(os.path.join(path, "data"), exist_ok=True)
+    np.save(os.path.join(path, "data", "job_embeddings.npy"), HashingEncoder().encode(df["job_text"].tolist()))
+    with open(os.path.join(path, "data", "jobs_index.pkl"), "wb") as f:
+        pickle.dump(df, f)
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """Module app chargé depuis un répertoire de travail temporaire (données et bases SQLite)"""
+    workdir = str(tmp_path_factory.mktemp("ml-service"))
+    write_jobs(workdir)
+    os.makedirs(os.path.join(workdir, "models", "all-MiniLM-L6-v2"), exist_ok=True)
+    previous = os.getcwd()
+    os.chdir(workdir)
+    import app
+    app.SentenceTransformer = HashingEncoder
+    yield app
+    os.chdir(previous)
+
+
+@pytest.fixture(scope="session")
+def client(app_module):
+    from fastapi.testclient import TestClient
+    with TestClient(app_module.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def user_cv():
+    return {
+        "skills": "Python, SQL, Docker, AWS, Machine Learning",
+        "experience": "3 years as Developer",
+        "education": "Master",
+        "location": "Rabat",
+    }
@@ -0,0 +1,28 @@
+import json
+
+
+def test_profile_with_gzip_response(client, user_cv):
+    """?profile=true sur une réponse du cache compressée en gzip (corps >= RESPONSE_GZIP_MIN_BYTES)"""
+    cv = {**user_cv, "education": "gzip profile test"}
+    plain = client.post("/api/recommend?top_n=20", json=cv, headers={"Accept-Encoding": "gzip"})
+    assert plain.headers["content-encoding"] == "gzip"
+
+    for _ in range(2):  # miss puis hit du cache
+        response = client.post("/api/recommend?top_n=20&profile=true", json=cv, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        payload = response.json()
+        assert payload["recommendations"] == plain.json()["recommendations"]
+        assert payload["profile"]["stages"]
+        assert response.headers["etag"] != plain.headers["etag"]
+
+
+def test_profile_header_without_gzip(client, user_cv):
+    cv = {**user_cv, "education": "identity profile test"}
+    response = client.post(
+        "/api/recommend?top_n=20", json=cv, headers={"Accept-Encoding": "identity", "X-Profile": "1"}
+    )
+    assert "content-encoding" not in response.headers
+    assert "profile" in json.loads(response.content)
+    assert int(response.headers["content-length"]) == len(response.content)
+
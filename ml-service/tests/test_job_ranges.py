@@ -0,0 +1,42 @@
+import math
+
+import pandas as pd
+import pytest
+
+from job_ranges import parse_job_ranges, parse_salary
+
+
+@pytest.mark.parametrize("value, expected", [
+    # Format du dataset "Data Science Jobs in India" (init_model.py)
+    ("₹ 3,00,000 - 5,00,000", (300000.0, 500000.0)),
+    ("₹12,34,567", (1234567.0, 1234567.0)),
+    ("12.5 LPA", (1250000.0, 1250000.0)),
+    ("8-12 LPA", (800000.0, 1200000.0)),
+    ("10-15 Lacs P.A.", (1000000.0, 1500000.0)),
+    ("Rs. 4.5 L - 6 L", (450000.0, 600000.0)),
+    ("50,000 - 1 Lakh", (50000.0, 100000.0)),
+    ("1.2 Cr", (12000000.0, 12000000.0)),
+    ("2-3 Crores", (20000000.0, 30000000.0)),
+    # Formats déjà pris en charge
+    ("$59K-$99K", (59000.0, 99000.0)),
+    ("40-55K", (40000.0, 55000.0)),
+    ("50 000 MAD", (50000.0, 50000.0)),
+    ("1,000,000 INR", (1000000.0, 1000000.0)),
+    ({"min": 40000, "max": 55000}, (40000.0, 55000.0)),
+])
+def test_parse_salary(value, expected):
+    assert parse_salary(value) == expected
+
+
+@pytest.mark.parametrize("value", ["Not Disclosed by Recruiter", "", "nan", None, math.nan, math.inf, {"min": "n/a"}])
+def test_parse_salary_unknown(value):
+    low, high = parse_salary(value)
+    assert math.isnan(low) and math.isnan(high)
+
+
+def test_parse_job_ranges_indian_salaries():
+    df = pd.DataFrame({"Salary": ["₹ 3,00,000 - 5,00,000", "6-9 LPA", "Not Disclosed by Recruiter"]})
+    ranges = parse_job_ranges(df)
+    assert ranges["salary_min"][:2].tolist() == [300000.0, 600000.0]
+    assert ranges["salary_max"][:2].tolist() == [500000.0, 900000.0]
+    assert math.isnan(ranges["salary_min"][2]) and math.isnan(ranges["salary_max"][2])
@@ -0,0 +1,114 @@
+import threading
+
+import numpy as np
+
+from job_graph import build_knn_graph
+
+
+def job_posting(job_id: str, **fields) -> dict:
+    return {
+        "_id": job_id, "title": "Data Engineer", "company": "Acme", "location": "Tanger",
+        "description": "Build data pipelines", "skills": ["Python", "SQL", "Docker"],
+        "experience": "2-4 ans", "type": "CDI", **fields,
+    }
+
+
+def ids(response) -> list:
+    return [recommendation["job_id"] for recommendation in response.json()["recommendations"]]
+
+
+def test_compaction_invalidates_cached_filtered_results(app_module, client, user_cv):
+    """Avant la compaction, les filtres ne voient pas les lignes du delta: la réponse en cache est périmée"""
+    cv = {**user_cv, "education": "compaction cache test"}
+    request = {"user_cv": cv, "filters": {"location": "tanger"}}
+    assert client.put("/api/jobs/tanger-1", json=job_posting("tanger-1")).status_code == 200
+
+    before = client.post("/api/recommend-filtered?top_n=10&mode=ids", json=request)
+    assert "tanger-1" not in ids(before)
+    version = app_module.job_index_version
+
+    assert app_module.compact_job_index() >= 1
+    assert app_module.job_index_version != version
+    after = client.post("/api/recommend-filtered?top_n=10&mode=ids", json=request)
+    assert "tanger-1" in ids(after)
+
+
+def test_result_computed_before_a_job_change_is_not_cached(app_module, client, user_cv, monkeypatch):
+    cv = {**user_cv, "education": "in-flight cache test"}
+    started, proceed = threading.Event(), threading.Event()
+    compute_recommend_jobs = app_module.compute_recommend_jobs
+
+    def paused_compute(*args, **kwargs):
+        result = compute_recommend_jobs(*args, **kwargs)
+        started.set()
+        proceed.wait(5)
+        return result
+
+    monkeypatch.setattr(app_module, "compute_recommend_jobs", paused_compute)
+    request = threading.Thread(target=lambda: client.post("/api/recommend?top_n=5", json=cv))
+    request.start()
+    assert started.wait(5)
+    app_module.apply_job_changes([app_module.JobPosting(**job_posting("in-flight-1"))], [])
+    proceed.set()
+    request.join(5)
+
+    cache_key = app_module.recommend_cache_key(app_module.UserCV(**cv), 5, app_module.JOB_RESULT_FIELDS)
+    assert cache_key not in app_module.recommendation_cache
+    assert cache_key not in app_module.inflight_requests
+
+
+def test_similar_jobs_graph_includes_posted_jobs(app_module, client, monkeypatch):
+    """Les jobs publiés après le chargement du graphe kNN sont fusionnés avec ses voisins"""
+    index = app_module.job_index
+    graph_rows = index.rows
+    vectors = np.vstack([index.vector(row) for row in range(graph_rows)])
+    neighbors, scores = build_knn_graph(vectors)
+    monkeypatch.setattr(app_module, "similar_jobs_graph", {"neighbors": neighbors, "scores": scores})
+    monkeypatch.setattr(app_module, "similar_job_rows", {str(row): row for row in range(graph_rows)})
+
+    assert client.put("/api/jobs/similar-1", json=job_posting("similar-1")).status_code == 200
+    index = app_module.job_index
+    new_scores = index.scores_rows(index.vector(index.row_of("similar-1")), np.arange(graph_rows))[0]
+    # Job du graphe dont le nouveau job dépasse le 5e voisin
+    rows = np.flatnonzero(index.active[:graph_rows] & (new_scores > scores[:, 4].astype(np.float32) + 0.01))
+    assert len(rows)
+    job_id = app_module.job_columns["job_id"][rows[0]]
+
+    response = client.get(f"/api/similar-jobs/{job_id}?top_n=5&mode=ids").json()
+    assert response["source"] == "graph"
+    assert "similar-1" in [job["job_id"] for job in response["similar_jobs"]]
+
+    assert client.delete("/api/jobs/similar-1").status_code == 200
+    response = client.get(f"/api/similar-jobs/{job_id}?top_n=5&mode=ids").json()
+    assert response["source"] == "graph"
+    assert "similar-1" not in [job["job_id"] for job in response["similar_jobs"]]
+    assert len(response["similar_jobs"]) == 5
+
+
+def test_compaction_appends_delta_rows(app_module, client):
+    """La compaction complète les structures par ligne comme une reconstruction sur toutes les lignes"""
+    postings = [
+        job_posting("append-1", location="Rabat", salary={"min": 40000, "max": 55000}, experience="5-8 ans"),
+        job_posting("append-2", location="Casablanca", type="CDD", experience="Junior"),
+    ]
+    for posting in postings:
+        assert client.put(f"/api/jobs/{posting['_id']}", json=posting).status_code == 200
+    assert app_module.compact_job_index() >= 2
+
+    rebuilt = app_module.build_job_rows(app_module.jobs_df)
+    for field, values in rebuilt["job_columns"].items():
+        assert app_module.job_columns[field].tolist() == values.tolist()
+    for name in ("job_location_text", "job_contract_text", "job_experience_text"):
+        # La reconstruction ajoute un séparateur vide pour les colonnes des jobs publiés
+        assert getattr(app_module, name).str.strip().tolist() == rebuilt[name].str.strip().tolist()
+    for name in ("salary_ranges", "experience_ranges"):
+        installed, expected = getattr(app_module, name), rebuilt[name]
+        assert installed.overlapping(45000, 60000).tolist() == expected.overlapping(45000, 60000).tolist()
+        assert installed.overlapping_level(5, np.inf).tolist() == expected.overlapping_level(5, np.inf).tolist()
+
+    index = app_module.job_index
+    assert len(app_module.jobs_df) == len(app_module.job_skills_cache) == index.base_rows
+    assert np.array_equal(index.matrix[-2:], np.vstack([index.vector(index.row_of(p["_id"])) for p in postings]))
+    rabat = app_module.geo_index.within(*app_module.gazetteer.coordinates(app_module.gazetteer.geocode("Rabat")), 20)
+    assert len(rabat) == index.base_rows and rabat[index.row_of("append-1")]
+    assert app_module.lexical_index.scores("pipelines")[index.row_of("append-2")] > 0
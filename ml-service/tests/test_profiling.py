@@ -0,0 +1,22 @@
+import time
+
+
+def test_flame_profile_samples_threadpool_work(app_module, client, user_cv, monkeypatch):
+    """profile=flame échantillonne le thread du pool qui calcule les recommandations"""
+    dense_job_search = app_module.dense_job_search
+
+    def slow_dense_job_search(*args, **kwargs):
+        result = dense_job_search(*args, **kwargs)
+        time.sleep(0.05)
+        return result
+
+    monkeypatch.setattr(app_module, "dense_job_search", slow_dense_job_search)
+    cv = {**user_cv, "education": "flame profile test"}
+    response = client.post("/api/recommend?top_n=5&profile=flame", json=cv)
+
+    assert response.status_code == 200
+    profile = response.json()["profile"]
+    assert profile["samples"] > 1
+    scoring_stacks = [line for line in profile["flamegraph"].splitlines() if "compute_recommend_jobs" in line]
+    assert scoring_stacks
+    assert all("compute_entry" in line for line in scoring_stacks)
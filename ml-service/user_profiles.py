@@ -0,0 +1,167 @@
+"""
+Persistent store of user-profile embeddings for the ML service
+
+Profiles are pushed by the web app (or by sync_user_profiles.py from the MongoDB
+users collection) with a profile_version, typically the user's updatedAt. The
+store keeps, per user ID, the version, the CV fields (needed for skill matching),
+a hash of the encoded CV fields and the embedding, in a SQLite file so the service and
+the sync script can share it and it survives restarts.
+
+A push whose fields did not change only bumps the version: the encoder runs only
+for new or modified profiles.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+USER_PROFILES_DB = os.getenv("USER_PROFILES_DB", "data/user_profiles.sqlite3")
+
+
+def fields_hash(values: Iterable[str]) -> str:
+    """
+    Hash des champs encodés, champ par champ: un texte déplacé d'un champ à l'autre
+    (même texte concaténé) change le hash, donc les embeddings par champ sont recalculés
+    """
+    return hashlib.sha256(json.dumps(list(values), ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class UserProfileStore:
+    """Embeddings des profils utilisateurs indexés par user_id (SQLite)"""
+
+    def __init__(self, path: str = USER_PROFILES_DB):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS profiles (
+                user_id TEXT PRIMARY KEY,
+                profile_version TEXT NOT NULL,
+                cv TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT profile_version, cv, text_hash, model, embedding FROM profiles WHERE user_id = ?",
+                (user_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        version, cv, hashed, model, embedding = row
+        return {
+            "user_id": user_id,
+            "profile_version": version,
+            "cv": json.loads(cv),
+            "text_hash": hashed,
+            "model": model,
+            "embedding": np.frombuffer(embedding, dtype=np.float32),
+        }
+
+    def get_cvs(self, user_ids: List[str]) -> Dict[str, Dict]:
+        """user_id -> champs du CV stocké"""
+        with self._lock:
+            placeholders = ",".join("?" * len(user_ids))
+            rows = self._conn.execute(
+                f"SELECT user_id, cv FROM profiles WHERE user_id IN ({placeholders})", user_ids
+            ).fetchall()
+        return {user_id: json.loads(cv) for user_id, cv in rows}
+
+    def load_embeddings(self, model: str) -> Tuple[List[str], np.ndarray]:
+        """Identifiants et embeddings de tous les profils encodés avec ce modèle"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, embedding FROM profiles WHERE model = ?", (model,)
+            ).fetchall()
+        if not rows:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        ids = [user_id for user_id, _ in rows]
+        matrix = np.frombuffer(b"".join(embedding for _, embedding in rows), dtype=np.float32)
+        return ids, matrix.reshape(len(rows), -1)
+
+    def iter_profiles(
+        self,
+        model: str,
+        chunk_size: int,
+        updated_since: Optional[float] = None
+    ) -> Iterator[Tuple[List[str], List[str], List[Dict], np.ndarray]]:
+        """Profils encodés avec ce modèle par chunks: (user_ids, versions, cvs, embeddings)"""
+        query = "SELECT user_id, profile_version, cv, embedding FROM profiles WHERE model = ?"
+        params: list = [model]
+        if updated_since is not None:
+            query += " AND updated_at >= ?"
+            params.append(updated_since)
+        with self._lock:
+            cursor = self._conn.execute(query + " ORDER BY user_id", params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            matrix = np.frombuffer(b"".join(row[3] for row in rows), dtype=np.float32)
+            yield (
+                [row[0] for row in rows],
+                [row[1] for row in rows],
+                [json.loads(row[2]) for row in rows],
+                matrix.reshape(len(rows), -1),
+            )
+
+    def get_hashes(self, user_ids: List[str]) -> Dict[str, Tuple[str, str]]:
+        """user_id -> (text_hash, model) pour les profils déjà stockés"""
+        result: Dict[str, Tuple[str, str]] = {}
+        with self._lock:
+            for start in range(0, len(user_ids), 500):
+                chunk = user_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for user_id, hashed, model in self._conn.execute(
+                    f"SELECT user_id, text_hash, model FROM profiles WHERE user_id IN ({placeholders})",
+                    chunk
+                ):
+                    result[user_id] = (hashed, model)
+        return result
+
+    def upsert(self, rows: Iterable[Tuple[str, str, Dict, str, str, Optional[np.ndarray]]]):
+        """
+        Enregistrer des profils: (user_id, profile_version, cv, text_hash, model, embedding).
+        embedding=None garde l'embedding existant (texte inchangé, seule la version change).
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            for user_id, version, cv, hashed, model, embedding in rows:
+                cv_json = json.dumps(cv, ensure_ascii=False)
+                if embedding is None:
+                    self._conn.execute(
+                        "UPDATE profiles SET profile_version = ?, cv = ?, updated_at = ? WHERE user_id = ?",
+                        (str(version), cv_json, now, user_id)
+                    )
+                else:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (user_id, str(version), cv_json, hashed, model,
+                         np.asarray(embedding, dtype=np.float32).tobytes(), now)
+                    )
+
+    def delete(self, user_id: str) -> bool:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM profiles WHERE user_id = ?", (user_id,)).rowcount > 0
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
@@ -0,0 +1,151 @@
+"""
+In-memory cosine-similarity index shared by the job and candidate indexes
+
+Vectors are L2-normalized once and stored as a contiguous float32 matrix, so a
+query is a single matrix product and top-k selection uses argpartition instead
+of sorting every score. Items are addressed by row and optionally by an external
+ID; rows can be added, replaced or removed in place (the matrix grows by doubling
+and removed rows are masked out) for indexes that change incrementally.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Copie float32 des vecteurs normalisés (les vecteurs nuls restent nuls)"""
+    vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms > 0, norms, 1.0)
+    return vectors
+
+
+def top_k(scores: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """Indices des k meilleurs scores, triés par score décroissant (mask: lignes autorisées)"""
+    if mask is not None:
+        candidates = np.flatnonzero(mask)
+        return candidates[top_k(scores[candidates], k)]
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        part = np.argpartition(-scores, k - 1)[:k]
+    else:
+        part = np.arange(len(scores))
+    # Ordre décroissant, ex-aequo par ligne décroissante (comme argsort()[::-1])
+    return part[np.argsort(scores[part], kind="stable")[::-1]]
+
+
+class VectorIndex:
+    """Matrice d'embeddings normalisés + correspondance identifiant -> ligne"""
+
+    def __init__(self, embeddings: Optional[np.ndarray] = None, ids: Optional[Iterable] = None, dim: Optional[int] = None):
+        self._lock = threading.Lock()
+        if embeddings is not None and len(embeddings) > 0:
+            self._matrix = normalize_rows(embeddings)
+        else:
+            self._matrix = np.zeros((0, dim or 0), dtype=np.float32)
+        self._size = len(self._matrix)
+        self._active = np.ones(self._size, dtype=bool)
+        self.ids: List = list(ids) if ids is not None else list(range(self._size))
+        self._rows: Dict = {item_id: row for row, item_id in enumerate(self.ids) if item_id is not None}
+
+    def __len__(self) -> int:
+        return int(self._active[:self._size].sum())
+
+    @property
+    def dim(self) -> int:
+        return self._matrix.shape[1]
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Vecteurs normalisés (lignes supprimées incluses, à masquer avec active)"""
+        return self._matrix[:self._size]
+
+    @property
+    def active(self) -> np.ndarray:
+        return self._active[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        return self._matrix.nbytes
+
+    def row_of(self, item_id) -> Optional[int]:
+        row = self._rows.get(item_id)
+        return row if row is not None and self._active[row] else None
+
+    def vector(self, row: int) -> np.ndarray:
+        return self._matrix[row]
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Similarité cosinus des requêtes avec chaque ligne (n_requêtes x n_lignes)"""
+        queries = normalize_rows(queries)
+        return queries @ self.matrix.T
+
+    def scores_rows(self, queries: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Similarité cosinus des requêtes avec certaines lignes seulement (n_requêtes x len(rows))"""
+        queries = normalize_rows(queries)
+        return queries @ self._matrix[rows].T
+
+    def search(self, query: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Les k lignes actives les plus proches d'une requête: (lignes, scores)"""
+        scores = self.scores(query)[0]
+        allowed = self.active if mask is None else (mask & self.active)
+        rows = top_k(scores, k, None if allowed.all() else allowed)
+        return rows, scores[rows]
+
+    def upsert(self, item_id, vector: np.ndarray) -> int:
+        """Ajouter ou remplacer le vecteur d'un identifiant, renvoie sa ligne"""
+        vector = normalize_rows(vector)[0]
+        with self._lock:
+            row = self._rows.get(item_id)
+            if row is None:
+                if self._matrix.shape[1] == 0:
+                    self._matrix = np.zeros((0, len(vector)), dtype=np.float32)
+                if self._size == len(self._matrix):
+                    capacity = max(16, 2 * len(self._matrix))
+                    matrix = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32)
+                    matrix[:self._size] = self._matrix[:self._size]
+                    active = np.zeros(capacity, dtype=bool)
+                    active[:self._size] = self._active[:self._size]
+                    self._matrix, self._active = matrix, active
+                row = self._size
+                self._size += 1
+                self.ids.append(item_id)
+                self._rows[item_id] = row
+            self._matrix[row] = vector
+            self._active[row] = True
+            return row
+
+    def extend(self, vectors: np.ndarray, ids: Iterable) -> "VectorIndex":
+        """
+        Nouvel index avec des lignes ajoutées à la suite. La matrice est partagée tant que sa
+        capacité suffit (cet index ne lit pas les lignes au-delà des siennes), doublée sinon.
+        """
+        vectors = normalize_rows(vectors) if len(vectors) else np.zeros((0, self.dim), dtype=np.float32)
+        size = self._size + len(vectors)
+        extended = VectorIndex(dim=self.dim)
+        matrix = self._matrix
+        if size > len(matrix):
+            matrix = np.zeros((max(16, 2 * len(matrix), size), self.dim), dtype=np.float32)
+            matrix[:self._size] = self._matrix[:self._size]
+        matrix[self._size:size] = vectors
+        extended._matrix = matrix
+        extended._active = np.zeros(len(matrix), dtype=bool)
+        extended._active[:self._size] = self._active[:self._size]
+        extended._active[self._size:size] = True
+        extended._size = size
+        extended.ids = self.ids + list(ids)
+        extended._rows = dict(self._rows)
+        extended._rows.update((item_id, row) for row, item_id in enumerate(extended.ids[self._size:], self._size) if item_id is not None)
+        return extended
+
+    def remove(self, item_id) -> bool:
+        """Masquer la ligne d'un identifiant (la ligne est réutilisée s'il revient)"""
+        with self._lock:
+            row = self._rows.get(item_id)
+            if row is None or not self._active[row]:
+                return False
+            self._active[row] = False
+            return True
@@ -0,0 +1,129 @@
+"""
+Script to stream job changes from MongoDB into the live ML service index
+Inserts, edits, deactivations and deletions of the jobs collection are read from
+a MongoDB change stream (replica set or Atlas cluster required) and sent in
+batches to POST /api/jobs/batch, so new postings are recommended within seconds
+instead of at the next sync. The resume token is saved after each batch and the
+stream resumes from it on restart (use --from-now to skip the missed changes).
+"""
+import argparse
+import json
+import os
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+STATE_PATH = os.getenv("JOBS_WATCH_STATE", "data/jobs_watch.json")
+# Champs de models/Job.ts utilisés par le service
+JOB_FIELDS = ("title", "company", "location", "description", "requirements", "skills", "experience", "type", "isActive")
+
+
+def connect_mongodb():
+    """Connect to MongoDB"""
+    mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/careernetwork")
+    client = MongoClient(mongo_uri)
+    db = client.get_database()
+    return db
+
+
+def job_posting(job: Dict) -> Dict:
+    """Document MongoDB -> corps JSON d'un job (ObjectId et dates exclus)"""
+    posting = {"_id": str(job["_id"])}
+    for field in JOB_FIELDS:
+        if job.get(field) is not None:
+            posting[field] = job[field]
+    salary = job.get("salary")
+    if isinstance(salary, dict):
+        posting["salary"] = {key: salary[key] for key in ("min", "max", "currency") if salary.get(key) is not None}
+    return posting
+
+
+def load_resume_token() -> Optional[Dict]:
+    try:
+        with open(STATE_PATH) as f:
+            return json.load(f)["resume_token"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_resume_token(token: Dict):
+    os.makedirs(os.path.dirname(STATE_PATH) or ".", exist_ok=True)
+    tmp_path = STATE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"resume_token": token}, f)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def push_changes(service_url: str, upserts: List[Dict], deletes: List[str]) -> Dict:
+    request = urllib.request.Request(
+        f"{service_url}/api/jobs/batch",
+        data=json.dumps({"upserts": upserts, "deletes": deletes}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def main():
+    """Main function to stream MongoDB job changes"""
+    parser = argparse.ArgumentParser(description="Stream MongoDB job changes into the ML service index")
+    parser.add_argument("--from-now", action="store_true", help="Ignore the saved resume token")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--max-wait-ms", type=int, default=500, help="Maximum delay before sending a partial batch")
+    args = parser.parse_args()
+
+    service_url = os.getenv("ML_SERVICE_URL", "http://localhost:8000").rstrip("/")
+
+    print("=" * 60)
+    print("Streaming MongoDB Job Changes to the ML Service")
+    print("=" * 60)
+
+    db = connect_mongodb()
+    pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+    resume_token = None if args.from_now else load_resume_token()
+    totals = {"indexed": 0, "removed": 0}
+
+    while True:
+        try:
+            with db.jobs.watch(
+                pipeline, full_document="updateLookup", resume_after=resume_token, max_await_time_ms=args.max_wait_ms
+            ) as stream:
+                print(f"Watching jobs changes ({'resumed' if resume_token else 'from now'})...")
+                # Dernier changement de chaque job du batch: document complet, ou None si supprimé
+                pending: Dict[str, Optional[Dict]] = {}
+                while stream.alive:
+                    change = stream.try_next()
+                    if change is not None:
+                        job_id = str(change["documentKey"]["_id"])
+                        job = change.get("fullDocument")
+                        pending[job_id] = job_posting(job) if job is not None else None
+                        if len(pending) < args.batch_size:
+                            continue
+                    if pending:
+                        upserts = [posting for posting in pending.values() if posting is not None]
+                        deletes = [job_id for job_id, posting in pending.items() if posting is None]
+                        result = push_changes(service_url, upserts, deletes)
+                        for key in totals:
+                            totals[key] += result.get(key, 0)
+                        print(f"  {len(upserts)} jobs upserted, {len(deletes)} deleted "
+                              f"(total: {totals['indexed']} indexed, {totals['removed']} removed, "
+                              f"{result.get('delta_jobs', 0)} in delta)")
+                        pending.clear()
+                    if stream.resume_token is not None:
+                        resume_token = stream.resume_token
+                        save_resume_token(resume_token)
+        except KeyboardInterrupt:
+            print("\n✓ Stopped")
+            return 0
+        except (PyMongoError, OSError) as e:
+            # Service ML ou MongoDB indisponible: reprise depuis le dernier batch envoyé
+            print(f"✗ Error while streaming job changes: {e}, retrying in 5s")
+            time.sleep(5)
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -27,7 +27,7 @@ export default async function handler(
       return res.status(404).json({ message: 'User not found' });
     }
 
-    const { target_job_role } = req.body;
+    const { target_job_role, level, provider } = req.body;
 
     const userSkills = user.profile.skills || [];
     const userEducation = user.profile.education || [];
@@ -59,19 +59,44 @@ export default async function handler(
     try {
       console.log('Calling ML service for certification recommendations...');
       
-      const aiResponse = await fetch(`${mlServiceUrl}/api/recommend-certifications?top_n=10${target_job_role ? `&target_job_role=${encodeURIComponent(target_job_role)}` : ''}`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          skills: skillsText,
-          experience: experienceText,
-          education: educationText,
-          location: locationText,
-          contract_type: '',
-          languages: languagesText,
-          certifications: certificationsText,
-        }),
-      });
+      const cvPayload = {
+        skills: skillsText,
+        experience: experienceText,
+        education: educationText,
+        location: locationText,
+        contract_type: '',
+        languages: languagesText,
+        certifications: certificationsText,
+      };
+
+      // Filtres optionnels du catalogue (niveau, fournisseur)
+      const courseFilters = `${level ? `&level=${encodeURIComponent(level)}` : ''}${provider ? `&provider=${encodeURIComponent(provider)}` : ''}`;
+
+      // Sans rôle cible, le service ML sert les recommandations précalculées du profil stocké
+      let aiResponse: Response | null = null;
+      if (!target_job_role) {
+        const profileVersion = String(new Date(user.updatedAt).getTime());
+        const byUserUrl = `${mlServiceUrl}/api/recommend-certifications/by-user/${user._id}?top_n=10&profile_version=${profileVersion}${courseFilters}`;
+        aiResponse = await fetch(byUserUrl);
+        if (aiResponse.status === 404 || aiResponse.status === 409) {
+          const pushResponse = await fetch(`${mlServiceUrl}/api/users/${user._id}/profile`, {
+            method: 'PUT',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ profile_version: profileVersion, cv: cvPayload }),
+          });
+          if (pushResponse.ok) {
+            aiResponse = await fetch(byUserUrl);
+          }
+        }
+      }
+
+      if (!aiResponse || !aiResponse.ok) {
+        aiResponse = await fetch(`${mlServiceUrl}/api/recommend-certifications?top_n=10${target_job_role ? `&target_job_role=${encodeURIComponent(target_job_role)}` : ''}${courseFilters}`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify(cvPayload),
+        });
+      }
 
       if (aiResponse.ok) {
         const aiData = await aiResponse.json();
@@ -0,0 +1,53 @@
+import type { NextApiRequest, NextApiResponse } from 'next';
+import mongoose from 'mongoose';
+import dbConnect from '@/lib/mongodb';
+import Job from '@/models/Job';
+
+export default async function handler(
+  req: NextApiRequest,
+  res: NextApiResponse
+) {
+  if (req.method !== 'GET') {
+    return res.status(405).json({ message: 'Method not allowed' });
+  }
+
+  const { id } = req.query;
+  const mlServiceUrl = process.env.ML_SERVICE_URL || 'http://localhost:8000';
+
+  try {
+    // Voisins précalculés par le service ML (graphe des jobs similaires)
+    const controller = new AbortController();
+    const timeoutId = setTimeout(() => controller.abort(), 3000);
+    const mlResponse = await fetch(
+      `${mlServiceUrl}/api/similar-jobs/${encodeURIComponent(id as string)}?top_n=10&mode=ids`,
+      { signal: controller.signal }
+    );
+    clearTimeout(timeoutId);
+
+    if (!mlResponse.ok) {
+      return res.status(200).json({ jobs: [] });
+    }
+
+    const mlData = await mlResponse.json();
+    const similar: any[] = (mlData.similar_jobs || []).filter((s: any) =>
+      mongoose.Types.ObjectId.isValid(s.job_id)
+    );
+
+    await dbConnect();
+    const jobs = await Job.find({
+      _id: { $in: similar.map((s: any) => new mongoose.Types.ObjectId(s.job_id)) },
+      isActive: true,
+    }).select('title company location type');
+    const jobsById = new Map(jobs.map((job: any) => [job._id.toString(), job]));
+
+    return res.status(200).json({
+      jobs: similar
+        .filter((s: any) => jobsById.has(s.job_id))
+        .slice(0, 5)
+        .map((s: any) => ({ ...jobsById.get(s.job_id).toObject(), similarity: s.score })),
+    });
+  } catch (error: any) {
+    console.warn('Similar jobs unavailable:', error.message);
+    return res.status(200).json({ jobs: [] });
+  }
+}
@@ -6,6 +6,32 @@ import User from '@/models/User';
 import Job from '@/models/Job';
 import mongoose from 'mongoose';
 
+// Dernière réponse du service ML par URL (ETag) : sur 304, le corps n'est pas renvoyé
+const ML_ETAG_CACHE_SIZE = 500;
+const mlEtagCache = new Map<string, { etag: string; body: string }>();
+
+async function fetchWithEtag(url: string, signal: AbortSignal): Promise<Response> {
+  const cached = mlEtagCache.get(url);
+  const response = await fetch(url, {
+    signal,
+    headers: cached ? { 'If-None-Match': cached.etag } : undefined,
+  });
+  if (response.status === 304 && cached) {
+    return new Response(cached.body, { status: 200, headers: { 'Content-Type': 'application/json' } });
+  }
+  const etag = response.headers.get('etag');
+  if (!response.ok || !etag) {
+    return response;
+  }
+  const body = await response.text();
+  mlEtagCache.delete(url);
+  mlEtagCache.set(url, { etag, body });
+  if (mlEtagCache.size > ML_ETAG_CACHE_SIZE) {
+    mlEtagCache.delete(mlEtagCache.keys().next().value as string);
+  }
+  return new Response(body, { status: response.status, headers: { 'Content-Type': 'application/json' } });
+}
+
 export default async function handler(
   req: NextApiRequest,
   res: NextApiResponse
@@ -98,20 +124,43 @@ export default async function handler(
         location: locationText,
       });
 
-      const aiResponse = await fetch(`${mlServiceUrl}/api/recommend?top_n=10`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          skills: skillsText,
-          experience: experienceText,
-          education: educationText,
-          location: locationText,
-          contract_type: '',
-          languages: languagesText,
-          certifications: certificationsText,
-        }),
-        signal: controller.signal,
-      });
+      const cvPayload = {
+        skills: skillsText,
+        experience: experienceText,
+        education: educationText,
+        location: locationText,
+        contract_type: '',
+        languages: languagesText,
+        certifications: certificationsText,
+      };
+
+      // Le service ML garde l'embedding du profil par utilisateur et par version :
+      // on ne renvoie le CV (et il n'est ré-encodé) que si le profil a changé.
+      const profileVersion = String(new Date(user.updatedAt).getTime());
+      const byUserUrl = `${mlServiceUrl}/api/recommend/by-user/${user._id}?top_n=10&profile_version=${profileVersion}`;
+      let aiResponse = await fetchWithEtag(byUserUrl, controller.signal);
+
+      if (aiResponse.status === 404 || aiResponse.status === 409) {
+        const pushResponse = await fetch(`${mlServiceUrl}/api/users/${user._id}/profile`, {
+          method: 'PUT',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ profile_version: profileVersion, cv: cvPayload }),
+          signal: controller.signal,
+        });
+        if (pushResponse.ok) {
+          aiResponse = await fetchWithEtag(byUserUrl, controller.signal);
+        }
+      }
+
+      if (!aiResponse.ok) {
+        // Service ML sans magasin de profils : envoyer le CV directement
+        aiResponse = await fetch(`${mlServiceUrl}/api/recommend?top_n=10`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify(cvPayload),
+          signal: controller.signal,
+        });
+      }
       
       clearTimeout(timeoutId);
 
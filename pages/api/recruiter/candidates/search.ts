@@ -24,7 +24,49 @@ export default async function handler(
 
   if (req.method === 'GET') {
     try {
-      const { skills, location, experience, education } = req.query;
+      const { skills, location, experience, education, jobId } = req.query;
+
+      // Classement des candidats pour une offre via le service ML (profils pré-encodés)
+      if (jobId) {
+        const mlServiceUrl = process.env.ML_SERVICE_URL || 'http://localhost:8000';
+        try {
+          const mlResponse = await fetch(
+            `${mlServiceUrl}/api/recommend-candidates?job_id=${encodeURIComponent(jobId as string)}&top_n=50`
+          );
+          if (mlResponse.ok) {
+            const mlData = await mlResponse.json();
+            const ranked: any[] = mlData.candidates || [];
+            const users = await User.find({
+              _id: { $in: ranked.map((c: any) => c.user_id) },
+              userType: 'candidate',
+            }).select('name email profile');
+            const usersById = new Map(users.map((u: any) => [u._id.toString(), u]));
+
+            return res.status(200).json({
+              candidates: ranked
+                .filter((c: any) => usersById.has(c.user_id))
+                .map((c: any) => {
+                  const u: any = usersById.get(c.user_id);
+                  return {
+                    _id: u._id,
+                    name: u.name,
+                    email: u.email,
+                    skills: u.profile?.skills || [],
+                    location: u.profile?.city || u.profile?.country || '',
+                    experience: u.profile?.experience || [],
+                    education: u.profile?.education || [],
+                    mlScore: c.score,
+                    matchingSkills: c.matching_skills || [],
+                    skillMatchPercentage: c.skill_match_percentage,
+                  };
+                }),
+            });
+          }
+          console.warn('ML candidate ranking unavailable:', mlResponse.status);
+        } catch (mlError: any) {
+          console.warn('ML candidate ranking failed, using database search:', mlError.message);
+        }
+      }
 
       // Construire la requête
       let query: any = { userType: 'candidate' };
@@ -19,6 +19,7 @@ export default function JobDetails() {
   const [showApplicationForm, setShowApplicationForm] = useState(false);
   const [coverLetter, setCoverLetter] = useState('');
   const [alert, setAlert] = useState<{ message: string; type: 'success' | 'error' } | null>(null);
+  const [similarJobs, setSimilarJobs] = useState<any[]>([]);
 
   useEffect(() => {
     if (id) {
@@ -27,6 +28,24 @@ export default function JobDetails() {
     }
   }, [id, session]);
 
+  useEffect(() => {
+    if (id) {
+      fetchSimilarJobs();
+    }
+  }, [id]);
+
+  const fetchSimilarJobs = async () => {
+    try {
+      const response = await fetch(`/api/jobs/${id}/similar`);
+      if (response.ok) {
+        const data = await response.json();
+        setSimilarJobs(data.jobs || []);
+      }
+    } catch (error) {
+      console.error('Error fetching similar jobs:', error);
+    }
+  };
+
   const fetchJob = async () => {
     try {
       const response = await fetch(`/api/jobs/${id}`);
@@ -289,6 +308,29 @@ export default function JobDetails() {
                 </div>
               )}
             </div>
+
+            {similarJobs.length > 0 && (
+              <div className="bg-white dark:bg-gray-800 rounded-lg shadow-md p-8 mt-6">
+                <h3 className="text-lg font-semibold text-gray-900 dark:text-white mb-4">
+                  Offres similaires
+                </h3>
+                <ul className="divide-y divide-gray-200 dark:divide-gray-700">
+                  {similarJobs.map((similar) => (
+                    <li key={similar._id} className="py-3">
+                      <button
+                        onClick={() => router.push(`/jobs/${similar._id}`)}
+                        className="text-left w-full hover:text-blue-600"
+                      >
+                        <span className="font-medium text-gray-900 dark:text-white">{similar.title}</span>
+                        <span className="block text-sm text-gray-600 dark:text-gray-400">
+                          {similar.company} · {similar.location}
+                        </span>
+                      </button>
+                    </li>
+                  ))}
+                </ul>
+              </div>
+            )}
           </div>
         </main>
         <Footer />